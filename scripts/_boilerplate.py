@@ -0,0 +1,412 @@
+"""Erkennung von Textbausteinen über MinHash-LSH
+
+Jedes Protokoll enthält wiederkehrende Textbausteine: Inhaltsverzeichnis,
+Anwesenheitslisten, feste Formeln zu den Tagesordnungspunkten und erneut
+abgedruckte Titel von Drucksachen. Sie blähen die Token-Zahlen für LDA und
+die LLM-Aufrufe auf, ohne etwas über die Debatte auszusagen.
+
+Seiten und Absätze werden in Wort-Shingles zerlegt und als MinHash-Signatur
+gespeichert. Die Signaturen liegen bandweise in einer LSH-Tabelle (SQLite,
+Index auf dem Bucket-Schlüssel); Kandidaten für Beinahe-Duplikate kommen
+aus wenigen Index-Lookups statt aus einem Vergleich mit allen Absätzen und
+werden über die Signaturen bestätigt. Ein Absatz, der mindestens
+MIN_COPIES-mal an anderer Stelle vorkommt, wird maskiert:
+
+    data/boilerplate/lsh.sqlite      Signaturen und LSH-Buckets
+    data/boilerplate/<sitzung>.json  Maske: Seite -> Zeilenbereiche [von, bis)
+
+Analyse-Skripte lesen Texte über read_text()/iter_sessions() aus diesem
+Modul und überspringen so die maskierten Zeilen.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from _normalizer import TOKENIZER_VERSION, tokenize
+from _protocol_store import BASE_DIR, JSON_DIR, Page, iter_pages, list_sessions
+
+BOILERPLATE_DIR = BASE_DIR / "data" / "boilerplate"
+
+# Bei Änderungen an Segmentierung, Shingles oder Hashfunktionen erhöhen
+MINHASH_VERSION = f"2.{TOKENIZER_VERSION}"
+
+SHINGLE_SIZE = 3  # Wörter pro Shingle
+MIN_SHINGLES = 8  # kürzere Absätze werden nicht indexiert
+NUM_PERM = 64
+BANDS, ROWS = 8, 8  # Kandidaten ab etwa 0,77 Jaccard-Ähnlichkeit (≈ (1/BANDS)^(1/ROWS))
+THRESHOLD = 0.8  # geschätzte Jaccard-Ähnlichkeit für ein bestätigtes Duplikat
+MIN_COPIES = 2  # Kopien an anderen Stellen (andere Seite oder Sitzung), ab denen ein Baustein maskiert wird
+MAX_PARAGRAPH_LINES = 12
+
+# Universelles Hashing (a·x + b) mod p mit p < 2^32: für 32-Bit-Shingles (crc32) passt
+# a·x + b immer in uint64, es gibt also keinen stillen Überlauf vor dem Modulo
+_PRIME = np.uint64((1 << 32) - 5)
+_rng = np.random.RandomState(20)
+_A = _rng.randint(1, int(_PRIME), NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, int(_PRIME), NUM_PERM, dtype=np.uint64)
+# Bänder werden zu einem 64-Bit-Schlüssel verrechnet (Überlauf ist gewollt)
+_BAND_COEFFS = _rng.randint(1, 1 << 62, (BANDS, ROWS), dtype=np.uint64) | np.uint64(1)
+_BAND_SALT = _rng.randint(1, 1 << 62, BANDS, dtype=np.uint64)
+
+_PARAGRAPH_END = (".", "!", "?", ":", ")")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session     TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS units (
+    unit       INTEGER PRIMARY KEY,
+    session    TEXT NOT NULL,
+    page       INTEGER NOT NULL,
+    first_line INTEGER NOT NULL,
+    last_line  INTEGER NOT NULL,
+    signature  BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_units_session ON units (session);
+CREATE TABLE IF NOT EXISTS buckets (
+    key  INTEGER NOT NULL,
+    unit INTEGER NOT NULL,
+    PRIMARY KEY (key, unit)
+) WITHOUT ROWID;
+"""
+
+Mask = Dict[int, List[Tuple[int, int]]]
+
+
+# --- Segmentierung und MinHash ------------------------------------------------
+
+def paragraphs(lines: List[str], max_lines: int = MAX_PARAGRAPH_LINES) -> List[Tuple[int, int]]:
+    """Absätze einer Seite als Zeilenbereiche [von, bis)
+
+    Ein Absatz endet mit einer deutlich kürzeren Zeile, die auf ein Satzzeichen
+    endet (letzte Zeile im Blocksatz), spätestens nach max_lines Zeilen.
+    """
+    if not lines:
+        return []
+    width = sorted(map(len, lines))[len(lines) // 2]
+    ranges, start = [], 0
+    for i, line in enumerate(lines):
+        if i + 1 - start >= max_lines or (len(line) < 0.8 * width and line.endswith(_PARAGRAPH_END)):
+            ranges.append((start, i + 1))
+            start = i + 1
+    if start < len(lines):
+        ranges.append((start, len(lines)))
+    return ranges
+
+
+def shingles(text: str) -> np.ndarray:
+    """Menge der Wort-Shingles als 32-Bit-Hashes"""
+    tokens = tokenize(text)
+    grams = {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), np.uint64, len(grams))
+
+
+def signatures(shingle_sets: List[np.ndarray], batch_size: int = 1 << 15) -> np.ndarray:
+    """MinHash-Signaturen (n × NUM_PERM, uint32) für viele Shingle-Mengen auf einmal
+
+    Alle Permutationen werden als eine Matrixoperation berechnet; batch_size
+    begrenzt die Zahl der Shingles pro Block (Speicher: batch_size × NUM_PERM × 8 Byte).
+    """
+    result = np.zeros((len(shingle_sets), NUM_PERM), np.uint32)
+    start = 0
+    while start < len(shingle_sets):
+        end, size = start, 0
+        while end < len(shingle_sets) and (end == start or size + len(shingle_sets[end]) <= batch_size):
+            size += len(shingle_sets[end])
+            end += 1
+        batch = shingle_sets[start:end]
+        flat = np.concatenate(batch)
+        offsets = np.cumsum([0] + [len(s) for s in batch[:-1]])
+        hashed = (flat[:, None] * _A + _B) % _PRIME
+        result[start:end] = np.minimum.reduceat(hashed, offsets, axis=0)
+        start = end
+    return result
+
+
+def band_keys(sigs: np.ndarray) -> np.ndarray:
+    """Ein Bucket-Schlüssel pro Band (n × BANDS, int64 für SQLite)"""
+    bands = sigs.reshape(len(sigs), BANDS, ROWS).astype(np.uint64)
+    keys = (bands * _BAND_COEFFS).sum(axis=2, dtype=np.uint64) + _BAND_SALT
+    return keys.view(np.int64)
+
+
+def fingerprint(pages: List[Page]) -> str:
+    digest = hashlib.sha256(MINHASH_VERSION.encode())
+    for page in pages:
+        digest.update(f"{page.number}\n{page.text}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _merge(ranges: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged: List[Tuple[int, int]] = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def _chunks(items: List, size: int = 500) -> Iterator[List]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# --- Index ----------------------------------------------------------------------
+
+class BoilerplateIndex:
+    """Persistente LSH-Tabelle über alle Seiten und Absätze des Korpus"""
+
+    def __init__(self, root: Path = BOILERPLATE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.root / "lsh.sqlite", timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def fingerprint(self, session: str) -> Optional[str]:
+        row = self.conn.execute("SELECT fingerprint FROM sessions WHERE session = ?", (session,)).fetchone()
+        return row[0] if row else None
+
+    def _units(self, session: str) -> Tuple[List[Tuple], np.ndarray]:
+        rows = self.conn.execute(
+            "SELECT unit, page, first_line, last_line, signature FROM units WHERE session = ? ORDER BY unit",
+            (session,),
+        ).fetchall()
+        sigs = np.frombuffer(b"".join(row[4] for row in rows), np.uint32).reshape(len(rows), NUM_PERM)
+        return rows, sigs
+
+    def add(self, session: str, pages: List[Page], session_fingerprint: Optional[str] = None):
+        """Indexiert alle Seiten und Absätze einer Sitzung (ersetzt einen früheren Stand)"""
+        self.remove(session)
+        units, sets = [], []
+        for page in pages:
+            lines = page.text.split("\n")
+            spans = paragraphs(lines)
+            if len(spans) > 1:
+                spans.append((0, len(lines)))  # die ganze Seite als zusätzliche Einheit
+            for first, last in spans:
+                shingle_set = shingles("\n".join(lines[first:last]))
+                if len(shingle_set) >= MIN_SHINGLES:
+                    units.append((session, page.number, first, last))
+                    sets.append(shingle_set)
+        sigs = signatures(sets)
+
+        self.conn.executemany(
+            "INSERT INTO units (session, page, first_line, last_line, signature) VALUES (?, ?, ?, ?, ?)",
+            [(*unit, sig.tobytes()) for unit, sig in zip(units, sigs)],
+        )
+        unit_ids = [row[0] for row in self.conn.execute(
+            "SELECT unit FROM units WHERE session = ? ORDER BY unit", (session,))]
+        keys = band_keys(sigs)
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO buckets (key, unit) VALUES (?, ?)",
+            ((int(key), unit_id) for unit_id, row in zip(unit_ids, keys) for key in row),
+        )
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sessions (session, fingerprint) VALUES (?, ?)",
+            (session, session_fingerprint or fingerprint(pages)),
+        )
+        self.conn.commit()
+
+    def remove(self, session: str):
+        rows, sigs = self._units(session)
+        if rows:
+            keys = band_keys(sigs)
+            self.conn.executemany(
+                "DELETE FROM buckets WHERE key = ? AND unit = ?",
+                ((int(key), row[0]) for row, unit_keys in zip(rows, keys) for key in unit_keys),
+            )
+            self.conn.execute("DELETE FROM units WHERE session = ?", (session,))
+        self.conn.execute("DELETE FROM sessions WHERE session = ?", (session,))
+
+    def duplicates(self, session: str) -> Tuple[List[Tuple], List[Set[Tuple[str, int]]]]:
+        """Einheiten einer Sitzung und je Einheit die Fundstellen (Sitzung, Seite) ihrer Beinahe-Duplikate"""
+        rows, sigs = self._units(session)
+        if not rows:
+            return [], []
+        keys = band_keys(sigs)
+        by_key: Dict[int, List[int]] = {}
+        for i, unit_keys in enumerate(keys):
+            for key in unit_keys:
+                by_key.setdefault(int(key), []).append(i)
+
+        # Kandidaten: alle Einheiten, die in mindestens einem Band denselben Bucket teilen
+        own_ids = {row[0] for row in rows}
+        candidates: Dict[int, Set[int]] = {}
+        for chunk in _chunks(list(by_key)):
+            placeholders = ",".join("?" * len(chunk))
+            for key, unit in self.conn.execute(
+                    f"SELECT key, unit FROM buckets WHERE key IN ({placeholders})", chunk):
+                if unit in own_ids:
+                    continue
+                for i in by_key[key]:
+                    candidates.setdefault(i, set()).add(unit)
+
+        others: Dict[int, Tuple[str, int, np.ndarray]] = {}
+        wanted = sorted(set().union(*candidates.values())) if candidates else []
+        for chunk in _chunks(wanted):
+            placeholders = ",".join("?" * len(chunk))
+            for unit, other_session, page, signature in self.conn.execute(
+                    f"SELECT unit, session, page, signature FROM units WHERE unit IN ({placeholders})", chunk):
+                others[unit] = (other_session, page, np.frombuffer(signature, np.uint32))
+
+        # Bestätigung über den Anteil übereinstimmender Signaturwerte (Schätzer der Jaccard-Ähnlichkeit)
+        found: List[Set[Tuple[str, int]]] = [set() for _ in rows]
+        for i, units in candidates.items():
+            for unit in units:
+                other_session, page, signature = others[unit]
+                if np.count_nonzero(signature == sigs[i]) >= THRESHOLD * NUM_PERM:
+                    found[i].add((other_session, page))
+        # Kopien innerhalb der Sitzung (z. B. Titel im Inhaltsverzeichnis und beim Aufruf)
+        for i, unit_keys in enumerate(keys):
+            for key in unit_keys:
+                for j in by_key[int(key)]:
+                    if j != i and rows[j][1] != rows[i][1] and \
+                            np.count_nonzero(sigs[j] == sigs[i]) >= THRESHOLD * NUM_PERM:
+                        found[i].add((session, rows[j][1]))
+        return rows, found
+
+    def mask(self, session: str) -> Tuple[Mask, Set[str]]:
+        """Maske der Sitzung und alle Sitzungen, mit denen sie Bausteine teilt"""
+        rows, found = self.duplicates(session)
+        ranges: Dict[int, List[Tuple[int, int]]] = {}
+        partners: Set[str] = set()
+        for row, locations in zip(rows, found):
+            locations.discard((session, row[1]))
+            partners.update(other for other, _ in locations)
+            if len(locations) >= MIN_COPIES:
+                ranges.setdefault(row[1], []).append((row[2], row[3]))
+        partners.discard(session)
+        return {page: _merge(spans) for page, spans in ranges.items()}, partners
+
+    def write_mask(self, session: str, mask: Mask):
+        path = self.root / f"{session}.json"
+        tmp_path = path.with_suffix(".json.tmp")
+        data = {
+            "fingerprint": self.fingerprint(session),
+            "pages": {str(page): [list(span) for span in spans] for page, spans in sorted(mask.items())},
+        }
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def update(self, sessions: Optional[List[str]] = None, json_dir: Path = JSON_DIR) -> int:
+        """Indexiert neue und geänderte Sitzungen und aktualisiert alle betroffenen Masken
+
+        Ein neuer Baustein kann auch ältere Sitzungen betreffen (dritte Kopie
+        eines Titels); deren Masken werden deshalb ebenfalls neu berechnet.
+        """
+        changed = []
+        for session in sessions or list_sessions(json_dir):
+            pages = list(iter_pages(session, json_dir))
+            session_fingerprint = fingerprint(pages)
+            if self.fingerprint(session) == session_fingerprint and (self.root / f"{session}.json").exists():
+                continue
+            # Partner des alten Stands verlieren eventuell Kopien
+            _, old_partners = self.mask(session) if self.fingerprint(session) else ({}, set())
+            self.add(session, pages, session_fingerprint)
+            changed.append((session, old_partners))
+
+        pending: Set[str] = set()
+        for session, old_partners in changed:
+            mask, partners = self.mask(session)
+            self.write_mask(session, mask)
+            pending |= partners | old_partners
+        pending -= {session for session, _ in changed}
+        for session in sorted(pending):
+            if self.fingerprint(session):
+                self.write_mask(session, self.mask(session)[0])
+        if changed:
+            logging.info(f"Textbausteine: {len(changed)} Sitzungen indexiert, {len(pending)} Masken nachgeführt")
+        return len(changed)
+
+
+# --- Lesen ohne Textbausteine ------------------------------------------------------
+
+def load_mask(session: str, root: Path = BOILERPLATE_DIR) -> Tuple[Optional[str], Mask]:
+    """(Fingerabdruck, Maske) einer Sitzung; ohne Maskendatei (None, {})"""
+    path = Path(root) / f"{session}.json"
+    if not path.exists():
+        return None, {}
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return data["fingerprint"], {int(page): [tuple(span) for span in spans] for page, spans in data["pages"].items()}
+
+
+def strip_boilerplate(pages: Iterable[Page], mask: Mask,
+                      keep: Optional[Callable[[str], bool]] = None) -> Iterator[Page]:
+    """Maskierte Zeilen entfernen
+
+    Enthält ein maskierter Absatz eine Zeile, für die keep(line) gilt, bleibt
+    der ganze Absatz stehen (ein mehrzeiliger Zwischenruf darf nicht halb
+    verschwinden).
+    """
+    for page in pages:
+        spans = mask.get(page.number)
+        if not spans:
+            yield page
+            continue
+        lines = page.text.split("\n")
+        kept, cursor = [], 0
+        for first, last in spans:
+            if keep is not None and any(map(keep, lines[first:last])):
+                continue
+            kept.extend(lines[cursor:first])
+            cursor = max(cursor, last)
+        kept.extend(lines[cursor:])
+        yield Page(number=page.number, text="\n".join(kept))
+
+
+def read_pages(session: str, json_dir: Path = JSON_DIR, root: Path = BOILERPLATE_DIR,
+               keep: Optional[Callable[[str], bool]] = None) -> List[Page]:
+    """Seiten einer Sitzung ohne maskierte Textbausteine (ohne gültige Maske: unverändert)
+
+    Für die Zerlegung in Reden ProtocolParser.keeps_line als keep übergeben:
+    wiederkehrende Zeilen wie "(Beifall beim BÜNDNIS 90/DIE GRÜNEN)" oder eine
+    Rednerzeile mit Standardformel bleiben dann erhalten.
+    """
+    pages = list(iter_pages(session, json_dir))
+    mask_fingerprint, mask = load_mask(session, root)
+    if mask and mask_fingerprint != fingerprint(pages):
+        logging.warning(f"Maske für Sitzung {session} veraltet, Textbausteine werden nicht entfernt")
+        mask = {}
+    return list(strip_boilerplate(pages, mask, keep))
+
+
+def read_text(session: str, json_dir: Path = JSON_DIR, root: Path = BOILERPLATE_DIR) -> str:
+    """Text einer Sitzung ohne maskierte Textbausteine (ohne gültige Maske: vollständiger Text)"""
+    return "\n".join(page.text for page in read_pages(session, json_dir, root) if page.text)
+
+
+def iter_sessions(json_dir: Path = JSON_DIR, root: Path = BOILERPLATE_DIR) -> Iterator[Tuple[str, str]]:
+    """Wie _protocol_store.iter_sessions, aber ohne Textbausteine"""
+    for session in list_sessions(json_dir):
+        yield session, read_text(session, json_dir, root)
+
+
+def main():
+    index = BoilerplateIndex()
+    updated = index.update()
+    total = masked = 0
+    for session in list_sessions():
+        text = "\n".join(page.text for page in iter_pages(session))
+        total += len(text)
+        masked += len(text) - len(read_text(session))
+    share = masked / total if total else 0.0
+    print(f"✅ {updated} Sitzungen neu indexiert")
+    print(f"🧹 {masked:,} von {total:,} Zeichen als Textbaustein maskiert ({share:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Basis-Verzeichnis ist das Root-Verzeichnis des Projekts
+BASE_DIR = Path(__file__).resolve().parent.parent
+CATALOG_FILE = BASE_DIR / "data" / "catalog.sqlite"
+
+# Verarbeitungsstufen und ihr Status
+STAGE_EXTRACT = "extract"
+STAGE_PARSE = "parse"
+STAGE_ANALYZE = "analyze"
+
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS protocols (
+    protocol_id      TEXT PRIMARY KEY,
+    number           INTEGER NOT NULL,
+    file_path        TEXT,
+    downloaded_at    TEXT,
+    size_bytes       INTEGER,
+    sha256           TEXT,
+    etag             TEXT,
+    last_modified    TEXT,
+    download_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS idx_protocols_downloaded_at ON protocols (downloaded_at);
+
+CREATE TABLE IF NOT EXISTS stages (
+    protocol_id      TEXT NOT NULL,
+    stage            TEXT NOT NULL,
+    status           TEXT NOT NULL,
+    updated_at       TEXT NOT NULL,
+    duration_seconds REAL,
+    fingerprint      TEXT,
+    error            TEXT,
+    PRIMARY KEY (protocol_id, stage)
+);
+CREATE INDEX IF NOT EXISTS idx_stages_updated_at ON stages (stage, updated_at);
+"""
+
+
+class ProtocolCatalog:
+    """Katalog aller Protokolle und ihres Verarbeitungsstands (SQLite im WAL-Modus)
+
+    Jeder Thread bekommt eine eigene Verbindung; dank WAL können beliebig
+    viele Prozesse lesen, während ein Prozess schreibt.
+    """
+
+    def __init__(self, db_path: Path = CATALOG_FILE):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # --- Downloads ---------------------------------------------------------
+
+    def record_download(self, protocol_id: str, number: int, file_path: str,
+                        size_bytes: int, sha256: str, etag: Optional[str] = None,
+                        last_modified: Optional[str] = None,
+                        download_seconds: Optional[float] = None):
+        """Speichert einen erfolgreichen Download (eine Transaktion)"""
+        with self._connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO protocols (protocol_id, number, file_path, downloaded_at, size_bytes,
+                                       sha256, etag, last_modified, download_seconds)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (protocol_id) DO UPDATE SET
+                    number = excluded.number,
+                    file_path = excluded.file_path,
+                    downloaded_at = excluded.downloaded_at,
+                    size_bytes = excluded.size_bytes,
+                    sha256 = excluded.sha256,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    download_seconds = excluded.download_seconds
+                """,
+                (protocol_id, number, file_path, datetime.now().isoformat(), size_bytes,
+                 sha256, etag, last_modified, download_seconds),
+            )
+
+    def get(self, protocol_id: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT * FROM protocols WHERE protocol_id = ?", (protocol_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def protocols(self) -> List[Dict]:
+        rows = self._connection().execute("SELECT * FROM protocols ORDER BY protocol_id")
+        return [dict(row) for row in rows]
+
+    def latest_number(self) -> Optional[int]:
+        row = self._connection().execute("SELECT MAX(number) FROM protocols").fetchone()
+        return row[0]
+
+    # --- Verarbeitungsstufen -----------------------------------------------
+
+    def mark_stage(self, protocol_id: str, stage: str, status: str,
+                   duration_seconds: Optional[float] = None,
+                   fingerprint: Optional[str] = None, error: Optional[str] = None):
+        """Setzt den Status einer Verarbeitungsstufe für ein Protokoll"""
+        with self._connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO stages (protocol_id, stage, status, updated_at, duration_seconds, fingerprint, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (protocol_id, stage) DO UPDATE SET
+                    status = excluded.status,
+                    updated_at = excluded.updated_at,
+                    duration_seconds = excluded.duration_seconds,
+                    fingerprint = excluded.fingerprint,
+                    error = excluded.error
+                """,
+                (protocol_id, stage, status, datetime.now().isoformat(),
+                 duration_seconds, fingerprint, error),
+            )
+
+    def stage(self, protocol_id: str, stage: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT * FROM stages WHERE protocol_id = ? AND stage = ?", (protocol_id, stage)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def changed_since(self, since: str, stage: Optional[str] = None) -> List[str]:
+        """Protokolle, die seit `since` (ISO-Zeitstempel) heruntergeladen bzw.
+        in der angegebenen Stufe abgeschlossen wurden – über den Index statt per Verzeichnis-Scan
+        """
+        if stage is None:
+            rows = self._connection().execute(
+                "SELECT protocol_id FROM protocols WHERE downloaded_at > ? ORDER BY protocol_id",
+                (since,),
+            )
+        else:
+            rows = self._connection().execute(
+                "SELECT protocol_id FROM stages WHERE stage = ? AND status = ? AND updated_at > ? "
+                "ORDER BY protocol_id",
+                (stage, STATUS_DONE, since),
+            )
+        return [row[0] for row in rows]
+
+    def pending(self, stage: str) -> List[str]:
+        """Heruntergeladene Protokolle, deren Stufe noch nicht erfolgreich lief"""
+        rows = self._connection().execute(
+            """
+            SELECT p.protocol_id FROM protocols p
+            LEFT JOIN stages s ON s.protocol_id = p.protocol_id AND s.stage = ?
+            WHERE s.status IS NULL OR s.status != ?
+            ORDER BY p.protocol_id
+            """,
+            (stage, STATUS_DONE),
+        )
+        return [row[0] for row in rows]
+
+    # --- Migration ---------------------------------------------------------
+
+    def import_metadata_json(self, metadata_file: Path) -> int:
+        """Übernimmt Einträge aus der alten metadata.json (einmalig)"""
+        metadata_file = Path(metadata_file)
+        if not metadata_file.exists():
+            return 0
+        metadata = json.loads(metadata_file.read_text())
+        protocols = metadata.get("protocols", {})
+        with self._connection() as conn:
+            for protocol_id, entry in protocols.items():
+                conn.execute(
+                    """
+                    INSERT OR IGNORE INTO protocols
+                        (protocol_id, number, file_path, downloaded_at, etag, last_modified)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (protocol_id, entry["number"], entry.get("file_path"), entry.get("downloaded_at"),
+                     entry.get("etag"), entry.get("last_modified")),
+                )
+        logging.info(f"{len(protocols)} Einträge aus {metadata_file} übernommen")
+        return len(protocols)
@@ -0,0 +1,202 @@
+import logging
+import os
+from datetime import date
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+from _protocol_parser import ParsedProtocol, ProtocolParser
+from _protocol_store import BASE_DIR, list_sessions
+
+CORPUS_DIR = BASE_DIR / "data" / "corpus"
+
+# Redner, Parteien und Tagesordnungspunkte als Dictionary-Spalten:
+# jeder Wert wird pro Datei nur einmal gespeichert
+_dict_string = pa.dictionary(pa.int32(), pa.string())
+
+SPEECH_SCHEMA = pa.schema([
+    ("protocol_id", pa.string()),
+    ("date", pa.date32()),
+    ("position", pa.int32()),
+    ("speaker", _dict_string),
+    ("party", _dict_string),
+    ("topic", _dict_string),
+    ("time", pa.string()),
+    ("content", pa.string()),
+    ("speaker_id", _dict_string),
+    ("role", _dict_string),
+])
+
+INTERJECTION_SCHEMA = pa.schema([
+    ("protocol_id", pa.string()),
+    ("date", pa.date32()),
+    ("position", pa.int32()),
+    ("speaker", _dict_string),
+    ("party", _dict_string),
+    ("content", pa.string()),
+    ("target_speaker", _dict_string),
+    ("target_party", _dict_string),
+])
+
+# Erwähnungen von Personen aus der Namensliste (Seite und Zeichenposition im Seitentext)
+MENTION_SCHEMA = pa.schema([
+    ("protocol_id", pa.string()),
+    ("date", pa.date32()),
+    ("speaker_id", _dict_string),
+    ("page", pa.int32()),
+    ("offset", pa.int32()),
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("wahlperiode", pa.int16()), ("sitzung", pa.int16())]), flavor="hive"
+)
+
+
+def _partition_dir(root: Path, table: str, protocol_id: str) -> Path:
+    wahlperiode, sitzung = protocol_id.split("/")
+    return root / table / f"wahlperiode={int(wahlperiode)}" / f"sitzung={int(sitzung)}"
+
+
+def _write_table(table: pa.Table, directory: Path):
+    """Schreibt eine Partition atomar (erst temporär, dann umbenennen)"""
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / "part-0.parquet"
+    tmp_path = directory / "part-0.parquet.tmp"
+    pq.write_table(table, tmp_path, compression="zstd", use_dictionary=True)
+    os.replace(tmp_path, path)
+
+
+class CorpusWriter:
+    """Speichert geparste Protokolle spaltenweise als partitioniertes Parquet"""
+
+    def __init__(self, root: Path = CORPUS_DIR):
+        self.root = Path(root)
+
+    def write(self, protocol: ParsedProtocol):
+        sitting_date = protocol.date.date()
+        speeches = protocol.speeches
+        interjections = protocol.interjections
+
+        speech_table = pa.table({
+            "protocol_id": pa.array([protocol.protocol_id] * len(speeches), pa.string()),
+            "date": pa.array([sitting_date] * len(speeches), pa.date32()),
+            "position": pa.array(range(len(speeches)), pa.int32()),
+            "speaker": pa.array([s.speaker for s in speeches], pa.string()).dictionary_encode(),
+            "party": pa.array([s.party for s in speeches], pa.string()).dictionary_encode(),
+            "topic": pa.array([s.topic for s in speeches], pa.string()).dictionary_encode(),
+            "time": pa.array([s.time for s in speeches], pa.string()),
+            "content": pa.array([s.content for s in speeches], pa.string()),
+            "speaker_id": pa.array([s.speaker_id for s in speeches], pa.string()).dictionary_encode(),
+            "role": pa.array([s.role for s in speeches], pa.string()).dictionary_encode(),
+        }).cast(SPEECH_SCHEMA)
+
+        interjection_table = pa.table({
+            "protocol_id": pa.array([protocol.protocol_id] * len(interjections), pa.string()),
+            "date": pa.array([sitting_date] * len(interjections), pa.date32()),
+            "position": pa.array(range(len(interjections)), pa.int32()),
+            "speaker": pa.array([i.speaker for i in interjections], pa.string()).dictionary_encode(),
+            "party": pa.array([i.party for i in interjections], pa.string()).dictionary_encode(),
+            "content": pa.array([i.content for i in interjections], pa.string()),
+            "target_speaker": pa.array([i.target_speaker for i in interjections], pa.string()).dictionary_encode(),
+            "target_party": pa.array([i.target_party for i in interjections], pa.string()).dictionary_encode(),
+        }).cast(INTERJECTION_SCHEMA)
+
+        mentions = protocol.mentions
+        mention_table = pa.table({
+            "protocol_id": pa.array([protocol.protocol_id] * len(mentions), pa.string()),
+            "date": pa.array([sitting_date] * len(mentions), pa.date32()),
+            "speaker_id": pa.array([m.speaker_id for m in mentions], pa.string()).dictionary_encode(),
+            "page": pa.array([m.page for m in mentions], pa.int32()),
+            "offset": pa.array([m.offset for m in mentions], pa.int32()),
+        }).cast(MENTION_SCHEMA)
+
+        _write_table(speech_table, _partition_dir(self.root, "speeches", protocol.protocol_id))
+        _write_table(interjection_table, _partition_dir(self.root, "interjections", protocol.protocol_id))
+        _write_table(mention_table, _partition_dir(self.root, "mentions", protocol.protocol_id))
+        logging.info(
+            f"Protokoll {protocol.protocol_id}: {len(speeches)} Reden, "
+            f"{len(interjections)} Zwischenrufe, {len(mentions)} Erwähnungen gespeichert"
+        )
+
+
+class CorpusReader:
+    """Liest den Parquet-Korpus per Memory-Mapping und filtert beim Scannen
+
+    Filter auf Partei/Redner/Datum werden an den Scan übergeben, sodass nur
+    passende Partitionen und Row-Groups gelesen werden.
+    """
+
+    def __init__(self, root: Path = CORPUS_DIR):
+        self.root = Path(root)
+        self.filesystem = fs.LocalFileSystem(use_mmap=True)
+
+    def _dataset(self, table: str, schema: pa.Schema) -> ds.Dataset:
+        path = self.root / table
+        if not path.exists():
+            raise FileNotFoundError(f"Kein Korpus unter {path}")
+        return ds.dataset(
+            str(path), format="parquet", partitioning=PARTITIONING, filesystem=self.filesystem,
+            schema=pa.unify_schemas([schema, PARTITIONING.schema]),
+        )
+
+    @staticmethod
+    def _filter(parties: Optional[Iterable[str]] = None, speakers: Optional[Iterable[str]] = None,
+                since: Optional[date] = None, until: Optional[date] = None,
+                wahlperiode: Optional[int] = None):
+        expression = None
+
+        def combine(condition):
+            return condition if expression is None else expression & condition
+
+        if parties is not None:
+            expression = combine(pc.field("party").isin(list(parties)))
+        if speakers is not None:
+            expression = combine(pc.field("speaker").isin(list(speakers)))
+        if since is not None:
+            expression = combine(pc.field("date") >= pa.scalar(since, pa.date32()))
+        if until is not None:
+            expression = combine(pc.field("date") <= pa.scalar(until, pa.date32()))
+        if wahlperiode is not None:
+            expression = combine(pc.field("wahlperiode") == wahlperiode)
+        return expression
+
+    def speeches(self, columns: Optional[List[str]] = None, **filters) -> pa.Table:
+        """Reden, optional gefiltert nach parties, speakers, since, until, wahlperiode"""
+        return self._dataset("speeches", SPEECH_SCHEMA).to_table(
+            columns=columns, filter=self._filter(**filters)
+        )
+
+    def interjections(self, columns: Optional[List[str]] = None, **filters) -> pa.Table:
+        """Zwischenrufe, optional gefiltert wie speeches()"""
+        return self._dataset("interjections", INTERJECTION_SCHEMA).to_table(
+            columns=columns, filter=self._filter(**filters)
+        )
+
+    def mentions(self, columns: Optional[List[str]] = None, speaker_ids: Optional[Iterable[str]] = None,
+                 **filters) -> pa.Table:
+        """Erwähnungen, optional nach speaker_ids sowie since, until, wahlperiode gefiltert"""
+        expression = self._filter(**filters)
+        if speaker_ids is not None:
+            condition = pc.field("speaker_id").isin(list(speaker_ids))
+            expression = condition if expression is None else expression & condition
+        return self._dataset("mentions", MENTION_SCHEMA).to_table(columns=columns, filter=expression)
+
+
+def main():
+    parser = ProtocolParser()
+    writer = CorpusWriter()
+    for session in list_sessions():
+        try:
+            writer.write(parser.parse_session(session))
+        except ValueError as e:
+            logging.error(f"Sitzung {session} übersprungen: {e}")
+    logging.info(f"Korpus gespeichert unter {writer.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,17 @@
+import hashlib
 import logging
+import os
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
 from pathlib import Path
-from datetime import datetime
-import json
-from typing import Optional, List, Dict
+from typing import Iterable, Optional, List, Dict
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from _catalog import ProtocolCatalog
+from _tracing import count, span
 
 logging.basicConfig(
     level=logging.INFO,
@@ -13,108 +21,174 @@ logging.basicConfig(
 class ProtocolDownloader:
     BASE_URL = "https://dserver.bundestag.de/btp/20/"
     WAHLPERIODE = "20"
-    
-    def __init__(self, base_dir: Path):
+    KNOWN_LATEST = 211  # Startpunkt für die Suche, falls noch nichts heruntergeladen wurde
+    CHUNK_SIZE = 1 << 16
+    TIMEOUT = 30
+
+    def __init__(self, base_dir: Path, base_url: Optional[str] = None, max_workers: int = 8):
         self.base_dir = base_dir
+        self.base_url = base_url or self.BASE_URL
+        self.max_workers = max_workers
         self.pdf_dir = base_dir / "data" / "pdfs"
         self.metadata_file = base_dir / "data" / "metadata.json"
-        
+
         # Erstelle benötigte Verzeichnisse
         self.pdf_dir.mkdir(parents=True, exist_ok=True)
-        self.metadata_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Lade existierende Metadata
-        self.metadata = self._load_metadata()
 
-    def _load_metadata(self) -> Dict:
-        """Lädt existierende Metadata oder erstellt neue"""
+        # Katalog öffnen und alte metadata.json einmalig übernehmen
+        self.catalog = ProtocolCatalog(base_dir / "data" / "catalog.sqlite")
         if self.metadata_file.exists():
-            return json.loads(self.metadata_file.read_text())
-        return {
-            "last_check": None,
-            "protocols": {}
-        }
-    
-    def _save_metadata(self):
-        """Speichert Metadata"""
-        self.metadata_file.write_text(json.dumps(self.metadata, indent=2))
+            self.catalog.import_metadata_json(self.metadata_file)
+            self.metadata_file.rename(self.metadata_file.with_suffix(".json.migrated"))
+
+        # Gemeinsame Session mit Keep-Alive-Verbindungspool für alle Threads
+        self.session = self._create_session()
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers, max_retries=retry)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def protocol_url(self, protocol_id: str) -> str:
+        return f"{self.base_url}{protocol_id}.pdf"
 
     def check_protocol_exists(self, number: int) -> bool:
         """Prüft ob ein Protokoll existiert"""
-        url = f"{self.BASE_URL}{self.WAHLPERIODE}{number:03d}.pdf"
-        response = requests.head(url)
+        url = self.protocol_url(f"{self.WAHLPERIODE}{number:03d}")
+        response = self.session.head(url, timeout=self.TIMEOUT)
         return response.status_code == 200
 
-    def find_latest_protocol(self) -> int:
-        """Findet die Nummer des neuesten verfügbaren Protokolls"""
-        current = 211  # Aktuell bekannte neueste Nummer
-        
-        while self.check_protocol_exists(current + 1):
-            current += 1
-            
-        while not self.check_protocol_exists(current):
-            current -= 1
-            
-        return current
+    def _known_latest(self) -> int:
+        return self.catalog.latest_number() or self.KNOWN_LATEST
+
+    def find_latest_protocol(self, start: Optional[int] = None) -> int:
+        """Findet die Nummer des neuesten verfügbaren Protokolls
+
+        Exponentielle Suche ab dem zuletzt bekannten Protokoll, danach
+        binäre Suche – O(log n) HEAD-Requests statt einem pro Sitzung.
+        Gibt 0 zurück, wenn kein Protokoll existiert.
+        """
+        start = start or self._known_latest()
+
+        if self.check_protocol_exists(start):
+            # Obergrenze finden: start, start+1, start+3, start+7, ...
+            low, step = start, 1
+            high = low + step
+            while self.check_protocol_exists(high):
+                low = high
+                step *= 2
+                high = low + step
+        else:
+            low, high = 0, start
+
+        # Invariante: low existiert (oder 0), high existiert nicht
+        while high - low > 1:
+            mid = (low + high) // 2
+            if self.check_protocol_exists(mid):
+                low = mid
+            else:
+                high = mid
+
+        return low
+
+    def _conditional_headers(self, protocol_id: str, pdf_path: Path) -> Dict[str, str]:
+        """Validatoren für einen bedingten Request (ETag/Last-Modified)"""
+        if not pdf_path.exists():
+            return {}
+        headers = {}
+        entry = self.catalog.get(protocol_id) or {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        if not headers:
+            # Ältere Downloads ohne Validatoren: Änderungszeit der Datei verwenden
+            headers["If-Modified-Since"] = formatdate(pdf_path.stat().st_mtime, usegmt=True)
+        return headers
 
     def download_protocol(self, number: int) -> Optional[Path]:
         """Lädt ein spezifisches Protokoll herunter"""
         protocol_id = f"{self.WAHLPERIODE}{number:03d}"
         pdf_path = self.pdf_dir / f"{protocol_id}.pdf"
-        
-        # Überspringe wenn bereits heruntergeladen
-        if pdf_path.exists():
-            logging.info(f"Protokoll {protocol_id} bereits vorhanden")
-            return pdf_path
-            
-        url = f"{self.BASE_URL}{protocol_id}.pdf"
-        
+        tmp_path = pdf_path.with_suffix(".pdf.part")
+        url = self.protocol_url(protocol_id)
+
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            
-            pdf_path.write_bytes(response.content)
-            
-            # Aktualisiere Metadata
-            self.metadata["protocols"][protocol_id] = {
-                "number": number,
-                "downloaded_at": datetime.now().isoformat(),
-                "file_path": str(pdf_path.relative_to(self.base_dir)),
-                "processed": False
-            }
-            self._save_metadata()
-            
-            logging.info(f"Protokoll {protocol_id} erfolgreich heruntergeladen")
-            return pdf_path
-            
+            with span("download", protocol_id=protocol_id) as download_span:
+                return self._download(protocol_id, number, url, pdf_path, tmp_path, download_span)
         except Exception as e:
             logging.error(f"Fehler beim Download von Protokoll {protocol_id}: {e}")
+            count("download.errors")
+            tmp_path.unlink(missing_ok=True)
             return None
 
+    def _download(self, protocol_id: str, number: int, url: str, pdf_path: Path, tmp_path: Path,
+                  download_span) -> Path:
+        started = time.perf_counter()
+        headers = self._conditional_headers(protocol_id, pdf_path)
+        with self.session.get(url, headers=headers, stream=True, timeout=self.TIMEOUT) as response:
+            download_span.set(status=response.status_code)
+            count("download.requests", status=str(response.status_code))
+            # Überspringe wenn unverändert
+            if response.status_code == 304:
+                logging.info(f"Protokoll {protocol_id} unverändert")
+                return pdf_path
+            response.raise_for_status()
+
+            # Gestreamt in eine temporäre Datei schreiben und atomar umbenennen
+            digest = hashlib.sha256()
+            size = 0
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, pdf_path)
+        download_span.set(bytes=size)
+        count("download.bytes", size)
+
+        # Katalog aktualisieren (eine kleine Transaktion statt die ganze Datei neu zu schreiben)
+        self.catalog.record_download(
+            protocol_id,
+            number=number,
+            file_path=str(pdf_path.relative_to(self.base_dir)),
+            size_bytes=size,
+            sha256=digest.hexdigest(),
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            download_seconds=time.perf_counter() - started,
+        )
+
+        logging.info(f"Protokoll {protocol_id} erfolgreich heruntergeladen")
+        return pdf_path
+
+    def download_protocols(self, numbers: Iterable[int]) -> List[Path]:
+        """Lädt mehrere Protokolle parallel über den gemeinsamen Verbindungspool"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(self.download_protocol, numbers))
+        return [path for path in results if path]
+
     def download_latest_protocols(self, limit: int = 10) -> List[Path]:
         """Lädt die neuesten N Protokolle herunter"""
         latest = self.find_latest_protocol()
         start = max(1, latest - limit + 1)
-        
-        downloaded = []
-        for number in range(start, latest + 1):
-            if path := self.download_protocol(number):
-                downloaded.append(path)
-                
-        return downloaded
+        return self.download_protocols(range(start, latest + 1))
 
 def main():
     # Basis-Verzeichnis ist das Root-Verzeichnis des Projekts
     base_dir = Path(__file__).resolve().parent.parent
-    
+
     downloader = ProtocolDownloader(base_dir)
-    
+
     # Finde und lade die 10 neuesten Protokolle
     latest = downloader.find_latest_protocol()
     logging.info(f"Neuestes Protokoll: {latest}")
-    
+
     downloaded = downloader.download_latest_protocols(10)
     logging.info(f"{len(downloaded)} Protokolle heruntergeladen")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
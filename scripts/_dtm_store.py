@@ -0,0 +1,174 @@
+import hashlib
+import json
+import logging
+import os
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from scipy import sparse
+
+from _protocol_store import BASE_DIR
+
+DTM_DIR = BASE_DIR / "data" / "dtm"
+
+
+def tokens_hash(tokens: Sequence[str]) -> str:
+    return hashlib.sha256(" ".join(tokens).encode("utf-8")).hexdigest()
+
+
+class DocumentTermStore:
+    """Persistente Dokument-Term-Matrix mit wachsendem Vokabular
+
+    Jeder Aufruf von add_documents() schreibt ein eigenes CSR-Segment
+    (data/indices/indptr als .npy, per Memory-Mapping lesbar) und hängt neue
+    Terme an vocabulary.txt an. Ein Update kostet damit nur O(Größe der neuen
+    Sitzungen). Die df-Schwellen (min_df/max_df) werden erst beim Abfragen
+    der Matrix angewendet, es wird nie neu gefittet.
+    """
+
+    def __init__(self, root: Path = DTM_DIR):
+        self.root = Path(root)
+        self.segment_dir = self.root / "segments"
+        self.segment_dir.mkdir(parents=True, exist_ok=True)
+        self.vocabulary_file = self.root / "vocabulary.txt"
+        self.documents_file = self.root / "documents.jsonl"
+
+        self.vocabulary: List[str] = []
+        self.term_ids: Dict[str, int] = {}
+        if self.vocabulary_file.exists():
+            with open(self.vocabulary_file, "r", encoding="utf-8") as f:
+                self.vocabulary = f.read().split("\n")[:-1]
+            self.term_ids = {term: i for i, term in enumerate(self.vocabulary)}
+
+        # doc_id -> {"hash", "segment", "row"}; spätere Einträge ersetzen frühere
+        self.documents: Dict[str, Dict] = {}
+        if self.documents_file.exists():
+            with open(self.documents_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.documents[entry["doc_id"]] = entry
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.documents
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def has(self, doc_id: str, doc_hash: str) -> bool:
+        """Ist das Dokument in genau dieser Fassung bereits gespeichert?"""
+        entry = self.documents.get(doc_id)
+        return entry is not None and entry["hash"] == doc_hash
+
+    def _segments(self) -> List[str]:
+        return sorted(path.name for path in self.segment_dir.iterdir()
+                      if path.is_dir() and not path.name.startswith("."))
+
+    def add_documents(self, documents: Iterable[Tuple[str, Sequence[str]]]) -> int:
+        """Hängt (doc_id, Token) als neues Segment an; unveränderte Dokumente werden übersprungen"""
+        indptr = [0]
+        indices: List[int] = []
+        counts: List[int] = []
+        new_terms: List[str] = []
+        entries = []
+
+        for doc_id, tokens in documents:
+            doc_hash = tokens_hash(tokens)
+            if self.has(doc_id, doc_hash):
+                continue
+            row = {}
+            for term, count in Counter(tokens).items():
+                term_id = self.term_ids.get(term)
+                if term_id is None:
+                    term_id = len(self.vocabulary)
+                    self.term_ids[term] = term_id
+                    self.vocabulary.append(term)
+                    new_terms.append(term)
+                row[term_id] = count
+            for term_id in sorted(row):
+                indices.append(term_id)
+                counts.append(row[term_id])
+            indptr.append(len(indices))
+            entries.append({"doc_id": doc_id, "hash": doc_hash, "row": len(entries)})
+
+        if not entries:
+            return 0
+
+        segments = self._segments()
+        segment = f"{int(segments[-1]) + 1 if segments else 0:06d}"
+        tmp_dir = self.segment_dir / f".{segment}.tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        np.save(tmp_dir / "data.npy", np.asarray(counts, dtype=np.int32))
+        np.save(tmp_dir / "indices.npy", np.asarray(indices, dtype=np.int32))
+        np.save(tmp_dir / "indptr.npy", np.asarray(indptr, dtype=np.int64))
+        (tmp_dir / "shape.json").write_text(json.dumps([len(entries), len(self.vocabulary)]))
+
+        # Vokabular und Dokumentliste nur anhängen, nie neu schreiben
+        with open(self.vocabulary_file, "a", encoding="utf-8") as f:
+            f.writelines(term + "\n" for term in new_terms)
+        os.replace(tmp_dir, self.segment_dir / segment)
+        with open(self.documents_file, "a", encoding="utf-8") as f:
+            for entry in entries:
+                entry["segment"] = segment
+                self.documents[entry["doc_id"]] = entry
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        logging.info(f"DTM: {len(entries)} Dokumente, {len(new_terms)} neue Terme (Segment {segment})")
+        return len(entries)
+
+    def _load_segment(self, segment: str) -> sparse.csr_matrix:
+        path = self.segment_dir / segment
+        n_rows, n_cols = json.loads((path / "shape.json").read_text())
+        matrix = sparse.csr_matrix(
+            (
+                np.load(path / "data.npy", mmap_mode="r"),
+                np.load(path / "indices.npy", mmap_mode="r"),
+                np.load(path / "indptr.npy", mmap_mode="r"),
+            ),
+            shape=(n_rows, n_cols),
+        )
+        # Ältere Segmente kennen spätere Terme noch nicht
+        matrix.resize((n_rows, len(self.vocabulary)))
+        return matrix
+
+    def rows(self, doc_ids: Sequence[str], terms: Optional[Sequence[str]] = None) -> sparse.csr_matrix:
+        """Zeilen der angegebenen Dokumente, ungefiltert oder auf eine feste Termliste abgebildet"""
+        if not doc_ids:
+            return sparse.csr_matrix((0, len(terms) if terms is not None else len(self.vocabulary)), dtype=np.int32)
+
+        # Zeilen segmentweise holen und danach in die gewünschte Reihenfolge bringen
+        by_segment = defaultdict(list)
+        for position, doc_id in enumerate(doc_ids):
+            entry = self.documents[doc_id]
+            by_segment[entry["segment"]].append((position, entry["row"]))
+        blocks = []
+        order: List[int] = []
+        for segment, items in sorted(by_segment.items()):
+            positions, rows = zip(*items)
+            blocks.append(self._load_segment(segment)[list(rows)])
+            order.extend(positions)
+        X = sparse.vstack(blocks, format="csr")[np.argsort(order)]
+        if terms is not None:
+            # Das Vokabular wächst nur, jeder frühere Term hat also noch seine ID
+            X = X[:, [self.term_ids[term] for term in terms]]
+        return X
+
+    def matrix(self, max_df: Union[int, float] = 1.0, min_df: Union[int, float] = 1,
+               doc_ids: Optional[Sequence[str]] = None) -> Tuple[sparse.csr_matrix, np.ndarray, List[str]]:
+        """Liefert (X, Terme, Dokument-IDs) mit df-Schwellen wie bei CountVectorizer"""
+        if doc_ids is None:
+            doc_ids = sorted(self.documents)
+        if not doc_ids:
+            return sparse.csr_matrix((0, 0), dtype=np.int32), np.array([], dtype=object), []
+        X = self.rows(doc_ids)
+
+        # df-Schwellen als Sicht auf die Matrix anwenden
+        n_docs = X.shape[0]
+        df = np.bincount(X.indices, minlength=X.shape[1])
+        max_count = max_df if isinstance(max_df, int) else max_df * n_docs
+        min_count = min_df if isinstance(min_df, int) else min_df * n_docs
+        keep = np.flatnonzero((df >= min_count) & (df <= max_count))
+
+        terms = np.asarray(self.vocabulary, dtype=object)[keep]
+        return X[:, keep], terms, list(doc_ids)
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+from _protocol_store import BASE_DIR
+
+EMBEDDING_DIR = BASE_DIR / "data" / "embeddings"
+
+
+def document_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Embedding-Cache pro Modell: Vektoren in einer memory-mapped .npy-Datei
+
+    ids.txt ordnet jedem Dokument-Hash (eine Zeile pro Vektor) seine Zeile zu
+    und wird nur angehängt. Die .npy-Datei wird bei Bedarf auf die doppelte
+    Kapazität vergrößert, ein Anhängen kostet also amortisiert O(neue Vektoren).
+    """
+
+    def __init__(self, model_name: str, root: Path = EMBEDDING_DIR, dtype: str = "float16"):
+        self.model_name = model_name
+        self.dtype = np.dtype(dtype)
+        self.dir = Path(root) / re.sub(r"[^\w.-]+", "_", model_name)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.vectors_file = self.dir / "vectors.npy"
+        self.ids_file = self.dir / "ids.txt"
+        self.meta_file = self.dir / "meta.json"
+
+        self.rows: Dict[str, int] = {}
+        if self.ids_file.exists():
+            with open(self.ids_file, "r", encoding="utf-8") as f:
+                for row, key in enumerate(f.read().split("\n")[:-1]):
+                    self.rows[key] = row
+        self._vectors = None
+        if self.vectors_file.exists():
+            self._vectors = np.load(self.vectors_file, mmap_mode="r+")
+            if len(self.rows) > self._vectors.shape[0]:
+                raise ValueError(f"{self.ids_file} enthält mehr Einträge als {self.vectors_file}")
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.rows
+
+    def _ensure_capacity(self, needed: int, dim: int):
+        if self._vectors is not None:
+            if self._vectors.shape[1] != dim:
+                raise ValueError(f"Dimension {dim} passt nicht zum Speicher ({self._vectors.shape[1]})")
+            if needed <= self._vectors.shape[0]:
+                return
+        capacity = max(needed, 1024, 2 * (self._vectors.shape[0] if self._vectors is not None else 0))
+        tmp_file = self.dir / "vectors.npy.tmp"
+        grown = np.lib.format.open_memmap(tmp_file, mode="w+", dtype=self.dtype, shape=(capacity, dim))
+        if self._vectors is not None:
+            grown[:len(self.rows)] = self._vectors[:len(self.rows)]
+        grown.flush()
+        del grown
+        os.replace(tmp_file, self.vectors_file)
+        self._vectors = np.load(self.vectors_file, mmap_mode="r+")
+        self.meta_file.write_text(json.dumps({"model": self.model_name, "dim": dim, "dtype": self.dtype.name}))
+
+    def add(self, keys: Sequence[str], vectors: np.ndarray):
+        """Hängt neue Vektoren an; bereits bekannte Schlüssel werden ignoriert"""
+        new = [(key, i) for i, key in enumerate(keys) if key not in self.rows]
+        if not new:
+            return
+        start = len(self.rows)
+        self._ensure_capacity(start + len(new), vectors.shape[1])
+        self._vectors[start:start + len(new)] = vectors[[i for _, i in new]].astype(self.dtype)
+        self._vectors.flush()
+        # Erst nach dem Schreiben der Vektoren die IDs anhängen
+        with open(self.ids_file, "a", encoding="utf-8") as f:
+            for offset, (key, _) in enumerate(new):
+                f.write(key + "\n")
+                self.rows[key] = start + offset
+
+    def get(self, keys: Sequence[str]) -> np.ndarray:
+        if not keys:
+            dim = self._vectors.shape[1] if self._vectors is not None else 0
+            return np.empty((0, dim), dtype=np.float32)
+        rows = [self.rows[key] for key in keys]
+        return np.asarray(self._vectors[rows], dtype=np.float32)
+
+    def embed(self, texts: Sequence[str], encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """Liefert Embeddings für alle Texte; nur unbekannte werden mit `encode` berechnet"""
+        keys = [document_key(text) for text in texts]
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self.rows and key not in missing:
+                missing[key] = text
+        if missing:
+            logging.info(f"Embeddings: {len(missing)} neu, {len(keys) - len(missing)} aus dem Cache")
+            self.add(list(missing), np.asarray(encode(list(missing.values()))))
+        return self.get(keys)
@@ -0,0 +1,308 @@
+"""Auswertung der Zwischenrufe: wer applaudiert wem, wer wird wie oft unterbrochen
+
+Jeder Zwischenruf-Block wie "(Beifall bei der SPD – Zuruf von der AfD: Unsinn!)"
+wird in einzelne Reaktionen zerlegt und nach Art und beteiligten Fraktionen
+klassifiziert. Die Ergebnisse werden pro Sitzung als spaltenweise Arrays
+vorberechnet und nur für neue oder geänderte Sitzungen aktualisiert:
+
+    applause.npy   int32 [Sitzung, applaudierende Fraktion, Fraktion des Redners]
+    reactions.npy  int32 [Sitzung, Reaktionsart, Fraktion (letzte Spalte: ohne)]
+    heckles_*.npy  Zwischenrufe pro Redner und Sitzung (Sitzung, Redner-ID, Anzahl)
+"""
+import hashlib
+import json
+import os
+import re
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from _protocol_parser import PARSER_VERSION, Interjection, ParsedProtocol, ProtocolParser
+from _protocol_store import BASE_DIR, list_sessions, protocol_path, read_header
+from _speaker_index import PARTIES, canonical_party, parties_in, roster_path
+
+STATS_DIR = BASE_DIR / "data" / "interjections"
+
+# Bei Änderungen an der Klassifikation erhöhen, damit alle Sitzungen neu ausgewertet werden
+CLASSIFIER_VERSION = "1"
+
+TYPES = ["beifall", "zuruf", "heiterkeit", "lachen", "widerspruch", "zustimmung", "unruhe", "sonstige"]
+# Reaktionen, die als Unterbrechung des Redners zählen
+HECKLE_TYPES = {"zuruf", "lachen", "widerspruch", "unruhe"}
+
+_TYPE_PATTERN = re.compile(r"^(Beifall|Zurufe?|Gegenrufe?|Heiterkeit|Lachen|Widerspruch|Zustimmung|Unruhe)\b")
+_TYPE_NAMES = {"Beifall": "beifall", "Zuruf": "zuruf", "Zurufe": "zuruf", "Gegenruf": "zuruf", "Gegenrufe": "zuruf",
+               "Heiterkeit": "heiterkeit", "Lachen": "lachen", "Widerspruch": "widerspruch",
+               "Zustimmung": "zustimmung", "Unruhe": "unruhe"}
+# Namentlicher Zwischenruf: "Dr. Anton Hofreiter [BÜNDNIS 90/DIE GRÜNEN]: Das stimmt nicht!"
+_NAMED_PATTERN = re.compile(r"^(?P<speaker>[^:\[\]]+?)\s*\[(?P<party>[^\]]+)\]\s*:")
+# Einzelne Reaktionen innerhalb eines Blocks sind durch Gedankenstriche getrennt
+_SEPARATOR = re.compile(r"\s+[–—]\s+")
+
+
+class Reaction(NamedTuple):
+    type: str
+    party: Optional[str]
+    speaker: Optional[str] = None
+
+
+def classify(content: str) -> List[Reaction]:
+    """Zerlegt einen Zwischenruf-Block in Reaktionen mit Art und Fraktion"""
+    reactions = []
+    for part in _SEPARATOR.split(content):
+        part = part.strip()
+        if not part:
+            continue
+        named = _NAMED_PATTERN.match(part)
+        if named:
+            reactions.append(Reaction("zuruf", canonical_party(named.group("party")), named.group("speaker")))
+            continue
+        match = _TYPE_PATTERN.match(part)
+        kind = _TYPE_NAMES[match.group(1)] if match else "sonstige"
+        # Nur die Zuschreibung vor dem Doppelpunkt zählt, nicht der zitierte Zuruf
+        attribution = part.split(":", 1)[0]
+        parties = parties_in(attribution)
+        if parties:
+            reactions.extend(Reaction(kind, party) for party in sorted(parties))
+        else:
+            reactions.append(Reaction(kind, None))
+    return reactions
+
+
+def _fingerprint(interjections: List[Interjection]) -> str:
+    digest = hashlib.sha256(CLASSIFIER_VERSION.encode())
+    for interjection in interjections:
+        digest.update(f"{interjection.target_speaker}|{interjection.target_party}|{interjection.content}\n".encode())
+    return digest.hexdigest()
+
+
+def _file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(session: str, roster_digest: str = "") -> str:
+    """Fingerabdruck der Eingaben einer Sitzung, ohne sie zu parsen
+
+    Für JSONL genügt die Kopfzeile (PDF-Hash, Extraktor-Version, Backend),
+    alte JSON-Dateien werden gehasht. Dazu kommen Klassifikator-, Parser-
+    und Namenslisten-Version.
+    """
+    path = protocol_path(session)
+    if path is None:
+        raise FileNotFoundError(f"Kein Protokoll {session}")
+    header = read_header(session) if path.suffix == ".jsonl" else {}
+    if header.get("sha256"):
+        source = f"{header['sha256']}:{header.get('extractor_version')}:{header.get('backend')}"
+    else:
+        source = _file_hash(path)
+    return f"{CLASSIFIER_VERSION}:{PARSER_VERSION}:{roster_digest}:{source}"
+
+
+def _save(path: Path, array: np.ndarray):
+    tmp_path = path.with_suffix(".tmp.npy")
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+class InterjectionStats:
+    """Inkrementell gepflegte Aggregate über alle Zwischenrufe"""
+
+    def __init__(self, root: Path = STATS_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        meta_path = self.root / "meta.json"
+        meta = json.loads(meta_path.read_text(encoding="utf-8")) if meta_path.exists() else {}
+        # Andere Achsen (Fraktionen, Reaktionsarten): Aggregate neu aufbauen
+        self._fresh = meta.get("parties") != PARTIES or meta.get("types") != TYPES
+        self.sittings: List[Dict] = [] if self._fresh else meta["sittings"]
+        self.index = {sitting["protocol_id"]: i for i, sitting in enumerate(self.sittings)}
+        self.by_session = {sitting.get("session"): i for i, sitting in enumerate(self.sittings)}
+        speakers_path = self.root / "speakers.txt"
+        self.speakers: List[str] = (
+            speakers_path.read_text(encoding="utf-8").split("\n")[:-1]
+            if not self._fresh and speakers_path.exists() else []
+        )
+        self.speaker_ids = {name: i for i, name in enumerate(self.speakers)}
+
+        n, p, t = len(self.sittings), len(PARTIES), len(TYPES)
+        self.applause = self._load("applause", np.zeros((n, p, p), np.int32))
+        self.reactions = self._load("reactions", np.zeros((n, t, p + 1), np.int32))
+        self.heckle_sitting = self._load("heckles_sitting", np.zeros(0, np.int32))
+        self.heckle_speaker = self._load("heckles_speaker", np.zeros(0, np.int32))
+        self.heckle_count = self._load("heckles_count", np.zeros(0, np.int32))
+
+    def _load(self, name: str, default: np.ndarray) -> np.ndarray:
+        path = self.root / f"{name}.npy"
+        return np.load(path) if not self._fresh and path.exists() else default
+
+    def _speaker_id(self, name: str) -> int:
+        speaker_id = self.speaker_ids.get(name)
+        if speaker_id is None:
+            speaker_id = self.speaker_ids[name] = len(self.speakers)
+            self.speakers.append(name)
+        return speaker_id
+
+    def is_current(self, session: str, source: str) -> bool:
+        """True, wenn die Sitzung mit diesen Eingaben schon ausgewertet ist (vor dem Parsen prüfbar)"""
+        row = self.by_session.get(session)
+        return row is not None and self.sittings[row].get("source") == source
+
+    def update(self, protocol: ParsedProtocol, session: Optional[str] = None, source: Optional[str] = None) -> bool:
+        """Wertet eine Sitzung aus; False, wenn sie unverändert schon enthalten ist"""
+        fingerprint = _fingerprint(protocol.interjections)
+        row = self.index.get(protocol.protocol_id)
+        if row is not None and self.sittings[row]["fingerprint"] == fingerprint:
+            # Eingaben geändert, Zwischenrufe gleich: nur den Quell-Fingerabdruck nachführen
+            self.sittings[row].update(session=session, source=source)
+            self.by_session[session] = row
+            return False
+
+        p = len(PARTIES)
+        party_index = {party: i for i, party in enumerate(PARTIES)}
+        type_index = {kind: i for i, kind in enumerate(TYPES)}
+        applause = np.zeros((p, p), np.int32)
+        reactions = np.zeros((len(TYPES), p + 1), np.int32)
+        heckles: Dict[str, int] = {}
+        for interjection in protocol.interjections:
+            target = party_index.get(canonical_party(interjection.target_party))
+            for reaction in classify(interjection.content):
+                source_party = party_index.get(reaction.party)
+                reactions[type_index[reaction.type], p if source_party is None else source_party] += 1
+                if reaction.type == "beifall" and source_party is not None and target is not None:
+                    applause[source_party, target] += 1
+                if reaction.type in HECKLE_TYPES and interjection.target_speaker:
+                    heckles[interjection.target_speaker] = heckles.get(interjection.target_speaker, 0) + 1
+
+        sitting = {"protocol_id": protocol.protocol_id, "date": protocol.date.date().isoformat(),
+                   "fingerprint": fingerprint, "session": session, "source": source}
+        if row is None:
+            row = self.index[protocol.protocol_id] = len(self.sittings)
+            self.sittings.append(sitting)
+            self.by_session[session] = row
+            self.applause = np.concatenate([self.applause, applause[None]])
+            self.reactions = np.concatenate([self.reactions, reactions[None]])
+        else:
+            self.sittings[row] = sitting
+            self.by_session[session] = row
+            self.applause[row] = applause
+            self.reactions[row] = reactions
+            # Alte Zwischenrufzahlen dieser Sitzung ersetzen
+            keep = self.heckle_sitting != row
+            self.heckle_sitting = self.heckle_sitting[keep]
+            self.heckle_speaker = self.heckle_speaker[keep]
+            self.heckle_count = self.heckle_count[keep]
+
+        names = sorted(heckles)
+        self.heckle_sitting = np.concatenate([self.heckle_sitting, np.full(len(names), row, np.int32)])
+        self.heckle_speaker = np.concatenate(
+            [self.heckle_speaker, np.array([self._speaker_id(name) for name in names], np.int32)])
+        self.heckle_count = np.concatenate([self.heckle_count, np.array([heckles[n] for n in names], np.int32)])
+        return True
+
+    def save(self):
+        _save(self.root / "applause.npy", self.applause)
+        _save(self.root / "reactions.npy", self.reactions)
+        _save(self.root / "heckles_sitting.npy", self.heckle_sitting)
+        _save(self.root / "heckles_speaker.npy", self.heckle_speaker)
+        _save(self.root / "heckles_count.npy", self.heckle_count)
+        (self.root / "speakers.txt").write_text("".join(f"{name}\n" for name in self.speakers), encoding="utf-8")
+        # Metadaten zuletzt: erst dann gelten die Arrays als vollständig
+        meta = {"parties": PARTIES, "types": TYPES, "sittings": self.sittings}
+        tmp_path = self.root / "meta.json.tmp"
+        tmp_path.write_text(json.dumps(meta, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp_path, self.root / "meta.json")
+
+    # --- Abfragen -------------------------------------------------------------
+
+    def _rows(self, since: Optional[date] = None, until: Optional[date] = None) -> np.ndarray:
+        dates = np.array([s["date"] for s in self.sittings], dtype="datetime64[D]")
+        mask = np.ones(len(dates), bool)
+        if since is not None:
+            mask &= dates >= np.datetime64(since, "D")
+        if until is not None:
+            mask &= dates <= np.datetime64(until, "D")
+        return np.flatnonzero(mask)
+
+    def applause_matrix(self, since: Optional[date] = None, until: Optional[date] = None) -> pd.DataFrame:
+        """Beifall: Zeilen = applaudierende Fraktion, Spalten = Fraktion des Redners"""
+        totals = self.applause[self._rows(since, until)].sum(axis=0)
+        return pd.DataFrame(totals, index=PARTIES, columns=PARTIES)
+
+    def reaction_counts(self, since: Optional[date] = None, until: Optional[date] = None) -> pd.DataFrame:
+        """Reaktionen nach Art (Zeilen) und Fraktion (Spalten)"""
+        totals = self.reactions[self._rows(since, until)].sum(axis=0)
+        return pd.DataFrame(totals, index=TYPES, columns=PARTIES + ["ohne Fraktion"])
+
+    def heckles(self, speakers: Optional[Iterable[str]] = None,
+                protocol_ids: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Unterbrechungen pro Redner und Sitzung"""
+        mask = np.ones(len(self.heckle_count), bool)
+        if speakers is not None:
+            ids = [self.speaker_ids[name] for name in speakers if name in self.speaker_ids]
+            mask &= np.isin(self.heckle_speaker, ids)
+        if protocol_ids is not None:
+            rows = [self.index[pid] for pid in protocol_ids if pid in self.index]
+            mask &= np.isin(self.heckle_sitting, rows)
+        sittings, speaker_ids, counts = self.heckle_sitting[mask], self.heckle_speaker[mask], self.heckle_count[mask]
+        return pd.DataFrame({
+            "Sitzung": [self.sittings[i]["protocol_id"] for i in sittings],
+            "Datum": [self.sittings[i]["date"] for i in sittings],
+            "Redner": [self.speakers[i] for i in speaker_ids],
+            "Zwischenrufe": counts,
+        })
+
+
+def update_all(sessions: Optional[List[str]] = None, root: Path = STATS_DIR) -> int:
+    """Wertet alle neuen oder geänderten Sitzungen aus und speichert die Aggregate
+
+    Ob eine Sitzung neu geparst werden muss, entscheidet source_fingerprint()
+    vorab; unveränderte Sitzungen werden gar nicht erst gelesen. Sitzungen, die
+    sich nicht parsen lassen, lösen nach dem Speichern der übrigen einen Fehler
+    aus, damit die Pipeline die Stufe nicht als erledigt markiert; beim nächsten
+    Lauf werden nur sie erneut versucht.
+    """
+    parser = None
+    stats = InterjectionStats(root)
+    roster = roster_path()
+    roster_digest = _file_hash(roster) if roster is not None else ""
+    updated = 0
+    failed = {}
+    for session in sessions or list_sessions():
+        source = source_fingerprint(session, roster_digest)
+        if stats.is_current(session, source):
+            continue
+        parser = parser or ProtocolParser()
+        try:
+            protocol = parser.parse_session(session)
+        except ValueError as e:
+            print(f"⚠️ Sitzung {session} übersprungen: {e}")
+            failed[session] = str(e)
+            continue
+        if stats.update(protocol, session, source):
+            updated += 1
+    stats.save()
+    if failed:
+        raise RuntimeError(f"{len(failed)} Sitzungen nicht ausgewertet: {', '.join(sorted(failed))}")
+    return updated
+
+
+def main():
+    updated = update_all()
+    stats = InterjectionStats()
+    print(f"✅ {updated} Sitzungen neu ausgewertet, {len(stats.sittings)} insgesamt")
+    print("👏 Beifall (Zeile applaudiert Spalte):")
+    print(stats.applause_matrix())
+    print("📢 Meiste Unterbrechungen:")
+    heckles = stats.heckles()
+    print(heckles.groupby("Redner")["Zwischenrufe"].sum().sort_values(ascending=False).head(10))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import openai
+from openai import AsyncOpenAI
+
+from _protocol_store import BASE_DIR
+from _tracing import count, span
+
+CACHE_DIR = BASE_DIR / "data" / "cache" / "llm"
+
+SYSTEM_PROMPT = "Du bist ein NLP-Experte für Bundestagsdebatten."
+MAP_PROMPT = (
+    "Fasse die in diesem Abschnitt einer Bundestagsdebatte behandelten Themen "
+    "in wenigen Stichpunkten zusammen:\n{text}"
+)
+MERGE_PROMPT = (
+    "Hier sind Stichpunkte zu mehreren Abschnitten einer Bundestagsdebatte. "
+    "Führe sie zu einer gemeinsamen, knappen Stichpunktliste zusammen und "
+    "fasse doppelte Themen zusammen:\n{text}"
+)
+REDUCE_PROMPT = (
+    "Hier sind Stichpunkte zu den Abschnitten einer Bundestagsdebatte. "
+    "Extrahiere daraus die Hauptthemen der gesamten Sitzung:\n{text}"
+)
+
+# Abschnittsgrenzen: neue Tagesordnungs- oder Zusatzpunkte
+_AGENDA_PATTERN = re.compile(r"^(?:Tagesordnungspunkt|Zusatzpunkt)\s+\d+", re.MULTILINE)
+
+_RETRYABLE = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    """Token-Bucket-Ratenbegrenzung für asyncio (z. B. Requests oder Tokens pro Minute)"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1.0):
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class ResponseCache:
+    """Inhaltsadressierter Cache: eine JSON-Datei pro (Modell, Prompt, Text-Hash)"""
+
+    def __init__(self, cache_dir: Path = CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(model: str, messages: List[Dict[str, str]]) -> str:
+        payload = json.dumps({"model": model, "messages": messages}, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.cache_dir / f"{key}.json"
+        if path.exists():
+            return json.loads(path.read_text(encoding="utf-8"))["content"]
+        return None
+
+    def put(self, key: str, content: str):
+        path = self.cache_dir / f"{key}.json"
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        tmp_path.write_text(json.dumps({"content": content}, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+def split_agenda_items(text: str, max_chars: int = 12000) -> List[str]:
+    """Teilt den Sitzungstext an Tagesordnungspunkten und fasst kleine Abschnitte
+    bis max_chars zusammen; zu große Abschnitte werden zeilenweise geteilt"""
+    starts = [0] + [m.start() for m in _AGENDA_PATTERN.finditer(text) if m.start() > 0] + [len(text)]
+    sections = [text[a:b] for a, b in zip(starts, starts[1:]) if text[a:b].strip()]
+
+    chunks: List[str] = []
+    current = ""
+    for section in sections:
+        while len(section) > max_chars:
+            cut = section.rfind("\n", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(section[:cut])
+            section = section[cut:]
+        if len(current) + len(section) > max_chars and current:
+            chunks.append(current)
+            current = ""
+        current += section
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
+class LLMEngine:
+    """Nebenläufige Chat-Completions mit Begrenzung, Retry und Antwort-Cache"""
+
+    def __init__(self, client: AsyncOpenAI, model: str = "gpt-4o", max_concurrency: int = 8,
+                 requests_per_minute: float = 500, tokens_per_minute: float = 30000,
+                 max_retries: int = 5, cache: Optional[ResponseCache] = None):
+        self.client = client
+        self.model = model
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.cache = cache or ResponseCache()
+        self.calls = 0
+        self.cache_hits = 0
+
+    async def complete(self, prompt: str) -> str:
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+        key = self.cache.key(self.model, messages)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            count("llm.requests", source="cache")
+            return cached
+
+        async with self.semaphore:
+            with span("llm.complete", model=self.model, prompt_chars=len(prompt)):
+                for attempt in range(self.max_retries + 1):
+                    await self.request_bucket.acquire()
+                    await self.token_bucket.acquire(len(prompt) / 4)  # grobe Token-Schätzung
+                    try:
+                        response = await self.client.chat.completions.create(model=self.model, messages=messages)
+                        break
+                    except _RETRYABLE as e:
+                        count("llm.retries", error=e.__class__.__name__)
+                        if attempt == self.max_retries:
+                            raise
+                        delay = min(60.0, 2 ** attempt) + random.uniform(0, 1)
+                        logging.warning(f"LLM-Fehler ({e.__class__.__name__}), neuer Versuch in {delay:.1f}s")
+                        await asyncio.sleep(delay)
+
+        self.calls += 1
+        count("llm.requests", source="api")
+        content = response.choices[0].message.content
+        self.cache.put(key, content)
+        return content
+
+    async def extract_topics(self, text: str) -> str:
+        """Einzelner Aufruf über den (gekürzten) Anfang der Sitzung"""
+        return await self.complete(f"Extrahiere die Hauptthemen dieser Bundestagsdebatte:\n{text}")
+
+    async def map_reduce_topics(self, text: str, max_chars: int = 12000) -> str:
+        """Map: Abschnitte parallel zusammenfassen, Reduce: Zusammenfassungen vereinen"""
+        chunks = split_agenda_items(text, max_chars)
+        summaries = await asyncio.gather(*(self.complete(MAP_PROMPT.format(text=chunk)) for chunk in chunks))
+
+        # Falls die Zusammenfassungen selbst zu lang sind, stufenweise zu Stichpunkten vereinen
+        for _ in range(3):
+            if len(summaries) <= 1 or sum(len(s) for s in summaries) <= max_chars:
+                break
+            groups = split_agenda_items("\n\n".join(summaries), max_chars)
+            summaries = await asyncio.gather(*(self.complete(MERGE_PROMPT.format(text=g)) for g in groups))
+        return await self.complete(REDUCE_PROMPT.format(text="\n\n".join(summaries)))
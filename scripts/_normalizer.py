@@ -0,0 +1,174 @@
+"""Tokenisierung und Normalisierung deutscher Protokolltexte
+
+Alle Analyseskripte verwenden dieselbe Tokenisierung:
+
+- Silbentrennung am Zeilenende wird aufgelöst ("Tagesord-\\nnung" -> "Tagesordnung"),
+  Bindestrich-Komposita bleiben erhalten ("Klimaschutz-Gesetz" -> "klimaschutz-gesetz"),
+- Zahlen bleiben erhalten ("2025", "1.000", "CO2-Preis"),
+- ein vorkompiliertes Muster, ein findall-Durchlauf pro Text,
+- optional Lemmatisierung über eine LRU-gecachte Nachschlagefunktion,
+- jede Oberflächenform wird nur einmal aufgelöst und danach aus einem Dictionary bedient,
+- Ausgabe als Token-IDs in array("I") (encode/encode_batch) oder als Strings (tokens).
+
+Token-Cache und Dokument-Term-Matrix speichern Terme als Strings: die
+Token-Stufe läuft parallel in mehreren Prozessen, ein gemeinsamer ID-Raum
+müsste dort über Prozessgrenzen hinweg vergeben werden. Die IDs eines
+Normalizers gelten daher nur innerhalb eines Prozesses; dauerhafte IDs
+vergibt die DTM beim (seriellen) Anhängen.
+"""
+import re
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Bei Änderungen an der Tokenisierung erhöhen (Token-Cache, Suchindex und Modelle hängen daran)
+TOKENIZER_VERSION = "3"
+
+# Trennstriche: "-" sowie die Silbentrennungs-Markierungen von pdfium ("\x02", "\ufffe")
+_HYPHENS = "-\x02\ufffe"
+# Trennstrich am Zeilenende vor Kleinbuchstabe: Silbentrennung, wird entfernt
+# (beginnt mit einer Zeichenklasse, damit re schnell vorspulen kann; Buchstabe davor per Lookbehind)
+_SOFT_HYPHEN = re.compile(rf"[{_HYPHENS}](?<=[^\W\d_].)[ \t\r]*\n\s*(?=[a-zäöüß])")
+# Trennstrich am Zeilenende vor Großbuchstabe: Kompositum, Bindestrich bleibt
+_COMPOUND_BREAK = re.compile(rf"[{_HYPHENS}][ \t\r]*\n\s*")
+# Zahlen mit Tausender-/Dezimaltrennern oder Wörter (Buchstaben/Ziffern) mit Bindestrich-Teilen
+_TOKEN = re.compile(r"\d+(?:[.,]\d+)+|\w+(?:-\w+)*")
+
+Lemmatizer = Callable[[str], str]
+
+
+def tokenize(text: str) -> List[str]:
+    """Kleingeschriebene Token in Textreihenfolge (ohne Stopword-Filter, z. B. für die Suche)"""
+    text = _COMPOUND_BREAK.sub("-", _SOFT_HYPHEN.sub("", text))
+    return _TOKEN.findall(text.lower())
+
+
+def load_lemma_table(path: Path) -> Dict[str, str]:
+    """Lemma-Tabelle als TSV: Wortform<TAB>Lemma (eine Zeile pro Form)"""
+    table = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            form, _, lemma = line.rstrip("\n").partition("\t")
+            if form and lemma and not form.startswith("#"):
+                table[form.lower()] = lemma.lower()
+    return table
+
+
+def spacy_lemmatizer(model: str = "de_core_news_sm") -> Lemmatizer:
+    """Lemmatisierung einzelner Wortformen mit spaCy (optionale Abhängigkeit)"""
+    import spacy
+    nlp = spacy.load(model, disable=["parser", "ner"])
+    return lambda word: nlp(word)[0].lemma_.lower()
+
+
+def load_lemmatizer(spec: Optional[str]) -> Optional[Lemmatizer]:
+    """None/"none": keine Lemmatisierung, "spacy[:modell]" oder Pfad zu einer TSV-Tabelle"""
+    if not spec or spec == "none":
+        return None
+    if spec.startswith("spacy"):
+        _, _, model = spec.partition(":")
+        return spacy_lemmatizer(model or "de_core_news_sm")
+    table = load_lemma_table(Path(spec))
+    return lambda word: table.get(word, word)
+
+
+class Vocabulary:
+    """Token <-> ID; IDs werden nur angehängt und bleiben stabil"""
+
+    def __init__(self, terms: Iterable[str] = ()):
+        self.terms: List[str] = []
+        self.ids: Dict[str, int] = {}
+        for term in terms:
+            self.add(term)
+
+    def add(self, term: str) -> int:
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = self.ids[term] = len(self.terms)
+            self.terms.append(term)
+        return term_id
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        terms = self.terms
+        return [terms[i] for i in ids]
+
+    def save(self, path: Path):
+        Path(path).write_text("".join(f"{term}\n" for term in self.terms), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path) -> "Vocabulary":
+        path = Path(path)
+        if not path.exists():
+            return cls()
+        return cls(path.read_text(encoding="utf-8").split("\n")[:-1])
+
+
+class Normalizer:
+    """Text -> normalisierte Token bzw. Token-IDs mit Stopword-Filter und optionaler Lemmatisierung
+
+    Jede Oberflächenform wird nur einmal aufgelöst (Stopword-Prüfung, Lemma,
+    Vokabular) und danach aus einem Dictionary bedient; die Lemmatisierung
+    selbst ist zusätzlich per LRU gecacht.
+    """
+
+    def __init__(self, stopwords: Set[str] = frozenset(), lemmatizer: Optional[Lemmatizer] = None,
+                 vocabulary: Optional[Vocabulary] = None, min_length: int = 2, lemma_cache_size: int = 1 << 16):
+        self.stopwords = stopwords
+        self.vocabulary = vocabulary or Vocabulary()
+        self.min_length = min_length
+        self._lemma = lru_cache(maxsize=lemma_cache_size)(lemmatizer) if lemmatizer else None
+        self._surface: Dict[str, str] = {}  # Oberflächenform -> Term oder "" (verworfen)
+        self._surface_ids: Dict[str, int] = {}  # Oberflächenform -> Token-ID oder -1 (verworfen)
+
+    def _resolve(self, token: str) -> str:
+        term = ""
+        if len(token) >= self.min_length and token not in self.stopwords:
+            term = self._lemma(token) if self._lemma else token
+            if term in self.stopwords:
+                term = ""
+        self._surface[token] = term
+        return term
+
+    def tokens(self, text: str) -> List[str]:
+        """Normalisierte Token eines Texts in Textreihenfolge"""
+        tokens = tokenize(text)
+        # Bekannte Formen per map/filter auf C-Ebene; nur neue Formen laufen durch Python
+        terms = list(map(self._surface.get, tokens))
+        if None in terms:
+            resolve = self._resolve
+            terms = [resolve(token) if term is None else term for term, token in zip(terms, tokens)]
+        return list(filter(None, terms))
+
+    def _resolve_id(self, token: str) -> int:
+        term = self._surface.get(token)
+        if term is None:
+            term = self._resolve(token)
+        term_id = self.vocabulary.add(term) if term else -1
+        self._surface_ids[token] = term_id
+        return term_id
+
+    def encode(self, text: str) -> array:
+        """Token-IDs eines Texts in Textreihenfolge"""
+        tokens = tokenize(text)
+        term_ids = list(map(self._surface_ids.get, tokens))
+        if None in term_ids:
+            resolve = self._resolve_id
+            term_ids = [resolve(token) if term_id is None else term_id for term_id, token in zip(term_ids, tokens)]
+        return array("I", filter((-1).__ne__, term_ids))
+
+    def encode_batch(self, texts: Iterable[str]) -> Tuple[array, array]:
+        """Viele Texte auf einmal: alle IDs hintereinander plus Offsets (Dokument i = ids[offsets[i]:offsets[i+1]])"""
+        ids = array("I")
+        offsets = array("Q", [0])
+        for text in texts:
+            ids.extend(self.encode(text))
+            offsets.append(len(ids))
+        return ids, offsets
+
+    @property
+    def lemma_cache_info(self):
+        return self._lemma.cache_info() if self._lemma else None
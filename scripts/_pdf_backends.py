@@ -0,0 +1,367 @@
+"""Austauschbare PDF-Backends mit spaltenweiser Textextraktion
+
+Die Plenarprotokolle sind zweispaltig gesetzt; ein generisches extract_text()
+liest Zeilen quer über beide Spalten. Hier werden stattdessen die Wörter
+einer Seite analysiert:
+
+- Kopf- und Fußzeile (laufender Seitenkopf mit Seitenzahl und Rednername)
+  werden abgeschnitten, außer auf der Titelseite (dort steht die Protokoll-ID),
+- die Spaltenfuge wird aus der Verteilung der Wörter bestimmt,
+- Bereiche, die über die Fuge reichen (Titelblock, breite Tabellen), bleiben ganz,
+- alle anderen Streifen werden erst links, dann rechts gelesen,
+- Randmarken (A)–(D) und Inhaltsverzeichnisseiten fallen weg.
+
+Backends liefern nur Seitengröße und die Zeichen mit ihrer Position. Wörter,
+Zeilen und Spalten werden für alle Backends gleich gebildet, damit pypdfium2
+und pdfplumber denselben Seitentext liefern. pypdfium2 ist deutlich schneller;
+pdfplumber dient als Fallback.
+"""
+import os
+import re
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+Char = Tuple[str, float, float, float, float]  # Zeichen, x0, top, x1, bottom
+# x0, top, x1, bottom, Text; x1 ist der Ursprung des letzten Zeichens: die Ursprünge
+# sind in beiden Backends gleich, die rechten Glyphkanten nicht (bis ~1 pt bei "f")
+Word = Tuple[float, float, float, float, str]
+
+DEFAULT_BACKEND = os.environ.get("BUNDESTAG_PDF_BACKEND", "auto")
+
+# Randmarken am Anfang oder Ende einer Spaltenzeile bzw. allein in einer Zeile
+_MARGIN_MARKER = re.compile(r"^(?:\([A-D]\)\s*)+|\s*(?:\([A-D]\)\s*)+$")
+# Inhaltsverzeichnis: Punktleiter mit Seitenverweis, z. B. ". . . . 27025 A"
+_TOC_ENTRY = re.compile(r"(?:\.\s*){3,}\s*\d{4,5}\s*[A-D](?:,\s*\d{4,5}\s*[A-D])*\s*$")
+_TOC_START = re.compile(r"^Inhalt:\s*$", re.MULTILINE)
+_ROMAN_PAGE_NUMBER = re.compile(r"[IVXL]+")
+# Randmarken neben der ersten Zeile des Fließtexts (linke bzw. rechte Spalte)
+_TOP_MARKERS = ("(A)", "(C)")
+# Höchster Abstand der Unterkanten (pt) für dieselbe Zeile; Tabellenspalten mit
+# versetzten Zeilen liegen bereits wenige Punkte auseinander
+BASELINE_TOLERANCE = 1.0
+TOC_SHARE = 0.3  # Anteil der Zeilen mit Seitenverweis, ab dem eine Seite als Inhaltsverzeichnis gilt
+
+# pdfium meldet den Trennstrich am Zeilenende als \x02 (bzw. \ufffe) statt "-"
+_PDFIUM_HYPHENS = {"\x02": "-", "\ufffe": "-"}
+
+
+# --- Backends -------------------------------------------------------------------
+
+class PdfiumPage:
+    def __init__(self, page, index: int):
+        self._page = page
+        self.index = index
+        self.width, self.height = page.get_size()
+        self._textpage = page.get_textpage()
+
+    def chars(self) -> List[Char]:
+        import ctypes
+        import pypdfium2.raw as pdfium_c
+        textpage, raw, height = self._textpage, self._textpage.raw, self.height
+        n = textpage.count_chars()
+        # Ein Aufruf für den ganzen Text; Indizes entsprechen den Zeichen, solange
+        # keine Ersatzpaare vorkommen (sonst zeichenweise)
+        text = textpage.get_text_range()
+        if len(text) != n:
+            text = "".join(chr(pdfium_c.FPDFText_GetUnicode(raw, i)) for i in range(n))
+        rect = pdfium_c.FS_RECTF()
+        rect_ref = ctypes.byref(rect)
+        origin_x, origin_y = ctypes.c_double(), ctypes.c_double()
+        origin_x_ref, origin_y_ref = ctypes.byref(origin_x), ctypes.byref(origin_y)
+        chars = []
+        for i, char in enumerate(text):
+            # Von pdfium eingefügte Zeichen sind nur Zeilenumbrüche; als Leerraum trennen sie Wörter wie die Geometrie
+            pdfium_c.FPDFText_GetLooseCharBox(raw, i, rect_ref)
+            # Linke Kante am Ursprung wie bei pdfplumber; die Box reicht bei "j" oder "f" weiter nach links
+            pdfium_c.FPDFText_GetCharOrigin(raw, i, origin_x_ref, origin_y_ref)
+            chars.append((_PDFIUM_HYPHENS.get(char, char), origin_x.value, height - rect.top, rect.right,
+                          height - rect.bottom))
+        return chars
+
+    def close(self):
+        self._textpage.close()
+        self._page.close()
+
+
+class PdfiumDocument:
+    name = "pdfium"
+
+    def __init__(self, path: Path):
+        import pypdfium2
+        self._pdf = pypdfium2.PdfDocument(str(path))
+
+    def __len__(self) -> int:
+        return len(self._pdf)
+
+    def page(self, index: int) -> PdfiumPage:
+        return PdfiumPage(self._pdf[index], index)
+
+    def close(self):
+        self._pdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class PlumberPage:
+    def __init__(self, page, index: int):
+        self._page = page
+        self.index = index
+        self.width, self.height = page.width, page.height
+
+    def chars(self) -> List[Char]:
+        return [(c["text"], c["x0"], c["top"], c["x1"], c["bottom"]) for c in self._page.chars]
+
+    def close(self):
+        # Zeichen- und Layout-Caches der Seite sofort freigeben
+        self._page.close()
+
+
+class PlumberDocument:
+    name = "pdfplumber"
+
+    def __init__(self, path: Path):
+        import pdfplumber
+        self._pdf = pdfplumber.open(path)
+
+    def __len__(self) -> int:
+        return len(self._pdf.pages)
+
+    def page(self, index: int) -> PlumberPage:
+        return PlumberPage(self._pdf.pages[index], index)
+
+    def close(self):
+        self._pdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+BACKENDS = {"pdfium": PdfiumDocument, "pdfplumber": PlumberDocument}
+
+
+def resolve_backend(name: Optional[str] = None) -> str:
+    """Wählt das Backend; "auto" nimmt pypdfium2, falls installiert, sonst pdfplumber"""
+    name = name or DEFAULT_BACKEND
+    if name != "auto":
+        if name not in BACKENDS:
+            raise ValueError(f"Unbekanntes PDF-Backend: {name} (verfügbar: {', '.join(BACKENDS)})")
+        return name
+    try:
+        import pypdfium2  # noqa: F401
+        return "pdfium"
+    except ImportError:
+        return "pdfplumber"
+
+
+def open_pdf(path: Path, backend: Optional[str] = None):
+    return BACKENDS[resolve_backend(backend)](path)
+
+
+# --- Layout-Analyse ---------------------------------------------------------------
+
+def _words(chars: List[Char]) -> List[Word]:
+    """Fasst Zeichen in Inhaltsreihenfolge zu Wörtern zusammen
+
+    Ein Wort endet an Leerraum, an einem Zeilenwechsel (andere Unterkante) und
+    an einer Lücke oder einem Rücksprung vor den Wortanfang (überlappende
+    Zeichenboxen wie bei "ff" gehören zum Wort).
+    """
+    words = []
+    text: List[str] = []
+    w_x0 = w_top = w_x1 = w_bottom = w_right = gap = 0.0
+    for char, x0, top, x1, bottom in chars:
+        if text and (char.isspace() or abs(bottom - w_bottom) > BASELINE_TOLERANCE
+                     or not w_x0 <= x0 <= w_right + gap):
+            words.append((w_x0, w_top, w_x1, w_bottom, "".join(text)))
+            text = []
+        if char.isspace():
+            continue
+        if text:
+            w_top = min(w_top, top)
+            w_x1 = max(w_x1, x0)
+            w_right = max(w_right, x1)
+        else:
+            w_x0, w_top, w_x1, w_bottom, w_right = x0, top, x0, bottom, x1
+        text.append(char)
+        gap = 0.25 * (bottom - top)
+    if text:
+        words.append((w_x0, w_top, w_x1, w_bottom, "".join(text)))
+    return words
+
+
+def _group_lines(words: List[Word]) -> List[List[Word]]:
+    """Wörter zu Zeilen (von oben nach unten, jeweils von links nach rechts)
+
+    Verglichen wird die Unterkante: die Oberkante hängt vom Backend ab (Glyph-
+    bzw. Schriftbox), die Unterkante nicht. Eine relative Toleranz würde daher
+    je nach Backend anders entscheiden.
+    """
+    lines: List[List[Word]] = []
+    line_bottom = 0.0
+    for word in sorted(words, key=lambda w: (w[3], w[0])):
+        if lines and word[3] - line_bottom <= BASELINE_TOLERANCE:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+            line_bottom = word[3]
+    return [sorted(line) for line in lines]
+
+
+def _content_band(words: List[Word], height: float, header: bool = True,
+                  margin: float = 0.1) -> Tuple[float, float]:
+    """Vertikaler Inhaltsbereich ohne Kopf- und Fußzeile
+
+    Der Fließtext beginnt auf Höhe der obersten Randmarke (A) bzw. (C); alles
+    darüber (Kopfzeile mit Seitenzahl, Rednername über der Spalte) gehört zum
+    Seitenkopf. Ohne Randmarken gilt die oberste Zeile im oberen Seitenrand als
+    Kopfzeile, wenn darunter ein deutlicher Abstand folgt (analog für die
+    Fußzeile). Seiten ohne solche Zeilen behalten ihren gesamten Text.
+    """
+    if not words:
+        return 0.0, height
+    word_height = sorted(w[3] - w[1] for w in words)[len(words) // 2]
+    lines = [(min(w[1] for w in line), max(w[3] for w in line)) for line in _group_lines(words)]
+
+    top = 0.0
+    if header:
+        markers = [w[1] for w in words if w[4] in _TOP_MARKERS and w[1] < height * 1.5 * margin]
+        if markers:
+            top = min(markers) - BASELINE_TOLERANCE
+        elif len(lines) > 1 and lines[0][1] < height * margin and lines[1][0] - lines[0][1] > 0.8 * word_height:
+            top = (lines[0][1] + lines[1][0]) / 2
+
+    bottom = height
+    for (y0, y1), preceding in zip(reversed(lines), reversed(lines[:-1])):
+        if y0 <= height * (1 - margin):
+            break
+        if y0 - preceding[1] > 0.8 * word_height:
+            bottom = (y0 + preceding[1]) / 2
+        else:
+            break
+    return top, bottom
+
+
+def _find_gutter(words: List[Word], width: float) -> Optional[Tuple[float, float]]:
+    """Breiteste am wenigsten überdeckte senkrechte Fuge im mittleren Seitendrittel
+
+    Einzelne Wörter über die Fuge (Titel, Tabellen) werden toleriert; sie
+    werden in _reading_order als seitenbreite Zeilen behandelt.
+    """
+    lo, hi = int(width * 0.35), int(width * 0.65)
+    coverage = [0] * (hi - lo)
+    for x0, _, x1, _, _ in words:
+        for x in range(max(int(x0) + 1, lo), min(int(x1), hi)):
+            coverage[x - lo] += 1
+    fewest = min(coverage, default=0)
+    if fewest > max(2, len(words) // 30):
+        return None
+    # Etwas Spielraum über dem Minimum, damit zentrierte Titelzeilen die Fuge nicht zerteilen
+    tolerance = fewest + max(2, len(words) // 100)
+    best, run_start = None, None
+    for x, n in enumerate(coverage + [tolerance + 1]):
+        if n <= tolerance:
+            if run_start is None:
+                run_start = x
+        elif run_start is not None:
+            if best is None or x - run_start > best[1] - best[0]:
+                best = (run_start, x)
+            run_start = None
+    if best is None or best[1] - best[0] < 3:
+        return None
+    return best[0] + lo, best[1] + lo
+
+
+def _reading_order(words: List[Word], width: float) -> List[List[Word]]:
+    """Zeilen in Lesereihenfolge: seitenbreite Zeilen ganz, dazwischen linke vor rechter Spalte
+
+    Seitenbreit ist eine Zeile, sobald ein Wort in die Fuge ragt (Titelblock,
+    breite Tabellen); sie schließt den Streifen der beiden Spalten darüber ab.
+    """
+    lines = _group_lines(words)
+    gutter = _find_gutter(words, width)
+    if gutter is None:
+        return lines
+    # Nur der innere Teil der Fuge zählt: Aufzählungen ("jj)") und Einzüge ragen vom Spaltenrand hinein
+    inset = (gutter[1] - gutter[0]) / 4
+    left, right = gutter[0] + inset, gutter[1] - inset
+
+    ordered: List[List[Word]] = []
+    left_lines: List[List[Word]] = []
+    right_lines: List[List[Word]] = []
+    for line in lines:
+        if any(w[0] < right and w[2] > left for w in line):
+            ordered += left_lines + right_lines + [line]
+            left_lines, right_lines = [], []
+            continue
+        left_part = [w for w in line if w[2] <= left]
+        right_part = [w for w in line if w[2] > left]
+        if left_part:
+            left_lines.append(left_part)
+        if right_part:
+            right_lines.append(right_part)
+    return ordered + left_lines + right_lines
+
+
+def _clean(text: str) -> List[str]:
+    lines = []
+    for line in text.split("\n"):
+        line = _MARGIN_MARKER.sub("", line).rstrip()
+        if line:
+            lines.append(line)
+    return lines
+
+
+def is_toc(lines: List[str]) -> bool:
+    """Seite des Inhaltsverzeichnisses (überwiegend Einträge mit Punktleiter und Seitenverweis)"""
+    entries = sum(1 for line in lines if _TOC_ENTRY.search(line))
+    return bool(lines) and entries >= TOC_SHARE * len(lines)
+
+
+def page_text(page, skip_toc: bool = True) -> str:
+    """Text einer Seite in Lesereihenfolge ohne Kopf-/Fußzeile und Randmarken
+
+    Mit skip_toc liefern Inhaltsverzeichnisseiten (römische Seitenzahl oder
+    überwiegend Einträge mit Seitenverweis) einen leeren Text; von der
+    Titelseite bleibt nur der Titelblock vor "Inhalt:". Die Entscheidung fällt
+    pro Seite, damit Seitenbereiche unabhängig voneinander verarbeitet werden können.
+    """
+    words = _words(page.chars())
+    # Die Titelseite hat keinen laufenden Seitenkopf; ihre oberste Zeile ist "Plenarprotokoll 20/…"
+    top, bottom = _content_band(words, page.height, header=page.index > 0)
+    if skip_toc:
+        # Das Inhaltsverzeichnis hat römische Seitenzahlen im Seitenkopf, der übrige Bericht arabische
+        heading = _group_lines([w for w in words if w[3] <= top])[:1]
+        if any(_ROMAN_PAGE_NUMBER.fullmatch(w[4]) for line in heading for w in line):
+            return ""
+    lines = []
+    for line in _reading_order([w for w in words if top <= (w[1] + w[3]) / 2 <= bottom], page.width):
+        lines.extend(_clean(" ".join(w[4] for w in line)))
+    text = "\n".join(lines)
+    if skip_toc:
+        match = _TOC_START.search(text)
+        if match:
+            return text[:match.start()].rstrip()
+        if is_toc(lines):
+            return ""
+    return text
+
+
+def iter_page_texts(pdf_path: Path, backend: Optional[str] = None, skip_toc: bool = True,
+                    start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+    """Seitentexte eines PDFs (optional nur die Seiten [start, end))"""
+    with open_pdf(pdf_path, backend) as pdf:
+        for i in range(start, len(pdf) if end is None else end):
+            page = pdf.page(i)
+            try:
+                yield page_text(page, skip_toc)
+            finally:
+                page.close()
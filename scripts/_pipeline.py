@@ -0,0 +1,188 @@
+import hashlib
+import logging
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from _catalog import STATUS_DONE, STATUS_FAILED, ProtocolCatalog
+from _tracing import merge_totals, worker_totals
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+# Protokoll-ID für Stufen, die über alle Sitzungen laufen
+GLOBAL = "*"
+
+
+def file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_version(sources: List[str]) -> str:
+    """Hash über den Quelltext der Module, die eine Stufe implementieren"""
+    digest = hashlib.sha256()
+    for name in sorted(sources):
+        digest.update(name.encode())
+        digest.update((SCRIPTS_DIR / name).read_bytes())
+    return digest.hexdigest()
+
+
+@dataclass
+class Stage:
+    """Eine Verarbeitungsstufe mit deklarierten Eingaben
+
+    Pro-Protokoll-Stufen laufen für jede Sitzung einzeln (run(session)),
+    globale Stufen einmal über alle Sitzungen (run()). Eine Stufe läuft nur,
+    wenn sich ihr Fingerabdruck – Code-Version plus Inhalts-Hash der
+    Eingaben bzw. Fingerabdrücke der Vorgänger – geändert hat.
+    """
+    name: str
+    run: Callable
+    sources: List[str]
+    inputs: Callable[[str], List[Path]] = lambda session: []  # globale Stufen: session ist GLOBAL
+    deps: List[str] = field(default_factory=list)
+    per_protocol: bool = True
+    parallel: bool = True  # False: Stufe darf nicht gleichzeitig mit sich selbst laufen
+    fingerprint: Optional[Callable[[str], str]] = None  # eigener Fingerabdruck statt des Standards
+
+
+def _execute(run: Callable, session: Optional[str]) -> Tuple[float, Optional[str], Optional[Dict]]:
+    """Führt eine Aufgabe im Worker aus und misst die Dauer
+
+    Gibt zusätzlich die Tracing-Summen des Workers zurück, damit der
+    Hauptprozess sie exportieren kann.
+    """
+    started = time.perf_counter()
+    try:
+        run(session) if session is not None else run()
+    except Exception:
+        return time.perf_counter() - started, traceback.format_exc(), worker_totals()
+    return time.perf_counter() - started, None, worker_totals()
+
+
+class Pipeline:
+    """DAG aus Stufen × Sitzungen, der nur Ungültiges neu berechnet"""
+
+    def __init__(self, stages: List[Stage], catalog: Optional[ProtocolCatalog] = None, workers: Optional[int] = None):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stufe {stage.name} hängt von unbekannter Stufe {dep} ab")
+        self.catalog = catalog or ProtocolCatalog()
+        self.workers = workers or os.cpu_count() or 1
+        self._versions = {stage.name: code_version(stage.sources) for stage in stages}
+
+    def _fingerprint(self, stage: Stage, session: str, fingerprints: Dict[Tuple[str, str], str],
+                     sessions: List[str]) -> str:
+        if stage.fingerprint is not None:
+            return stage.fingerprint(session)
+        digest = hashlib.sha256(self._versions[stage.name].encode())
+        inputs = stage.inputs(session)
+        # Inhalts-Hash der Eingaben: liefert eine Vorstufe dasselbe Ergebnis, läuft diese Stufe nicht
+        for path in inputs:
+            digest.update(file_hash(path).encode() if Path(path).exists() else b"-")
+        if stage.per_protocol:
+            if not inputs:
+                for dep in stage.deps:
+                    digest.update(fingerprints.get((dep, session), "").encode())
+        else:
+            # Globale Stufen: zusätzliche Eingaben (Namensliste, CSVs) ergänzen die Vorstufen
+            for dep in stage.deps:
+                dep_sessions = sessions if self.stages[dep].per_protocol else [GLOBAL]
+                for dep_session in dep_sessions:
+                    digest.update(fingerprints.get((dep, dep_session), "").encode())
+        return digest.hexdigest()
+
+    def _tasks(self, sessions: List[str]) -> Dict[Tuple[str, str], List[Tuple[str, str]]]:
+        """Alle Aufgaben (Stufe, Sitzung) mit ihren Vorgängeraufgaben"""
+        tasks = {}
+        for stage in self.stages.values():
+            targets = sessions if stage.per_protocol else [GLOBAL]
+            for session in targets:
+                upstream = []
+                for dep in stage.deps:
+                    dep_stage = self.stages[dep]
+                    if dep_stage.per_protocol and stage.per_protocol:
+                        upstream.append((dep, session))
+                    elif dep_stage.per_protocol:
+                        upstream.extend((dep, s) for s in sessions)
+                    else:
+                        upstream.append((dep, GLOBAL))
+                tasks[(stage.name, session)] = upstream
+        return tasks
+
+    def run(self, sessions: List[str], force: bool = False) -> Dict[str, int]:
+        """Führt alle nötigen Aufgaben aus; unabhängige Stufen und Sitzungen laufen parallel"""
+        tasks = self._tasks(sessions)
+        waiting = dict(tasks)
+        finished: Dict[Tuple[str, str], bool] = {}  # Aufgabe -> erfolgreich?
+        fingerprints: Dict[Tuple[str, str], str] = {}
+        counts = {"run": 0, "skipped": 0, "failed": 0}
+        running = {}
+        serial_busy = set()
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while waiting or running:
+                # Bereite Aufgaben starten
+                progressed = False
+                for key in list(waiting):
+                    upstream = waiting[key]
+                    if not all(dep in finished for dep in upstream):
+                        continue
+                    stage_name, session = key
+                    stage = self.stages[stage_name]
+                    if not all(finished[dep] for dep in upstream):
+                        logging.warning(f"{stage_name}[{session}] übersprungen: Vorstufe fehlgeschlagen")
+                        finished[key] = False
+                        del waiting[key]
+                        progressed = True
+                        continue
+                    if not stage.parallel and stage_name in serial_busy:
+                        continue
+
+                    fingerprint = self._fingerprint(stage, session, fingerprints, sessions)
+                    fingerprints[key] = fingerprint
+                    del waiting[key]
+                    progressed = True
+                    state = self.catalog.stage(session, stage_name)
+                    if not force and state and state["status"] == STATUS_DONE and state["fingerprint"] == fingerprint:
+                        finished[key] = True
+                        counts["skipped"] += 1
+                        continue
+
+                    future = pool.submit(_execute, stage.run, session if stage.per_protocol else None)
+                    running[future] = key
+                    if not stage.parallel:
+                        serial_busy.add(stage_name)
+
+                if not running:
+                    if waiting and not progressed:
+                        raise RuntimeError(f"Zyklische Abhängigkeit zwischen {sorted(waiting)}")
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    stage_name, session = key
+                    serial_busy.discard(stage_name)
+                    duration, error, totals = future.result()
+                    merge_totals(totals)
+                    if error is None:
+                        self.catalog.mark_stage(session, stage_name, STATUS_DONE, duration, fingerprints[key])
+                        finished[key] = True
+                        counts["run"] += 1
+                        logging.info(f"{stage_name}[{session}] fertig in {duration:.1f}s")
+                    else:
+                        self.catalog.mark_stage(session, stage_name, STATUS_FAILED, duration, None, error)
+                        finished[key] = False
+                        counts["failed"] += 1
+                        logging.error(f"{stage_name}[{session}] fehlgeschlagen:\n{error}")
+        return counts
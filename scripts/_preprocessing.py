@@ -0,0 +1,108 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import _boilerplate
+from _normalizer import TOKENIZER_VERSION, Normalizer, load_lemmatizer
+
+from _protocol_store import BASE_DIR, JSON_DIR, iter_sessions
+
+STOPWORD_FILE = BASE_DIR / "data" / "german_stopwords_full.txt"
+CACHE_DIR = BASE_DIR / "data" / "cache" / "tokens"
+
+# Bei Änderungen an normalize() erhöhen – alte Cache-Einträge werden dann nicht mehr verwendet
+NORMALIZER_VERSION = f"2.{TOKENIZER_VERSION}"
+# Lemmatisierung für alle Modelle: "none", "spacy[:modell]" oder Pfad zu einer TSV-Lemmatabelle
+LEMMATIZER = os.environ.get("BUNDESTAG_LEMMATIZER", "none")
+
+# Ein Normalizer pro Stopword-Menge, damit die Auflösungstabellen über Aufrufe erhalten bleiben
+_normalizers: Dict[Tuple[int, str], Tuple[Set[str], Normalizer]] = {}
+
+
+def load_stopwords(file_path: Path = STOPWORD_FILE) -> Set[str]:
+    stopwords = set()
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            word = line.strip().lower()
+            if word and not word.startswith(";"):  # Kommentare ignorieren
+                stopwords.add(word)
+    return stopwords
+
+
+def get_normalizer(stopwords: Set[str], lemmatizer: Optional[str] = None) -> Normalizer:
+    """Gemeinsamer Normalizer für diese Stopword-Menge und Lemmatisierung"""
+    spec = lemmatizer or LEMMATIZER
+    key = (id(stopwords), spec)
+    entry = _normalizers.get(key)
+    if entry is None or entry[0] is not stopwords:
+        entry = _normalizers[key] = (stopwords, Normalizer(stopwords, load_lemmatizer(spec)))
+    return entry[1]
+
+
+def normalize(text: str, stopwords: Set[str]) -> List[str]:
+    """Tokenisieren (Komposita und Zahlen bleiben erhalten), Stopwords filtern, ggf. lemmatisieren"""
+    return get_normalizer(stopwords).tokens(text)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class TokenCache:
+    """Cache der normalisierten Token pro Text auf der Platte
+
+    Schlüssel ist der Hash aus Text, Stopword-Datei, Lemmatisierung und
+    NORMALIZER_VERSION; unveränderte Sitzungen werden nie erneut tokenisiert.
+    """
+
+    def __init__(self, stopword_file: Path = STOPWORD_FILE, cache_dir: Path = CACHE_DIR,
+                 lemmatizer: Optional[str] = None):
+        self.stopword_file = Path(stopword_file)
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.stopword_hash = _sha256(self.stopword_file.read_bytes())
+        self.lemmatizer = lemmatizer or LEMMATIZER
+        self._stopwords: Optional[Set[str]] = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stopwords(self) -> Set[str]:
+        # Erst bei einem Cache-Miss laden
+        if self._stopwords is None:
+            self._stopwords = load_stopwords(self.stopword_file)
+        return self._stopwords
+
+    def key(self, text: str) -> str:
+        text_hash = _sha256(text.encode("utf-8"))
+        return _sha256(f"{text_hash}:{self.stopword_hash}:{self.lemmatizer}:{NORMALIZER_VERSION}".encode())
+
+    def tokens(self, text: str) -> List[str]:
+        path = self.cache_dir / f"{self.key(text)}.txt"
+        if path.exists():
+            self.hits += 1
+            return path.read_text(encoding="utf-8").split()
+
+        self.misses += 1
+        tokens = get_normalizer(self.stopwords, self.lemmatizer).tokens(text)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        tmp_path.write_text(" ".join(tokens), encoding="utf-8")
+        os.replace(tmp_path, path)
+        return tokens
+
+
+def load_corpus(json_dir: Path = JSON_DIR, cache: Optional[TokenCache] = None,
+                skip_boilerplate: bool = True) -> Tuple[List[str], List[List[str]]]:
+    """Liefert (Sitzungsnummern, Token je Sitzung) über den Token-Cache
+
+    Mit skip_boilerplate fehlen die als Textbaustein maskierten Zeilen (siehe _boilerplate.py).
+    """
+    cache = cache or TokenCache()
+    session_numbers = []
+    documents = []
+    sessions = _boilerplate.iter_sessions(json_dir) if skip_boilerplate else iter_sessions(json_dir)
+    for session_number, text in sessions:
+        session_numbers.append(session_number)
+        documents.append(cache.tokens(text))
+    return session_numbers, documents
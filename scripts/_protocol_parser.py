@@ -1,27 +1,47 @@
 # scripts/protocol_parser.py
-import pdfplumber
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
+import itertools
 import logging
+import sys
 
-@dataclass
+from _pdf_backends import iter_page_texts
+from _protocol_store import JSON_DIR, iter_pages
+from _speaker_index import Hit, SpeakerIndex, default_speaker_index, match_turn_line, parse_turn_line
+from _tracing import ENABLED as TRACING, count, span
+
+@dataclass(slots=True)
 class Speech:
     speaker: str
     party: Optional[str]
     content: str
     time: Optional[str]
     topic: Optional[str]
+    # Kanonische ID aus der Namensliste und Funktion ("Präsidentin", "Bundesminister der Finanzen")
+    speaker_id: Optional[str] = None
+    role: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class Interjection:
     speaker: Optional[str]
     party: Optional[str]
     content: str
+    # Redner/in, deren Rede unterbrochen wurde
+    target_speaker: Optional[str] = None
+    target_party: Optional[str] = None
+
+@dataclass(slots=True)
+class Mention:
+    """Erwähnung einer Person aus der Namensliste (kein Rednerwechsel)"""
+    speaker_id: str
+    # Seite (ab 1) und Zeichenposition im Seitentext
+    page: int
+    offset: int
 
-@dataclass
+@dataclass(slots=True)
 class ParsedProtocol:
     protocol_id: str
     date: datetime
@@ -30,11 +50,50 @@ class ParsedProtocol:
     speeches: List[Speech]
     interjections: List[Interjection]
     voting_results: List[Dict]
+    mentions: List[Mention] = field(default_factory=list)
+
+Record = Union[Speech, Interjection]
+
+# Bei Änderungen an der Zerlegung in Reden und Zwischenrufe erhöhen,
+# damit abgeleitete Auswertungen die Sitzungen neu parsen
+PARSER_VERSION = "3"
+
+# Zwischenrufe in Klammern umfassen selten mehr Zeilen; bleibt die Klammer
+# länger offen, war es kein Zwischenruf und die Zeilen gehören zur Rede
+MAX_INTERJECTION_LINES = 8
 
 logging.basicConfig(level=logging.INFO)
 
+_WRAPPED_HYPHEN = re.compile(r"-\n(?=[a-zäöüß])")
+
+
+def _unwrap(text: str) -> str:
+    """Zeilenumbrüche in einer umbrochenen Rednerzeile entfernen (mit Silbentrennung)"""
+    return _WRAPPED_HYPHEN.sub("", text).replace("\n", " ")
+
+
+class _LineCounter:
+    """Zählt die vom Parser verarbeiteten Zeilen (nur bei eingeschaltetem Tracing)"""
+
+    def __init__(self, lines: Iterable[str]):
+        self.lines = iter(lines)
+        self.n = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        line = next(self.lines)
+        self.n += 1
+        return line
+
+
 class ProtocolParser:
-    def __init__(self):
+    def __init__(self, pdf_backend: Optional[str] = None, speaker_index: Optional[SpeakerIndex] = None):
+        # PDF-Backend für parse_pdf/iter_parse (None: BUNDESTAG_PDF_BACKEND bzw. automatisch)
+        self.pdf_backend = pdf_backend
+        # Namensliste für die Rednererkennung (None: data/roster.csv, falls vorhanden)
+        self.speaker_index = speaker_index if speaker_index is not None else default_speaker_index()
         # Regex patterns für verschiedene Elemente
         self.speaker_pattern = re.compile(r"^(.+?)\s*\((.+?)\):")
         self.time_pattern = re.compile(r"\((\d{2}:\d{2})\s*Uhr\)")
@@ -43,73 +102,232 @@ class ProtocolParser:
         self.president_pattern = re.compile(r"Präsident(?:in)?\s+([^:]+):")
         self.topic_pattern = re.compile(r"Tagesordnungspunkt\s+(\d+\w*):")
         self.voting_pattern = re.compile(r"Namentliche\s+Abstimmung")
-        self.interjection_pattern = re.compile(r"\((.*?)\)")
+        # Kombiniertes Muster für die Zeilenklassifikation: Rednerzeile,
+        # Zeitmarke oder Beginn eines Zwischenrufs in einem Durchlauf.
+        # Zwischenrufe stehen immer am Zeilenanfang; Klammern im Redetext bleiben Teil der Rede.
+        self.line_pattern = re.compile(
+            r"^(?P<speaker>.+?)\s*\((?P<party>.+?)\):(?P<rest>.*)"
+            r"|^\((?P<time>\d{2}:\d{2})\s*Uhr\)"
+            r"|^(?P<paren>\()"
+        )
+
+    def keeps_line(self, line: str) -> bool:
+        """Zeilen, die die Gliederung tragen (Rednerwechsel, Zwischenrufe und Zeitmarken)
+
+        Beim Entfernen von Textbausteinen bleiben sie stehen, damit keine Rede
+        ihrem Vorredner zugeschlagen wird.
+        """
+        if line.startswith("("):
+            return True
+        if self.speaker_index is not None and self.speaker_index.match_turn(line) is not None:
+            return True
+        return parse_turn_line(line) is not None
 
     def parse_pdf(self, pdf_path: Path) -> ParsedProtocol:
         """Parst ein Protokoll-PDF"""
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                # Extrahiere Metadaten von der ersten Seite
-                first_page = pdf.pages[0]
-                text = first_page.extract_text()
-                
-                # Basis-Informationen
-                protocol_id = self._extract_protocol_id(text)
-                date = self._extract_date(text)
-                start_time = self._extract_start_time(text)
-                president = self._extract_president(text)
-                
-                # Parse alle Seiten
-                speeches = []
-                interjections = []
-                voting_results = []
-                
-                current_speech = None
-                
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    lines = text.split('\n')
-                    
-                    for line in lines:
-                        # Versuche Redner zu identifizieren
-                        speaker_match = self.speaker_pattern.match(line)
-                        if speaker_match:
-                            if current_speech:
-                                speeches.append(current_speech)
-                            
-                            current_speech = Speech(
-                                speaker=speaker_match.group(1),
-                                party=speaker_match.group(2),
-                                content=line[speaker_match.end():],
-                                time=self._extract_time(line),
-                                topic=None
-                            )
-                        elif current_speech:
-                            # Prüfe auf Zwischenrufe
-                            if '(' in line and ')' in line:
-                                interjection = self._parse_interjection(line)
-                                if interjection:
-                                    interjections.append(interjection)
-                            else:
-                                current_speech.content += '\n' + line
-                
-                if current_speech:
-                    speeches.append(current_speech)
-                
-                return ParsedProtocol(
-                    protocol_id=protocol_id,
-                    date=date,
-                    start_time=start_time,
-                    president=president,
-                    speeches=speeches,
-                    interjections=interjections,
-                    voting_results=voting_results
-                )
-                
+            return self.parse_pages(iter_page_texts(pdf_path, self.pdf_backend))
         except Exception as e:
             logging.error(f"Fehler beim Parsen von {pdf_path}: {e}")
             raise
 
+    def parse_pages(self, pages: Iterable[str]) -> ParsedProtocol:
+        """Parst ein Protokoll aus den Texten seiner Seiten"""
+        pages = iter(pages)
+        # Extrahiere Metadaten von der ersten Seite
+        head = [next(pages, "")]
+        if "Beginn:" not in head[0]:
+            # Ohne Inhaltsverzeichnis steht der Sitzungsbeginn (Startzeit, Präsidium)
+            # auf der nächsten nicht leeren Seite; sie zählt für die Metadaten zur ersten
+            for page in pages:
+                head.append(page)
+                if page.strip():
+                    break
+        first_page = "\n".join(head)
+
+        speeches = []
+        interjections = []
+        mentions: List[Mention] = []
+        with span("parse") as parse_span:
+            lines = self._iter_page_lines(itertools.chain(head, pages), mentions)
+            if TRACING:
+                lines = _LineCounter(lines)
+            for record in self._iter_records(lines):
+                if isinstance(record, Speech):
+                    speeches.append(record)
+                else:
+                    interjections.append(record)
+            if TRACING:
+                parse_span.set(protocol_id=self._extract_protocol_id(first_page), lines=lines.n,
+                               speeches=len(speeches), interjections=len(interjections))
+                count("parser.lines", lines.n)
+                count("parser.speeches", len(speeches))
+                count("parser.interjections", len(interjections))
+                count("parser.mentions", len(mentions))
+
+        return ParsedProtocol(
+            protocol_id=self._extract_protocol_id(first_page),
+            date=self._extract_date(first_page),
+            start_time=self._extract_start_time(first_page),
+            president=self._extract_president(first_page),
+            speeches=speeches,
+            interjections=interjections,
+            voting_results=[],
+            mentions=mentions,
+        )
+
+    def parse_session(self, session: str, json_dir: Path = JSON_DIR) -> ParsedProtocol:
+        """Parst ein bereits extrahiertes Protokoll aus data/json (ohne erneute PDF-Extraktion)"""
+        return self.parse_pages(page.text for page in iter_pages(session, json_dir))
+
+    def iter_parse_session(self, session: str, json_dir: Path = JSON_DIR) -> Iterator[Record]:
+        """Wie iter_parse, aber auf den extrahierten Seiten in data/json"""
+        pages = (page.text for page in iter_pages(session, json_dir))
+        yield from self._iter_records(self._iter_page_lines(pages, []))
+
+    def iter_parse(self, pdf_path: Path) -> Iterator[Record]:
+        """Parst ein Protokoll-PDF als Strom: liefert jede Rede und jeden
+        Zwischenruf, sobald er vollständig ist"""
+        pages = iter_page_texts(pdf_path, self.pdf_backend)
+        yield from self._iter_records(self._iter_page_lines(pages, []))
+
+    def _iter_page_lines(self, pages: Iterable[str],
+                         mentions: List[Mention]) -> Iterator[Tuple[str, Optional[Hit]]]:
+        """Zeilen der Seiten mit dem Rednerwechsel, der in der Zeile beginnt
+
+        Jede Seite wird genau einmal mit dem Speaker-Index gescannt; die
+        Treffer liefern Rednerwechsel und Erwähnungen (in mentions) zugleich.
+        Eine über zwei Zeilen umbrochene Rednerzeile wird zu einer Zeile.
+        Ohne Namensliste erkennt match_turn_line die Rednerwechsel nach ihrer
+        Form (einzeilig, ohne Erwähnungen).
+        """
+        if self.speaker_index is None:
+            yield from ((line, match_turn_line(line)) for line in self._iter_lines(pages))
+            return
+        scan = self.speaker_index.scan
+        for page_number, text in enumerate(pages, 1):
+            turns = {}
+            for hit in scan(text):
+                if hit.turn:
+                    turns[hit.start] = hit
+                else:
+                    mentions.append(Mention(hit.person.id, page_number, hit.start))
+            start = 0
+            while start <= len(text):
+                end = text.find("\n", start)
+                end = len(text) if end < 0 else end
+                turn = turns.get(start)
+                if turn is None:
+                    yield text[start:end], None
+                elif turn.end <= end:
+                    yield text[start:end], turn._replace(start=0, end=turn.end - start)
+                else:
+                    # Amtsbezeichnung über den Zeilenumbruch hinweg
+                    end = text.find("\n", turn.end)
+                    end = len(text) if end < 0 else end
+                    head = _unwrap(text[start:turn.end])
+                    yield head + text[turn.end:end], turn._replace(start=0, end=len(head))
+                start = end + 1
+
+    def _iter_records(self, lines: Iterable[Tuple[str, Optional[Hit]]]) -> Iterator[Record]:
+        """Zeilenbasierter Zustandsautomat über den Protokolltext
+
+        Jede Zeile wird mit genau einem vorkompilierten Muster klassifiziert;
+        der Redetext wird in einer Liste gesammelt und erst am Ende der Rede
+        einmal zusammengefügt. Mit Namensliste kommen die Rednerwechsel
+        (auch Präsidium und Regierung) vom Speaker-Index; "X (Y):" ohne
+        bekannten Namen zählt dann nur noch, wenn X ein Name und Y eine
+        Fraktion ist.
+        """
+        match_line = self.line_pattern.search
+        indexed = self.speaker_index is not None
+        intern = sys.intern  # Redner und Parteien wiederholen sich tausendfach
+        speaker = party = time = speaker_id = role = None
+        body: List[str] = []
+        in_speech = False
+        current_time = None
+        pending: Optional[List[str]] = None  # Zeilen eines noch offenen Zwischenrufs
+        depth = 0
+
+        for line, turn in lines:
+            if pending is not None:
+                # Mehrzeiliger Zwischenruf: sammeln, bis die Klammer geschlossen ist
+                pending.append(line)
+                depth += line.count("(") - line.count(")")
+                if depth <= 0:
+                    yield self._interjection_from_lines(pending, speaker, party)
+                    pending = None
+                elif len(pending) >= MAX_INTERJECTION_LINES:
+                    body.extend(pending)
+                    pending = None
+                continue
+
+            if turn is not None:
+                if in_speech:
+                    yield Speech(speaker=speaker, party=party, content="\n".join(body), time=time, topic=None,
+                                 speaker_id=speaker_id, role=role)
+                rest = line[turn.end:]
+                speaker = turn.person.name
+                party = intern(turn.party) if turn.party else None
+                speaker_id, role = turn.person.id, turn.role
+                time = self._extract_time(rest) or current_time
+                body = [rest]
+                in_speech = True
+                continue
+
+            match = match_line(line)
+            if indexed and match is not None and match.group("speaker") is not None and parse_turn_line(line) is None:
+                # Unbekannter Name: nur Zeilen der Form "Name (Fraktion):" zählen als Rednerwechsel
+                match = None
+
+            if match is None:
+                if in_speech:
+                    body.append(line)
+            elif match.group("speaker") is not None:
+                # Neue Rednerzeile schließt die vorherige Rede ab
+                if in_speech:
+                    yield Speech(speaker=speaker, party=party, content="\n".join(body), time=time, topic=None,
+                                 speaker_id=speaker_id, role=role)
+                rest = match.group("rest")
+                speaker = intern(match.group("speaker"))
+                party = intern(match.group("party"))
+                speaker_id = role = None
+                time = self._extract_time(rest) or current_time
+                body = [rest]
+                in_speech = True
+            elif not in_speech:
+                continue
+            elif match.group("time") is not None:
+                current_time = match.group("time")
+            else:
+                depth = line.count("(") - line.count(")")
+                if depth > 0:
+                    pending = [line]
+                elif line.rstrip().endswith(")"):
+                    yield self._interjection_from_lines([line], speaker, party)
+                else:
+                    # "(1) Artikel drei …": Aufzählung im Redetext, kein Zwischenruf
+                    body.append(line)
+
+        if pending is not None:
+            body.extend(pending)
+        if in_speech:
+            yield Speech(speaker=speaker, party=party, content="\n".join(body), time=time, topic=None,
+                         speaker_id=speaker_id, role=role)
+
+    @staticmethod
+    def _iter_lines(*page_iterables: Iterable[str]) -> Iterator[str]:
+        for pages in page_iterables:
+            for text in pages:
+                yield from text.split("\n")
+
+    def parse_date(self, session: str, json_dir: Path = JSON_DIR) -> datetime:
+        """Sitzungsdatum aus dem Titelblock, ohne das ganze Protokoll zu parsen"""
+        for page in iter_pages(session, json_dir):
+            if self.date_pattern.search(page.text):
+                return self._extract_date(page.text)
+        raise ValueError("Kein Datum gefunden")
+
     def _extract_protocol_id(self, text: str) -> str:
         """Extrahiert die Protokoll-ID (z.B. '20/123')"""
         match = self.protocol_id_pattern.search(text)
@@ -161,18 +379,30 @@ class ProtocolParser:
         match = self.time_pattern.search(text)
         return match.group(1) if match else None
 
-    def _parse_interjection(self, text: str) -> Optional[Interjection]:
-        match = self.interjection_pattern.search(text)
-        if not match:
-            return None
-            
-        content = match.group(1)
+    def _interjection_from_lines(self, lines: List[str], target_speaker: Optional[str],
+                                 target_party: Optional[str]) -> Interjection:
+        """Zwischenruf aus einer oder mehreren Zeilen (ohne die äußeren Klammern)"""
+        text = lines[0]
+        for line in lines[1:]:
+            # Silbentrennung am Zeilenende zusammenfügen
+            if text.endswith("-") and line[:1].islower():
+                text = text[:-1] + line
+            else:
+                text = f"{text} {line}"
+        text = text.strip()
+        content = text[1:-1] if text.endswith(")") else text[1:]
+        interjection = self._interjection_from_content(content.strip())
+        interjection.target_speaker = target_speaker
+        interjection.target_party = target_party
+        return interjection
+
+    def _interjection_from_content(self, content: str) -> Interjection:
         # Versuche Sprecher und Partei zu extrahieren
         speaker_match = self.speaker_pattern.search(content)
         if speaker_match:
             return Interjection(
-                speaker=speaker_match.group(1),
-                party=speaker_match.group(2),
+                speaker=sys.intern(speaker_match.group(1)),
+                party=sys.intern(speaker_match.group(2)),
                 content=content[speaker_match.end():].strip()
             )
         return Interjection(
@@ -193,27 +423,3 @@ class ProtocolParser:
         subtopic = subtopic_match.group(1) if subtopic_match else None
         
         return topic, subtopic
-    
-    def _parse_speech_content(self, text: str) -> Tuple[str, List[Interjection]]:
-        """Parst Redetext und extrahiert Zwischenrufe"""
-        interjections = []
-        speech_parts = []
-        current_pos = 0
-        
-        for match in re.finditer(r'\((.*?)\)', text):
-            # Text vor dem Zwischenruf
-            speech_parts.append(text[current_pos:match.start()].strip())
-            
-            interjection_text = match.group(1)
-            # Prüfe ob es ein Zwischenruf ist (nicht nur Zeitangabe etc.)
-            if not self.time_pattern.match(interjection_text):
-                interjection = self._parse_interjection(interjection_text)
-                if interjection:
-                    interjections.append(interjection)
-                
-            current_pos = match.end()
-            
-        # Rest des Texts
-        speech_parts.append(text[current_pos:].strip())
-        
-        return ' '.join(speech_parts), interjections
\ No newline at end of file
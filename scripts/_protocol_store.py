@@ -0,0 +1,85 @@
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Basis-Verzeichnis ist das Root-Verzeichnis des Projekts
+BASE_DIR = Path(__file__).resolve().parent.parent
+JSON_DIR = BASE_DIR / "data" / "json"
+
+
+@dataclass
+class Page:
+    number: int
+    text: str
+
+
+def protocol_path(session: str, json_dir: Path = JSON_DIR) -> Optional[Path]:
+    """Liefert den Pfad eines Protokolls (JSONL bevorzugt, sonst altes JSON)"""
+    json_dir = Path(json_dir)
+    for suffix in (".jsonl", ".json"):
+        path = json_dir / f"{session}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def list_sessions(json_dir: Path = JSON_DIR) -> List[str]:
+    """Alle vorhandenen Sitzungsnummern, sortiert"""
+    json_dir = Path(json_dir)
+    if not json_dir.exists():
+        return []
+    sessions = {
+        path.name.split(".")[0]
+        for path in json_dir.iterdir()
+        if path.suffix in (".json", ".jsonl")
+    }
+    return sorted(sessions)
+
+
+def read_header(session: str, json_dir: Path = JSON_DIR) -> Dict:
+    """Liest nur die Kopfzeile (Hash, Version, Seitenzahl) eines Protokolls"""
+    path = protocol_path(session, json_dir)
+    if path is None:
+        return {}
+    if path.suffix == ".jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            return json.loads(f.readline())
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    data.pop("text", None)
+    return data
+
+
+def iter_pages(session: str, json_dir: Path = JSON_DIR) -> Iterator[Page]:
+    """Liefert die Seiten eines Protokolls einzeln, ohne die Datei komplett zu laden"""
+    path = protocol_path(session, json_dir)
+    if path is None:
+        raise FileNotFoundError(f"Kein Protokoll {session} in {json_dir}")
+    if path.suffix == ".json":
+        # Altes Format: der ganze Text als eine Seite
+        with open(path, "r", encoding="utf-8") as f:
+            yield Page(number=1, text=json.load(f)["text"])
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        f.readline()  # Kopfzeile überspringen
+        for line in f:
+            record = json.loads(line)
+            yield Page(number=record["seite"], text=record["text"])
+
+
+def iter_lines(session: str, json_dir: Path = JSON_DIR) -> Iterator[str]:
+    """Liefert den Protokolltext zeilenweise"""
+    for page in iter_pages(session, json_dir):
+        yield from page.text.split("\n")
+
+
+def read_text(session: str, json_dir: Path = JSON_DIR) -> str:
+    """Setzt den Text eines Protokolls zusammen"""
+    return "\n".join(page.text for page in iter_pages(session, json_dir) if page.text)
+
+
+def iter_sessions(json_dir: Path = JSON_DIR) -> Iterator[Tuple[str, str]]:
+    """Liefert (Sitzungsnummer, Text) – immer nur eine Sitzung im Speicher"""
+    for session in list_sessions(json_dir):
+        yield session, read_text(session, json_dir)
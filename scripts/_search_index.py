@@ -0,0 +1,386 @@
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from _normalizer import TOKENIZER_VERSION, tokenize
+from _protocol_parser import ParsedProtocol
+from _protocol_store import BASE_DIR
+from _speaker_index import canonical_party
+
+INDEX_FILE = BASE_DIR / "data" / "search.sqlite"
+
+# Bei Änderungen an den gespeicherten Metadaten erhöhen – Sitzungen werden dann neu indexiert
+INDEX_VERSION = "2"
+
+# BM25-Parameter
+K1 = 1.2
+B = 0.75
+
+_QUERY_PATTERN = re.compile(r'"([^"]+)"|(\S+)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS protocols (
+    protocol_id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id      INTEGER PRIMARY KEY,
+    protocol_id TEXT NOT NULL,
+    position    INTEGER NOT NULL,
+    speaker     TEXT,
+    party       TEXT,
+    date        TEXT,
+    time        TEXT,
+    topic       TEXT,
+    length      INTEGER NOT NULL,
+    content     BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_docs_protocol ON docs (protocol_id);
+CREATE INDEX IF NOT EXISTS idx_docs_date ON docs (date);
+CREATE TABLE IF NOT EXISTS postings (
+    term        TEXT NOT NULL,
+    protocol_id TEXT NOT NULL,
+    df          INTEGER NOT NULL,
+    docs        BLOB NOT NULL,
+    positions   BLOB NOT NULL,
+    PRIMARY KEY (term, protocol_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stats (
+    id           INTEGER PRIMARY KEY CHECK (id = 0),
+    n_docs       INTEGER NOT NULL,
+    total_length INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO stats (id, n_docs, total_length) VALUES (0, 0, 0);
+"""
+
+
+# --- Kompression der Postings (Varint + Delta-Kodierung) -------------------
+
+def _encode_varints(values: Iterable[int], out: bytearray):
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+
+def _decode_varints(data: bytes) -> List[int]:
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    return values
+
+
+def encode_postings(postings: List[Tuple[int, List[int]]]) -> Tuple[bytes, bytes]:
+    """[(doc_id, [Positionen])] -> (doc_id-Delta und tf, Positions-Deltas pro Dokument) als Varints
+
+    Getrennte Blobs: BM25 braucht nur doc_id und tf, die Positionen werden
+    ausschließlich für Phrasenabfragen dekodiert.
+    """
+    docs, positions = bytearray(), bytearray()
+    previous_doc = 0
+    for doc_id, doc_positions in postings:
+        _encode_varints((doc_id - previous_doc, len(doc_positions)), docs)
+        previous_position = 0
+        for position in doc_positions:
+            _encode_varints((position - previous_position,), positions)
+            previous_position = position
+        previous_doc = doc_id
+    return bytes(docs), bytes(positions)
+
+
+def decode_docs(data: bytes) -> Dict[int, int]:
+    """doc_id -> tf (Reihenfolge wie im Blob)"""
+    values = _decode_varints(data)
+    postings = {}
+    doc_id = 0
+    for i in range(0, len(values), 2):
+        doc_id += values[i]
+        postings[doc_id] = values[i + 1]
+    return postings
+
+
+def decode_positions(docs: Dict[int, int], data: bytes) -> Dict[int, List[int]]:
+    """Positionen zu den Dokumenten aus decode_docs() (gleiche Reihenfolge)"""
+    values = _decode_varints(data)
+    postings = {}
+    i = 0
+    for doc_id, tf in docs.items():
+        positions = []
+        position = 0
+        for delta in values[i:i + tf]:
+            position += delta
+            positions.append(position)
+        postings[doc_id] = positions
+        i += tf
+    return postings
+
+
+def party_key(party: Optional[str]) -> Optional[str]:
+    """Fraktion in der Kurzform aus PARTIES ("BÜNDNIS 90/DIE GRÜNEN" -> "GRÜNE"), Unbekanntes unverändert"""
+    return canonical_party(party) or party
+
+
+@dataclass
+class SearchResult:
+    score: float
+    protocol_id: str
+    position: int
+    speaker: Optional[str]
+    party: Optional[str]
+    date: Optional[str]
+    snippet: str
+
+
+class SearchIndex:
+    """Positionaler invertierter Index über Reden mit BM25-Ranking
+
+    Die Postings liegen pro (Term, Sitzung) als komprimierte Blobs in SQLite,
+    getrennt nach doc_id/tf und Positionen; eine Sitzung neu zu indexieren
+    ersetzt nur ihre eigenen Zeilen. Eine Anfrage liest über den Primärschlüssel
+    nur die Postings der gesuchten Terme, Positionen nur für Phrasen.
+    """
+
+    def __init__(self, db_path: Path = INDEX_FILE):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(postings)")}
+            if columns and "positions" not in columns:
+                # Altes Format (Positionen im selben Blob) – Index wird neu aufgebaut
+                conn.executescript("DROP TABLE postings; DROP TABLE docs; DROP TABLE protocols; DROP TABLE stats;")
+            conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Indexieren -------------------------------------------------------
+
+    @staticmethod
+    def fingerprint(protocol: ParsedProtocol) -> str:
+        # Tokenizer- und Index-Version gehören dazu: Änderungen daran erzwingen Neuindexierung
+        digest = hashlib.sha256(f"{INDEX_VERSION}.{TOKENIZER_VERSION}".encode())
+        for speech in protocol.speeches:
+            digest.update(f"{speech.speaker}|{speech.party}|{speech.time}|{speech.topic}|".encode("utf-8"))
+            digest.update(speech.content.encode("utf-8"))
+        return digest.hexdigest()
+
+    def is_indexed(self, protocol_id: str, fingerprint: str) -> bool:
+        row = self._connection().execute(
+            "SELECT fingerprint FROM protocols WHERE protocol_id = ?", (protocol_id,)
+        ).fetchone()
+        return row is not None and row[0] == fingerprint
+
+    def remove_protocol(self, conn: sqlite3.Connection, protocol_id: str):
+        n_docs, total_length = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs WHERE protocol_id = ?", (protocol_id,)
+        ).fetchone()
+        conn.execute("DELETE FROM docs WHERE protocol_id = ?", (protocol_id,))
+        conn.execute("DELETE FROM postings WHERE protocol_id = ?", (protocol_id,))
+        conn.execute("DELETE FROM protocols WHERE protocol_id = ?", (protocol_id,))
+        conn.execute(
+            "UPDATE stats SET n_docs = n_docs - ?, total_length = total_length - ? WHERE id = 0",
+            (n_docs, total_length),
+        )
+
+    def add_protocol(self, protocol: ParsedProtocol) -> bool:
+        """Indexiert eine Sitzung (ersetzt eine frühere Fassung); False wenn unverändert"""
+        fingerprint = self.fingerprint(protocol)
+        if self.is_indexed(protocol.protocol_id, fingerprint):
+            return False
+
+        sitting_date = protocol.date.date().isoformat()
+        conn = self._connection()
+        with conn:
+            self.remove_protocol(conn, protocol.protocol_id)
+            term_postings: Dict[str, List[Tuple[int, List[int]]]] = defaultdict(list)
+            total_length = 0
+            for position, speech in enumerate(protocol.speeches):
+                tokens = tokenize(speech.content)
+                cursor = conn.execute(
+                    "INSERT INTO docs (protocol_id, position, speaker, party, date, time, topic, length, content) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (protocol.protocol_id, position, speech.speaker, party_key(speech.party), sitting_date,
+                     speech.time, speech.topic, len(tokens), zlib.compress(speech.content.encode("utf-8"))),
+                )
+                doc_id = cursor.lastrowid
+                positions: Dict[str, List[int]] = defaultdict(list)
+                for i, token in enumerate(tokens):
+                    positions[token].append(i)
+                for term, term_positions in positions.items():
+                    term_postings[term].append((doc_id, term_positions))
+                total_length += len(tokens)
+
+            conn.executemany(
+                "INSERT INTO postings (term, protocol_id, df, docs, positions) VALUES (?, ?, ?, ?, ?)",
+                ((term, protocol.protocol_id, len(postings), *encode_postings(postings))
+                 for term, postings in term_postings.items()),
+            )
+            conn.execute(
+                "UPDATE stats SET n_docs = n_docs + ?, total_length = total_length + ? WHERE id = 0",
+                (len(protocol.speeches), total_length),
+            )
+            conn.execute(
+                "INSERT INTO protocols (protocol_id, fingerprint) VALUES (?, ?)",
+                (protocol.protocol_id, fingerprint),
+            )
+        return True
+
+    # --- Suchen -----------------------------------------------------------
+
+    @staticmethod
+    def parse_query(query: str) -> Tuple[List[str], List[List[str]]]:
+        """Zerlegt eine Anfrage in Einzelterme und "Phrasen in Anführungszeichen" """
+        terms, phrases = [], []
+        for phrase, word in _QUERY_PATTERN.findall(query):
+            if phrase:
+                phrase_terms = tokenize(phrase)
+                if len(phrase_terms) > 1:
+                    phrases.append(phrase_terms)
+                terms.extend(phrase_terms)
+            else:
+                terms.extend(tokenize(word))
+        return list(dict.fromkeys(terms)), phrases
+
+    def _protocols_in_range(self, since: Optional[date], until: Optional[date]) -> Optional[List[str]]:
+        if since is None and until is None:
+            return None
+        rows = self._connection().execute(
+            "SELECT DISTINCT protocol_id FROM docs WHERE date >= ? AND date <= ?",
+            ((since or date.min).isoformat(), (until or date.max).isoformat()),
+        )
+        return [row[0] for row in rows]
+
+    def _postings(self, term: str, protocols: Optional[List[str]]) -> Tuple[int, Dict[int, int]]:
+        """Liefert (globale df, doc_id -> tf der Sitzungen im Filter)"""
+        df = 0
+        postings: Dict[int, int] = {}
+        allowed = set(protocols) if protocols is not None else None
+        for protocol_id, term_df, data in self._connection().execute(
+            "SELECT protocol_id, df, docs FROM postings WHERE term = ?", (term,)
+        ):
+            df += term_df
+            if allowed is None or protocol_id in allowed:
+                postings.update(decode_docs(data))
+        return df, postings
+
+    def _positions(self, term: str, doc_ids: set) -> Dict[int, List[int]]:
+        """Positionen eines Terms, nur aus Sitzungen mit Kandidaten dekodiert"""
+        positions: Dict[int, List[int]] = {}
+        for docs, data in self._connection().execute(
+            "SELECT docs, positions FROM postings WHERE term = ?", (term,)
+        ):
+            tfs = decode_docs(docs)
+            if not doc_ids.isdisjoint(tfs):
+                positions.update(decode_positions(tfs, data))
+        return positions
+
+    def _phrase_matches(self, phrase: List[str], candidates: set) -> set:
+        """Kandidaten, in denen die Terme der Phrase direkt aufeinander folgen"""
+        positions = {term: self._positions(term, candidates) for term in dict.fromkeys(phrase)}
+        matches = set()
+        for doc_id in candidates:
+            starts = set(positions[phrase[0]][doc_id])
+            for offset, term in enumerate(phrase[1:], start=1):
+                starts &= {position - offset for position in positions[term][doc_id]}
+                if not starts:
+                    break
+            else:
+                matches.add(doc_id)
+        return matches
+
+    def search(self, query: str, limit: int = 10, parties: Optional[Iterable[str]] = None,
+               speakers: Optional[Iterable[str]] = None, since: Optional[date] = None,
+               until: Optional[date] = None) -> List[SearchResult]:
+        terms, phrases = self.parse_query(query)
+        if not terms:
+            return []
+
+        conn = self._connection()
+        n_docs, total_length = conn.execute("SELECT n_docs, total_length FROM stats WHERE id = 0").fetchone()
+        if n_docs == 0:
+            return []
+        avg_length = total_length / n_docs
+
+        protocols = self._protocols_in_range(since, until)
+        postings = {}
+        idf = {}
+        for term in terms:
+            df, postings[term] = self._postings(term, protocols)
+            idf[term] = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+        # Kandidaten: Phrasen müssen vollständig vorkommen, sonst genügt ein Term
+        candidates = set().union(*(postings[term].keys() for term in terms))
+        for phrase in phrases:
+            candidates &= set.intersection(*(set(postings[term]) for term in phrase))
+            if candidates:
+                candidates = self._phrase_matches(phrase, candidates)
+        if not candidates:
+            return []
+
+        # Metadaten der Kandidaten laden und filtern
+        party_filter = {party_key(party) for party in parties} if parties is not None else None
+        speaker_filter = set(speakers) if speakers is not None else None
+        meta = {}
+        candidate_list = list(candidates)
+        for start in range(0, len(candidate_list), 900):
+            chunk = candidate_list[start:start + 900]
+            placeholders = ",".join("?" * len(chunk))
+            for row in conn.execute(
+                f"SELECT doc_id, protocol_id, position, speaker, party, date, length FROM docs "
+                f"WHERE doc_id IN ({placeholders})", chunk
+            ):
+                if party_filter is not None and row[4] not in party_filter:
+                    continue
+                if speaker_filter is not None and row[3] not in speaker_filter:
+                    continue
+                meta[row[0]] = row
+
+        scored = []
+        for doc_id, row in meta.items():
+            length = row[6]
+            score = 0.0
+            for term in terms:
+                tf = postings[term].get(doc_id)
+                if tf:
+                    score += idf[term] * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+            scored.append((score, doc_id))
+        scored.sort(reverse=True)
+
+        results = []
+        for score, doc_id in scored[:limit]:
+            _, protocol_id, position, speaker, party, sitting_date, _ = meta[doc_id]
+            results.append(SearchResult(
+                score=score, protocol_id=protocol_id, position=position, speaker=speaker,
+                party=party, date=sitting_date, snippet=self._snippet(doc_id, terms),
+            ))
+        return results
+
+    def _snippet(self, doc_id: int, terms: List[str], width: int = 160) -> str:
+        row = self._connection().execute("SELECT content FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+        content = zlib.decompress(row[0]).decode("utf-8").replace("\n", " ")
+        lowered = content.lower()
+        hit = min((i for i in (lowered.find(term) for term in terms) if i >= 0), default=0)
+        start = max(0, hit - width // 2)
+        return ("…" if start else "") + content[start:start + width] + "…"
@@ -0,0 +1,364 @@
+"""Sprechererkennung über eine Namensliste (Aho-Corasick)
+
+Das Zeilenmuster "Name (Partei):" verfehlt das Präsidium ("Präsidentin
+Bärbel Bas:") und Regierungsmitglieder ohne Fraktion ("Olaf Scholz,
+Bundeskanzler:"), hält aber jede Zeile der Form "X (Y):" für einen
+Rednerwechsel. Stattdessen werden alle Namen aus data/roster.csv in einen
+Aho-Corasick-Automaten geladen; ein Durchlauf über einen Seitentext findet
+alle Vorkommen aller Namen in linearer Zeit.
+
+Ein Treffer ist ein Rednerwechsel, wenn er am Zeilenanfang steht (nach
+optionaler Funktion wie "Vizepräsidentin" und Titeln wie "Dr.") und die
+Zeile danach passt: "(Fraktion):", ", Bundesminister ...:" oder – nach
+einer Präsidiumsfunktion – direkt ":". Alle anderen Treffer sind
+Erwähnungen. Jeder Treffer verweist auf die kanonische ID der Person.
+
+Ohne Namensliste erkennt match_turn_line Rednerwechsel nur nach ihrer Form.
+
+data/roster.csv (erzeugt von der Pipeline-Stufe "roster" oder mit "roster.py build"):
+
+    id,name,party,roles,aliases
+    11004941,Bärbel Bas,SPD,mdb|praesidium,
+"""
+import csv
+import os
+import re
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from _protocol_store import BASE_DIR
+
+ROSTER_FILE = BASE_DIR / "data" / "roster.csv"
+ROSTER_FIELDS = ["id", "name", "party", "roles", "aliases"]
+ROLES = ["mdb", "praesidium", "regierung"]
+
+PARTIES = ["SPD", "CDU/CSU", "GRÜNE", "FDP", "AfD", "LINKE", "BSW", "fraktionslos"]
+
+_PARTY_PATTERN = re.compile(
+    r"(?P<cdu>CDU/CSU)"
+    r"|(?P<spd>\bSPD\b)"
+    r"|(?P<gruene>BÜNDNIS(?:SES)?\s*90/\s*DIE\s*GRÜNEN|\bGRÜNEN?\b|\bGrünen\b)"
+    r"|(?P<fdp>\bFDP\b)"
+    r"|(?P<afd>\bAfD\b)"
+    r"|(?P<linke>\bDIE\s+LINKE\b|\bDie\s+Linke\b|\bLINKEN?\b|\bLinken\b)"
+    r"|(?P<bsw>\bBSW\b)"
+    r"|(?P<fraktionslos>\bfraktionslos)"
+)
+_PARTY_GROUPS = {"cdu": "CDU/CSU", "spd": "SPD", "gruene": "GRÜNE", "fdp": "FDP", "afd": "AfD",
+                 "linke": "LINKE", "bsw": "BSW", "fraktionslos": "fraktionslos"}
+
+# Funktion und Titel vor dem Namen, z. B. "Vizepräsidentin Dr. " oder "Prof. Dr. h. c. "
+_PREFIX = re.compile(
+    r"(?P<role>(?:Alters|Vize)?[Pp]räsident(?:in)?\s+)?"
+    r"(?P<titles>(?:(?:Prof|Dr)\.(?:\s*[a-z]+\.)*\s*)*)"
+)
+# Amtsbezeichnung nach dem Namen: Kommas nur vor einem großgeschriebenen Wort
+# ("für Familie, Senioren, Frauen und Jugend"), nicht vor Redetext ("…, hat gesagt:")
+_OFFICE = (r"(?:Bundes|Staats|Parl\.|Minister|Beauftragt|Wehrbeauftragt)"
+           r"(?:[^():,\d]|,\s*(?=[A-ZÄÖÜ])){0,120}")
+# Zeilenrest nach dem Namen bei einem Rednerwechsel
+_TURN_SUFFIX = re.compile(
+    r"\s*\((?P<party>[^()\n]{2,60})\):"
+    r"|,\s*(?P<office>" + _OFFICE.replace("{0,120}", "{0,120}?") + r"):"
+    r"|(?P<chair>\s*:)"
+)
+_WRAPPED_HYPHEN = re.compile(r"-\s*\n\s*(?=[a-zäöüß])")
+
+
+def canonical_party(text: Optional[str]) -> Optional[str]:
+    """Fraktionsbezeichnung in die Kurzform aus PARTIES (z. B. "BÜNDNIS 90/DIE GRÜNEN" -> "GRÜNE")"""
+    if not text:
+        return None
+    match = _PARTY_PATTERN.search(text)
+    return _PARTY_GROUPS[match.lastgroup] if match else None
+
+
+def parties_in(text: str) -> List[str]:
+    """Alle in einem Text genannten Fraktionen (Kurzform, ohne Duplikate, in Textreihenfolge)"""
+    return list(dict.fromkeys(_PARTY_GROUPS[m.lastgroup] for m in _PARTY_PATTERN.finditer(text)))
+
+
+@dataclass(frozen=True)
+class Person:
+    id: str
+    name: str
+    party: Optional[str]
+    roles: Tuple[str, ...] = ()
+    aliases: Tuple[str, ...] = ()
+
+
+class Hit(NamedTuple):
+    start: int
+    end: int  # bei Rednerwechseln hinter dem Doppelpunkt
+    person: Person
+    turn: bool
+    party: Optional[str]  # Fraktion laut Rednerzeile (Originalschreibweise)
+    role: Optional[str]  # "Präsidentin", "Bundesminister der Finanzen", ...
+
+
+class Automaton:
+    """Aho-Corasick-Automat über Zeichen
+
+    Zustände sind Dicts (Zeichen -> Folgezustand); jeder Zustand kennt seine
+    Ausgaben (Musterlänge, Wert) einschließlich derer seiner Fehlerkette.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, object]]] = [[]]
+
+    def add(self, pattern: str, value):
+        goto = self._goto
+        state = 0
+        for char in pattern:
+            nxt = goto[state].get(char)
+            if nxt is None:
+                nxt = goto[state][char] = len(goto)
+                goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), value))
+
+    def build(self) -> "Automaton":
+        """Fehlerübergänge in Breitensuche berechnen (nach dem letzten add)"""
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and char not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(char, 0)
+                if out[fail[nxt]]:
+                    out[nxt] = out[nxt] + out[fail[nxt]]
+        return self
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int, object]]:
+        """Alle Vorkommen als (Anfang, Ende, Wert), sortiert nach Ende"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                for length, value in out[state]:
+                    yield i + 1 - length, i + 1, value
+
+    def longest_prefix(self, text: str, pos: int = 0) -> Optional[Tuple[int, object]]:
+        """Längstes Muster, das genau bei pos beginnt, als (Ende, Wert) – nur ein Abstieg im Trie"""
+        goto, out = self._goto, self._out
+        state, best = 0, None
+        for i in range(pos, len(text)):
+            state = goto[state].get(text[i])
+            if state is None:
+                break
+            depth = i + 1 - pos
+            for length, value in out[state]:
+                if length == depth:
+                    best = (i + 1, value)
+                    break
+        return best
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "-"
+
+
+class SpeakerIndex:
+    """Namensliste als Automat: Rednerwechsel und Erwähnungen mit kanonischer ID"""
+
+    def __init__(self, people: Iterable[Person]):
+        self.people: Dict[str, Person] = {}
+        automaton = Automaton()
+        forms: Dict[str, List[Person]] = {}
+        for person in people:
+            self.people[person.id] = person
+            for form in (person.name, *person.aliases):
+                candidates = forms.setdefault(form, [])
+                if person not in candidates:
+                    candidates.append(person)
+        for form, candidates in forms.items():
+            automaton.add(form, tuple(candidates))
+        self._automaton = automaton.build()
+
+    @classmethod
+    def load(cls, path: Path = ROSTER_FILE) -> "SpeakerIndex":
+        return cls(read_roster(path))
+
+    def __len__(self) -> int:
+        return len(self.people)
+
+    @staticmethod
+    def _choose(candidates: Tuple[Person, ...], party: Optional[str]) -> Person:
+        """Namensgleiche Personen über die Fraktion unterscheiden"""
+        if len(candidates) > 1 and party:
+            short = canonical_party(party)
+            for person in candidates:
+                if person.party == short:
+                    return person
+        return candidates[0]
+
+    def _turn(self, text: str, line_start: int, start: int, end: int,
+              candidates: Tuple[Person, ...]) -> Optional[Hit]:
+        prefix = _PREFIX.fullmatch(text, line_start, start)
+        if prefix is None:
+            return None
+        suffix = _TURN_SUFFIX.match(text, end)
+        if suffix is None:
+            return None
+        chair = prefix.group("role")
+        if suffix.group("chair") is not None and not chair:
+            return None
+        party = suffix.group("party")
+        if party is not None and canonical_party(party) is None:
+            # "(Bayern)": Mitglied des Bundesrats, kein Bundestagsmandat
+            role = party
+            party = None
+        elif suffix.group("office") is not None:
+            # Über den Zeilenumbruch getrennte Amtsbezeichnung ("wirtschaftli-\nche") zusammenfügen
+            role = " ".join(_WRAPPED_HYPHEN.sub("", suffix.group("office")).split())
+        else:
+            role = chair.strip() if chair else None
+        return Hit(line_start, suffix.end(), self._choose(candidates, party), True, party, role)
+
+    def match_turn(self, line: str) -> Optional[Hit]:
+        """Rednerwechsel am Anfang einer Zeile (kein Durchlauf über die ganze Zeile)"""
+        prefix = _PREFIX.match(line)
+        found = self._automaton.longest_prefix(line, prefix.end())
+        if found is None:
+            return None
+        end, candidates = found
+        if end < len(line) and _is_word_char(line[end]):
+            return None
+        return self._turn(line, 0, prefix.end(), end, candidates)
+
+    def scan(self, text: str) -> List[Hit]:
+        """Alle Rednerwechsel und Erwähnungen eines Texts in einem Durchlauf
+
+        Überlappende Treffer werden links-längst aufgelöst ("Anna Maria Müller"
+        statt "Maria Müller").
+        """
+        candidates = []
+        for start, end, people in self._automaton.iter(text):
+            if start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if end < len(text) and _is_word_char(text[end]):
+                continue
+            candidates.append((start, -end, people))
+        candidates.sort()
+
+        hits = []
+        covered = 0
+        for start, neg_end, people in candidates:
+            end = -neg_end
+            if start < covered:
+                continue
+            covered = end
+            line_start = text.rfind("\n", 0, start) + 1
+            hit = self._turn(text, line_start, start, end, people)
+            if hit is None:
+                hit = Hit(start, end, self._choose(people, None), False, None, None)
+            hits.append(hit)
+        return hits
+
+
+def read_roster(path: Path = ROSTER_FILE) -> List[Person]:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return [
+            Person(
+                id=row["id"],
+                name=row["name"],
+                party=row["party"] or None,
+                roles=tuple(filter(None, row["roles"].split("|"))),
+                aliases=tuple(filter(None, row["aliases"].split("|"))),
+            )
+            for row in csv.DictReader(f)
+        ]
+
+
+def write_roster(people: Iterable[Person], path: Path = ROSTER_FILE):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".csv.tmp")
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(ROSTER_FIELDS)
+        for person in sorted(people, key=lambda p: (p.name, p.id)):
+            writer.writerow([person.id, person.name, person.party or "", "|".join(person.roles),
+                             "|".join(person.aliases)])
+    os.replace(tmp_path, path)
+
+
+def roster_path() -> Optional[Path]:
+    """Namensliste aus BUNDESTAG_ROSTER (Pfad oder "none") bzw. data/roster.csv, falls vorhanden"""
+    setting = os.environ.get("BUNDESTAG_ROSTER", "")
+    if setting == "none":
+        return None
+    path = Path(setting) if setting else ROSTER_FILE
+    return path if path.exists() else None
+
+
+@lru_cache(maxsize=None)
+def default_speaker_index() -> Optional[SpeakerIndex]:
+    """Index aus roster_path(); ohne Namensliste None"""
+    path = roster_path()
+    return SpeakerIndex.load(path) if path is not None else None
+
+
+# --- Rednerzeilen ohne Namensliste (zum Aufbau der Namensliste) -----------------
+
+_NAME = r"[A-ZÄÖÜ][\w'.-]+(?:\s+(?:(?:von|van|de|der|den|zu|vom)\s+)*[A-ZÄÖÜ][\w'-]+){1,3}"
+_TURN_LINE = re.compile(_PREFIX.pattern + r"(?P<name>" + _NAME + r")(?=[\s,(:])(?:" + _TURN_SUFFIX.pattern + ")")
+
+
+def name_slug(name: str) -> str:
+    """Lesbare ID für Personen ohne Stammdaten-ID, z. B. "Cem Özdemir" -> "cem-oezdemir" """
+    text = name.lower().translate(str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"}))
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "-", text).strip("-")
+
+
+def match_turn_line(line: str) -> Optional[Hit]:
+    """Rednerwechsel am Zeilenanfang nach Form statt nach Namensliste
+
+    Wie SpeakerIndex.match_turn, erkennt also auch Präsidium ("Präsidentin
+    Bärbel Bas:") und Regierung; die Person trägt die ID, die roster.py ohne
+    Stammdaten vergeben würde. Zeilen mit unbekannter Fraktion in Klammern
+    ("(Bayern)") werden ignoriert.
+    """
+    match = _TURN_LINE.match(line)
+    if match is None:
+        return None
+    party = None
+    if match.group("chair") is not None:
+        if not match.group("role"):
+            return None
+        kind, role = "praesidium", match.group("role").strip()
+    elif match.group("office") is not None:
+        kind, role = "regierung", " ".join(match.group("office").split())
+    else:
+        party = match.group("party")
+        if canonical_party(party) is None:
+            return None
+        kind, role = "mdb", None
+    name = match.group("name")
+    person = Person(name_slug(name), name, canonical_party(party), (kind,))
+    return Hit(0, match.end(), person, True, party, role)
+
+
+def parse_turn_line(line: str) -> Optional[Tuple[str, Optional[str], str]]:
+    """Rednerzeile nach Form statt nach Namensliste: (Name, Fraktion, Rolle) oder None
+
+    Rolle ist "mdb", "praesidium" oder "regierung".
+    """
+    hit = match_turn_line(line)
+    return (hit.person.name, hit.person.party, hit.person.roles[0]) if hit is not None else None
@@ -1,48 +1,59 @@
-import json
-import os
-import re
+import argparse
+from pathlib import Path
+
+import joblib
 import pandas as pd
-from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.decomposition import LatentDirichletAllocation
 
-# 🔹 Stopword-Datei einlesen
-stopword_file = "data/german_stopwords_full.txt"
-
-def load_stopwords(file_path):
-    stopwords = set()
-    with open(file_path, "r", encoding="utf-8") as f:
-        for line in f:
-            word = line.strip().lower()
-            if word and not word.startswith(";"):  # Kommentare ignorieren
-                stopwords.add(word)
-    return stopwords
-
-stopwords = load_stopwords(stopword_file)
-print(f"✅ {len(stopwords)} Stopwords geladen.")
-
-# 🔹 JSON-Daten einlesen
-json_dir = "data/json"
-documents = []
-session_numbers = []
-
-for json_file in sorted(os.listdir(json_dir)):
-    if json_file.endswith(".json"):
-        with open(os.path.join(json_dir, json_file), "r", encoding="utf-8") as f:
-            data = json.load(f)
-            text = data["text"].lower()
-            text = re.sub(r"[^a-zäöüß ]", "", text)  # Sonderzeichen entfernen
-            words = [word for word in text.split() if word not in stopwords]  # Stopwords filtern
-            documents.append(" ".join(words))
-            session_numbers.append(data["sitzungsnummer"])
-
-# 🔹 Feature-Extraktion (Bag-of-Words)
-vectorizer = CountVectorizer(max_df=0.95, min_df=2, stop_words=list(stopwords))
-X = vectorizer.fit_transform(documents)
-
-# 🔹 LDA-Modell trainieren
+from _dtm_store import DocumentTermStore
+from _preprocessing import TokenCache, load_corpus
+from _protocol_store import BASE_DIR
+from _tracing import profiled, span
+
+MODEL_FILE = BASE_DIR / "data" / "models" / "lda.joblib"
+TOPICS_FILE = BASE_DIR / "data" / "topic_clustering.csv"
+DISTRIBUTIONS_FILE = BASE_DIR / "data" / "topic_distributions.csv"
+
 num_topics = 5  # Anzahl der Themen
-lda = LatentDirichletAllocation(n_components=num_topics, random_state=42)
-lda.fit(X)
+
+
+def create_lda(n_topics=num_topics, n_jobs=-1):
+    # Online-Lernen, damit das gespeicherte Modell später per partial_fit weiterlernen kann
+    return LatentDirichletAllocation(
+        n_components=n_topics,
+        learning_method="online",
+        random_state=42,
+        n_jobs=n_jobs,
+    )
+
+
+def fit_full(X, n_topics=num_topics, n_jobs=-1):
+    """Trainiert das LDA-Modell komplett neu"""
+    lda = create_lda(n_topics, n_jobs)
+    with span("lda.fit", documents=X.shape[0], terms=X.shape[1]), profiled("lda"):
+        lda.fit(X)
+    return lda
+
+
+def update_incremental(lda, X_new, batch_size=128):
+    """Aktualisiert ein trainiertes Modell mit neuen Dokumenten (Online-LDA)"""
+    with span("lda.partial_fit", documents=X_new.shape[0]), profiled("lda"):
+        for start in range(0, X_new.shape[0], batch_size):
+            lda.partial_fit(X_new[start:start + batch_size])
+    return lda
+
+
+def save_model(lda, terms, doc_ids, model_file=MODEL_FILE):
+    """Speichert Modell, Termliste (= Vektorisierer) und trainierte Dokumente"""
+    model_file = Path(model_file)
+    model_file.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump({"lda": lda, "terms": list(terms), "doc_ids": list(doc_ids)}, model_file)
+
+
+def load_model(model_file=MODEL_FILE):
+    model_file = Path(model_file)
+    return joblib.load(model_file) if model_file.exists() else None
+
 
 # 🔹 Top-Wörter pro Thema extrahieren
 def get_top_words(model, feature_names, n_top_words=10):
@@ -51,14 +62,71 @@ def get_top_words(model, feature_names, n_top_words=10):
         topics[f"Thema {topic_idx+1}"] = [feature_names[i] for i in topic.argsort()[:-n_top_words - 1:-1]]
     return topics
 
-top_words = get_top_words(lda, vectorizer.get_feature_names_out())
 
-# 🔹 Ergebnisse als DataFrame anzeigen
-df_topics = pd.DataFrame(top_words)
+def run(incremental=False, n_topics=num_topics, n_jobs=-1):
+    """Aktualisiert DTM und LDA-Modell und schreibt die Themen-CSVs"""
+    # 🔹 Protokolle laden (normalisierte Token aus dem Cache)
+    cache = TokenCache()
+    session_numbers, tokens = load_corpus(cache=cache)
+    print(f"✅ {len(session_numbers)} Sitzungen geladen ({cache.hits} aus dem Cache, {cache.misses} neu tokenisiert).")
+
+    # 🔹 Bag-of-Words: nur neue/geänderte Sitzungen an die gespeicherte Matrix anhängen
+    store = DocumentTermStore()
+    added = store.add_documents(zip(session_numbers, tokens))
+    print(f"✅ Dokument-Term-Matrix: {added} Sitzungen neu, {len(store.vocabulary)} Terme insgesamt.")
+
+    bundle = load_model() if incremental else None
+    if bundle is None:
+        # 🔹 LDA-Modell komplett trainieren
+        X, feature_names, _ = store.matrix(max_df=0.95, min_df=2, doc_ids=session_numbers)
+        lda = fit_full(X, n_topics, n_jobs)
+        trained = list(session_numbers)
+        print("✅ LDA-Modell neu trainiert.")
+    else:
+        # 🔹 Nur neue Sitzungen nachtrainieren (Termliste des Modells bleibt fest)
+        lda, feature_names, trained = bundle["lda"], bundle["terms"], bundle["doc_ids"]
+        lda.n_jobs = n_jobs
+        known = set(trained)
+        new_sessions = [session for session in session_numbers if session not in known]
+        if new_sessions:
+            update_incremental(lda, store.rows(new_sessions, feature_names))
+            trained += new_sessions
+        print(f"✅ LDA-Modell mit {len(new_sessions)} neuen Sitzungen aktualisiert.")
+        X = store.rows(session_numbers, feature_names)
+
+    save_model(lda, feature_names, trained)
+
+    # 🔹 Themenverteilung pro Sitzung
+    with span("lda.transform", documents=X.shape[0]):
+        distributions = lda.transform(X)
+    df_distributions = pd.DataFrame(
+        distributions, columns=[f"Thema {i+1}" for i in range(distributions.shape[1])]
+    )
+    df_distributions.insert(0, "Sitzungsnummer", session_numbers)
+    df_distributions.to_csv(DISTRIBUTIONS_FILE, encoding="utf-8", index=False)
+
+    top_words = get_top_words(lda, feature_names)
+
+    # 🔹 Ergebnisse als DataFrame anzeigen
+    df_topics = pd.DataFrame(top_words)
+
+    # Alternative: DataFrame ausgeben oder speichern
+    print(df_topics)
+
+    # Optional: Speichern als CSV
+    df_topics.to_csv(TOPICS_FILE, encoding="utf-8", index=False)
+    print(f"✅ Themen-Clustering gespeichert: {TOPICS_FILE} & {DISTRIBUTIONS_FILE}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LDA-Themenmodell über alle Sitzungen")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Gespeichertes Modell nur mit neuen Sitzungen aktualisieren")
+    parser.add_argument("--topics", type=int, default=num_topics, help="Anzahl der Themen")
+    parser.add_argument("--jobs", type=int, default=-1, help="Anzahl Kerne für das Training")
+    args = parser.parse_args()
+    run(args.incremental, args.topics, args.jobs)
 
-# Alternative: DataFrame ausgeben oder speichern
-print(df_topics)
 
-# Optional: Speichern als CSV
-df_topics.to_csv("data/topic_clustering.csv", encoding="utf-8", index=False)
-print("✅ Themen-Clustering gespeichert: data/topic_clustering.csv")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
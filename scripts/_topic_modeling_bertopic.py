@@ -1,60 +1,73 @@
-import json
-import os
-import re
+import argparse
 import pandas as pd
 from bertopic import BERTopic
-from sklearn.feature_extraction.text import CountVectorizer
-
-# 🔹 Stopword-Datei einlesen
-stopword_file = "data/german_stopwords_full.txt"
-
-def load_stopwords(file_path):
-    stopwords = set()
-    with open(file_path, "r", encoding="utf-8") as f:
-        for line in f:
-            word = line.strip().lower()
-            if word and not word.startswith(";"):  # Kommentare ignorieren
-                stopwords.add(word)
-    return stopwords
-
-stopwords = load_stopwords(stopword_file)
-print(f"✅ {len(stopwords)} Stopwords geladen.")
-
-# 🔹 JSON-Daten einlesen
-json_dir = "data/json"
-documents = []
-session_numbers = []
-
-for json_file in sorted(os.listdir(json_dir)):
-    if json_file.endswith(".json"):
-        with open(os.path.join(json_dir, json_file), "r", encoding="utf-8") as f:
-            data = json.load(f)
-            text = data["text"].lower()
-            text = re.sub(r"[^a-zäöüß ]", "", text)  # Sonderzeichen entfernen
-            words = [word for word in text.split() if word not in stopwords]  # Stopwords filtern
-            documents.append(" ".join(words))
-            session_numbers.append(data["sitzungsnummer"])
-
-# 🔹 BERTopic-Modell trainieren
-print("🚀 Training von BERTopic...")
-topic_model = BERTopic(language="german", calculate_probabilities=True, verbose=True)
-topics, probs = topic_model.fit_transform(documents)
-
-# 🔹 Ergebnisse als DataFrame speichern
-df_topics = pd.DataFrame({
-    "Sitzungsnummer": session_numbers,
-    "Thema": topics
-})
-
-# 🔹 Thema-Beschreibungen holen
-topic_info = topic_model.get_topic_info()
-df_topic_words = pd.DataFrame(topic_info)
-
-# 🔹 Ergebnisse speichern und anzeigen
-df_topics.to_csv("data/topic_clusters.csv", encoding="utf-8", index=False)
-df_topic_words.to_csv("data/topic_words.csv", encoding="utf-8", index=False)
-
-print("✅ Themen-Clustering gespeichert: data/topic_clusters.csv & data/topic_words.csv")
-
-# 🔹 Interaktive Visualisierung starten
-topic_model.visualize_barchart(top_n_topics=10)
\ No newline at end of file
+from hdbscan import HDBSCAN
+from sentence_transformers import SentenceTransformer
+from umap import UMAP
+
+from _embedding_store import EmbeddingStore
+from _preprocessing import TokenCache, load_corpus
+from _tracing import span
+
+# Standardmodell von BERTopic für language="german"
+EMBEDDING_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BERTopic-Themenmodell über alle Sitzungen")
+    parser.add_argument("--embedding-model", default=EMBEDDING_MODEL)
+    parser.add_argument("--n-neighbors", type=int, default=15, help="UMAP n_neighbors")
+    parser.add_argument("--n-components", type=int, default=5, help="UMAP n_components")
+    parser.add_argument("--min-cluster-size", type=int, default=10, help="HDBSCAN min_cluster_size")
+    args = parser.parse_args()
+
+    # 🔹 Protokolle laden (normalisierte Token aus dem Cache)
+    cache = TokenCache()
+    session_numbers, tokens = load_corpus(cache=cache)
+    documents = [" ".join(words) for words in tokens]
+    print(f"✅ {len(documents)} Sitzungen geladen ({cache.hits} aus dem Cache, {cache.misses} neu tokenisiert).")
+
+    # 🔹 Embeddings aus dem Cache, nur neue Dokumente werden kodiert
+    encoder = SentenceTransformer(args.embedding_model)
+    store = EmbeddingStore(args.embedding_model)
+    embeddings = store.embed(
+        documents, lambda texts: encoder.encode(texts, batch_size=32, show_progress_bar=True)
+    )
+    print(f"✅ {len(documents)} Embeddings bereit ({len(store)} im Cache).")
+
+    # 🔹 BERTopic-Modell trainieren (nur UMAP/HDBSCAN laufen neu)
+    print("🚀 Training von BERTopic...")
+    topic_model = BERTopic(
+        embedding_model=encoder,
+        umap_model=UMAP(n_neighbors=args.n_neighbors, n_components=args.n_components,
+                        min_dist=0.0, metric="cosine", random_state=42),
+        hdbscan_model=HDBSCAN(min_cluster_size=args.min_cluster_size, metric="euclidean",
+                              cluster_selection_method="eom", prediction_data=True),
+        calculate_probabilities=True,
+        verbose=True,
+    )
+    with span("bertopic.fit_transform", documents=len(documents)):
+        topics, probs = topic_model.fit_transform(documents, embeddings=embeddings)
+
+    # 🔹 Ergebnisse als DataFrame speichern
+    df_topics = pd.DataFrame({
+        "Sitzungsnummer": session_numbers,
+        "Thema": topics
+    })
+
+    # 🔹 Thema-Beschreibungen holen
+    topic_info = topic_model.get_topic_info()
+    df_topic_words = pd.DataFrame(topic_info)
+
+    # 🔹 Ergebnisse speichern und anzeigen
+    df_topics.to_csv("data/topic_clusters.csv", encoding="utf-8", index=False)
+    df_topic_words.to_csv("data/topic_words.csv", encoding="utf-8", index=False)
+
+    print("✅ Themen-Clustering gespeichert: data/topic_clusters.csv & data/topic_words.csv")
+
+    # 🔹 Interaktive Visualisierung starten
+    topic_model.visualize_barchart(top_n_topics=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""Leichtgewichtiges Tracing: Spans, Zähler, Prometheus-Export und Sampling-Profiler
+
+Standardmäßig ausgeschaltet; dann liefern span() und count() sofort zurück.
+Eingeschaltet wird über Umgebungsvariablen (gelten auch für Worker-Prozesse):
+
+    BUNDESTAG_TRACE=1|<pfad>       Spans und Zähler als JSONL (Standard: data/traces/trace.jsonl)
+    BUNDESTAG_METRICS_PORT=9108    Prometheus-Textformat unter http://localhost:<port>/metrics
+    BUNDESTAG_METRICS_FILE=<pfad>  Prometheus-Textdatei für den node-exporter, beim Beenden geschrieben
+                                   (Standard bei gesetztem Port: data/traces/bundestag.prom)
+    BUNDESTAG_PROFILE=extract,lda  Sampling-Profiler für diese Stufen (siehe profiled())
+
+Worker-Prozesse sammeln Spans und Zähler in ihrer eigenen Registry und geben
+die Summen mit dem Aufgabenergebnis zurück (worker_totals()); der Hauptprozess
+führt sie mit merge_totals() zusammen und exportiert alles gemeinsam.
+"""
+import atexit
+import collections
+import contextvars
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from _protocol_store import BASE_DIR
+
+TRACE_DIR = BASE_DIR / "data" / "traces"
+
+_trace_setting = os.environ.get("BUNDESTAG_TRACE", "")
+_metrics_port = os.environ.get("BUNDESTAG_METRICS_PORT", "")
+_metrics_file = os.environ.get("BUNDESTAG_METRICS_FILE", "")
+_profile_stages = {name.strip() for name in os.environ.get("BUNDESTAG_PROFILE", "").split(",") if name.strip()}
+
+ENABLED = bool(_trace_setting or _metrics_port or _metrics_file)
+
+
+class _NoopSpan:
+    """Wird bei ausgeschaltetem Tracing zurückgegeben – kostet nur einen Funktionsaufruf"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _Registry:
+    """Aggregierte Metriken pro Prozess (für Prometheus) und JSONL-Senke"""
+
+    def __init__(self, trace_path: Optional[Path]):
+        self.reset()
+        self.file = None
+        if trace_path is not None:
+            trace_path.parent.mkdir(parents=True, exist_ok=True)
+            # O_APPEND: Zeilen mehrerer Worker-Prozesse landen vollständig in derselben Datei
+            self.file = open(trace_path, "a", encoding="utf-8", buffering=1)
+            atexit.register(self.file.close)
+
+    def reset(self):
+        """Leert die Summen – nach fork(), damit Worker die Werte des Elternprozesses nicht doppelt melden"""
+        self.lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Tuple], float] = collections.defaultdict(float)
+        self.span_count: Dict[str, int] = collections.defaultdict(int)
+        self.span_seconds: Dict[str, float] = collections.defaultdict(float)
+
+    def drain(self) -> Dict[str, List]:
+        """Gibt die seit dem letzten Aufruf gesammelten Summen zurück und setzt sie zurück"""
+        with self.lock:
+            totals = {
+                "counters": [(name, labels, value) for (name, labels), value in self.counters.items()],
+                "spans": [(name, n, self.span_seconds[name]) for name, n in self.span_count.items()],
+            }
+            self.counters.clear()
+            self.span_count.clear()
+            self.span_seconds.clear()
+        return totals
+
+    def merge(self, totals: Dict[str, List]):
+        """Summen eines Worker-Prozesses übernehmen (dessen JSONL-Zeilen sind bereits geschrieben)"""
+        with self.lock:
+            for name, labels, value in totals["counters"]:
+                self.counters[(name, tuple(tuple(item) for item in labels))] += value
+            for name, n, seconds in totals["spans"]:
+                self.span_count[name] += n
+                self.span_seconds[name] += seconds
+
+    def emit(self, record: Dict):
+        if self.file is not None:
+            line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+            with self.lock:
+                self.file.write(line)
+
+    def record_span(self, name: str, seconds: float, record: Dict):
+        with self.lock:
+            self.span_count[name] += 1
+            self.span_seconds[name] += seconds
+        self.emit(record)
+
+    def add(self, name: str, value: float, labels: Dict):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] += value
+        self.emit({"type": "counter", "name": name, "value": value, "labels": labels,
+                   "ts": time.time(), "pid": os.getpid()})
+
+    def prometheus_text(self) -> str:
+        lines = []
+        with self.lock:
+            for name in sorted(self.span_count):
+                metric = _metric_name(name) + "_seconds"
+                lines.append(f"# TYPE {metric} summary")
+                lines.append(f"{metric}_count {self.span_count[name]}")
+                lines.append(f"{metric}_sum {self.span_seconds[name]:.6f}")
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                metric = _metric_name(name) + "_total"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} counter")
+                    typed.add(metric)
+                label_text = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels)
+                lines.append(f"{metric}{{{label_text}}} {value:g}" if label_text else f"{metric} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Path):
+        """Prometheus-Textdatei atomar ersetzen, damit der node-exporter nie eine halbe Datei liest"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+        tmp_path.write_text(self.prometheus_text(), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _metric_name(name: str) -> str:
+    return "bundestag_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "id", "parent", "started", "_token")
+
+    def __init__(self, name: str, attrs: Dict):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        # ContextVar statt Thread-Stack: funktioniert auch mit nebenläufigen asyncio-Tasks
+        self.id = next(_ids)
+        self.parent = _current_span.get()
+        self._token = _current_span.set(self.id)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        _current_span.reset(self._token)
+        record = {"type": "span", "name": self.name, "seconds": round(seconds, 6), "ts": time.time(),
+                  "pid": os.getpid(), "thread": threading.get_ident(), "id": self.id, "parent": self.parent,
+                  **self.attrs}
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        _registry.record_span(self.name, seconds, record)
+        return False
+
+    def set(self, **attrs):
+        """Attribute nachträglich ergänzen (z. B. Anzahl Seiten nach der Extraktion)"""
+        self.attrs.update(attrs)
+
+
+def span(name: str, **attrs):
+    """Misst einen Abschnitt: `with span("extract.page", page=3): ...`"""
+    if not ENABLED:
+        return _NOOP
+    return _Span(name, attrs)
+
+
+def count(name: str, value: float = 1, **labels):
+    """Erhöht einen Zähler, z. B. count("download.bytes", size, status="200")"""
+    if ENABLED:
+        _registry.add(name, value, labels)
+
+
+def worker_totals() -> Optional[Dict[str, List]]:
+    """Im Worker: gesammelte Summen für die Rückgabe an den Hauptprozess abholen"""
+    if not ENABLED:
+        return None
+    return _registry.drain()
+
+
+def merge_totals(totals: Optional[Dict[str, List]]):
+    """Im Hauptprozess: Summen aus worker_totals() eines Workers übernehmen"""
+    if totals:
+        _registry.merge(totals)
+
+
+# --- Prometheus ---------------------------------------------------------------
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = _registry.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_metrics(port: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+# --- Sampling-Profiler ----------------------------------------------------------
+
+class SamplingProfiler:
+    """Tastet in festen Abständen den Stack eines Threads ab (sys._current_frames)
+
+    Ergebnis im "folded"-Format (eine Zeile pro Stack mit Anzahl), direkt
+    verwendbar mit flamegraph.pl oder speedscope.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.samples: collections.Counter = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for stack, n in self.samples.most_common():
+                f.write(f"{stack} {n}\n")
+
+
+@contextmanager
+def profiled(stage: str, interval: float = 0.005):
+    """Profiliert den Block, wenn die Stufe in BUNDESTAG_PROFILE steht"""
+    if stage not in _profile_stages:
+        yield
+        return
+    profiler = SamplingProfiler(interval).start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        # Anhängen: mehrere Blöcke pro Prozess ergeben ein gemeinsames Profil (gleiche Stacks werden summiert)
+        profiler.write(TRACE_DIR / f"profile-{stage}-{os.getpid()}.folded")
+        count("profile.samples", sum(profiler.samples.values()), stage=stage)
+
+
+_ids = itertools.count(1)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("span", default=None)
+_registry = None
+if ENABLED:
+    _trace_path = None
+    if _trace_setting:
+        _trace_path = TRACE_DIR / "trace.jsonl" if _trace_setting == "1" else Path(_trace_setting)
+    _registry = _Registry(_trace_path)
+    os.register_at_fork(after_in_child=_registry.reset)
+    # Nur der Hauptprozess exportiert; Worker erben die Variable und liefern ihre Summen zurück
+    if (_metrics_port or _metrics_file) and not os.environ.get("_BUNDESTAG_METRICS_OWNER"):
+        os.environ["_BUNDESTAG_METRICS_OWNER"] = str(os.getpid())
+        _textfile = Path(_metrics_file) if _metrics_file else TRACE_DIR / "bundestag.prom"
+        atexit.register(_registry.write_textfile, _textfile)
+        if _metrics_port:
+            serve_metrics(int(_metrics_port))
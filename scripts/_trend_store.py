@@ -0,0 +1,396 @@
+"""Zeitreihen pro Sitzung: Termhäufigkeiten, Themenanteile und Sentiment
+
+Die Analyse-Skripte schreiben bisher einmalige CSV-Dateien ohne Datum. Hier
+wird pro Sitzung eine Zeile mit Sitzungsdatum angehängt; jede Kennzahl ist
+eine eigene Spalte als rohe Binärdatei, die nur wächst:
+
+    date.i8        Sitzungsdatum (Tage seit 1970)
+    tokens.i8      Anzahl Token (nach Stopwords und Textbausteinen)
+    sentiment.f4   Sentiment der Sitzung (NaN, solange nicht berechnet)
+    topics-K.f4    Themenanteile (Zeile × K Themen; K steht in meta.json)
+    term_nnz.i4    Terme pro Zeile; term_ids.i4 und term_counts.i4 bilden
+                   zusammen eine CSR-Matrix Zeile × Term (vocabulary.txt)
+
+Wird eine Sitzung neu tokenisiert, kommt eine neue Zeile hinzu und die alte
+gilt als überholt. meta.json wird zuletzt geschrieben und legt fest, wie
+viele Zeilen gültig sind; Reste eines abgebrochenen Laufs werden beim Öffnen
+abgeschnitten.
+
+Nach jedem Update werden Wochenaggregate (Sitzungswochen), gleitende
+Fenster und die aufsteigenden Begriffe jeder Woche vorberechnet; die Frage
+"was ist diese Woche Thema im Bundestag?" ist damit ein Dateizugriff.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from _dtm_store import DocumentTermStore
+from _protocol_parser import ProtocolParser
+from _protocol_store import BASE_DIR
+
+TRENDS_DIR = BASE_DIR / "data" / "trends"
+TOPIC_FILE = BASE_DIR / "data" / "topic_distributions.csv"
+SENTIMENT_FILE = BASE_DIR / "data" / "sentiment_sessions.csv"
+
+BASELINE_WEEKS = 8  # Vergleichsfenster für aufsteigende Begriffe (Sitzungswochen davor)
+ROLLING_WEEKS = 4  # gleitendes Mittel für Themen und Sentiment
+RISING_TOP = 50  # gespeicherte Begriffe pro Woche
+MIN_COUNT = 5  # Mindesthäufigkeit in der Woche
+SMOOTHING = 0.5
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+class _Column:
+    """Rohe Binärdatei mit festem Datentyp; Werte werden nur angehängt"""
+
+    def __init__(self, path: Path, dtype, width: int = 1):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.width = width
+
+    def __len__(self) -> int:
+        return self.path.stat().st_size // (self.dtype.itemsize * self.width) if self.path.exists() else 0
+
+    def append(self, values):
+        values = np.ascontiguousarray(values, self.dtype)
+        with open(self.path, "ab") as f:
+            f.write(values.tobytes())
+
+    def read(self) -> np.ndarray:
+        if not self.path.exists() or len(self) == 0:
+            shape = (0, self.width) if self.width > 1 else (0,)
+            return np.zeros(shape, self.dtype)
+        values = np.memmap(self.path, self.dtype, mode="r", shape=(len(self) * self.width,))
+        return values.reshape(-1, self.width) if self.width > 1 else values
+
+    def truncate(self, rows: int):
+        if len(self) > rows:
+            os.truncate(self.path, rows * self.dtype.itemsize * self.width)
+
+    def write_rows(self, rows: np.ndarray, values: np.ndarray):
+        """Nachträglich berechnete Werte (z. B. Sentiment) in bestehende Zeilen schreiben"""
+        data = np.memmap(self.path, self.dtype, mode="r+", shape=(len(self) * self.width,))
+        view = data.reshape(-1, self.width) if self.width > 1 else data
+        view[rows] = values
+        data.flush()
+
+
+def _save(path: Path, array: np.ndarray):
+    tmp_path = path.with_suffix(".tmp.npy")
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def _file_hash(path: Path) -> Optional[str]:
+    return hashlib.sha256(path.read_bytes()).hexdigest() if path.exists() else None
+
+
+def _read_per_session(path: Path, columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+    """Werte pro Sitzung aus einer Ergebnis-CSV (Spalte "Sitzungsnummer")"""
+    if not path.exists():
+        return {}
+    df = pd.read_csv(path, dtype={"Sitzungsnummer": str})
+    values = df[columns] if columns else df.drop(columns="Sitzungsnummer")
+    return dict(zip(df["Sitzungsnummer"], values.to_numpy(np.float32)))
+
+
+class TrendStore:
+    """Spaltenweise Zeitreihen pro Sitzung mit vorberechneten Wochenfenstern"""
+
+    def __init__(self, root: Path = TRENDS_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        meta_path = self.root / "meta.json"
+        meta = json.loads(meta_path.read_text(encoding="utf-8")) if meta_path.exists() else {}
+        self.rows: List[Dict] = meta.get("rows", [])  # {"session", "date", "hash"} in Anhängereihenfolge
+        self.n_topics: int = meta.get("n_topics", 0)
+        self.sources: Dict[str, Optional[str]] = meta.get("sources", {})
+        n_terms = meta.get("n_terms", 0)
+
+        vocabulary_path = self.root / "vocabulary.txt"
+        lines = vocabulary_path.read_text(encoding="utf-8").split("\n")[:-1] if vocabulary_path.exists() else []
+        self.vocabulary: List[str] = lines[:n_terms]
+        self.term_ids = {term: i for i, term in enumerate(self.vocabulary)}
+
+        self.date = _Column(self.root / "date.i8", np.int64)
+        self.tokens = _Column(self.root / "tokens.i8", np.int64)
+        self.sentiment = _Column(self.root / "sentiment.f4", np.float32)
+        self.topics = self._topic_column(self.n_topics)
+        # Themenspalten anderer Breite stammen aus einem abgebrochenen Modellwechsel
+        for path in self.root.glob("topics-*.f4"):
+            if path != self.topics.path:
+                path.unlink()
+        self.term_nnz = _Column(self.root / "term_nnz.i4", np.int32)
+        self.term_ids_column = _Column(self.root / "term_ids.i4", np.int32)
+        self.term_counts = _Column(self.root / "term_counts.i4", np.int32)
+        self._repair(len(lines))
+
+    def _repair(self, vocabulary_lines: int):
+        """Spalten auf den Stand von meta.json kürzen (abgebrochener Lauf)"""
+        n = len(self.rows)
+        for column in (self.date, self.tokens, self.sentiment, self.topics, self.term_nnz):
+            column.truncate(n)
+        nnz = int(self.term_nnz.read()[:n].sum())
+        self.term_ids_column.truncate(nnz)
+        self.term_counts.truncate(nnz)
+        if vocabulary_lines > len(self.vocabulary):
+            text = "".join(f"{term}\n" for term in self.vocabulary)
+            (self.root / "vocabulary.txt").write_text(text, encoding="utf-8")
+
+    def _topic_column(self, n_topics: int) -> _Column:
+        # Breite im Dateinamen: meta.json verweist immer auf eine Datei passender Breite
+        return _Column(self.root / f"topics-{n_topics}.f4", np.float32, max(n_topics, 1))
+
+    # --- Schreiben -------------------------------------------------------------
+
+    def active_rows(self) -> np.ndarray:
+        """Aktuelle Zeile jeder Sitzung (überholte Zeilen fallen weg), nach Datum sortiert"""
+        latest = {row["session"]: i for i, row in enumerate(self.rows)}
+        rows = np.fromiter(latest.values(), np.int64, len(latest))
+        dates = self.date.read()[rows]
+        return rows[np.argsort(dates, kind="stable")]
+
+    def update(self, dtm: Optional[DocumentTermStore] = None, topic_file: Path = TOPIC_FILE,
+               sentiment_file: Path = SENTIMENT_FILE) -> int:
+        """Hängt neue oder neu tokenisierte Sitzungen aus der Dokument-Term-Matrix an"""
+        dtm = dtm or DocumentTermStore()
+        parser = ProtocolParser()
+        known = {row["session"]: row["hash"] for row in self.rows}
+        new = [doc_id for doc_id, entry in sorted(dtm.documents.items()) if known.get(doc_id) != entry["hash"]]
+
+        topics = _read_per_session(topic_file)
+        sentiment = _read_per_session(sentiment_file, ["Sentiment"])
+        n_topics = len(next(iter(topics.values()))) if topics else self.n_topics
+        replaced = None
+        if n_topics != self.n_topics:
+            # Anderes Themenmodell: neue Themenspalte unter eigenem Namen anlegen; die alte
+            # bleibt gültig, bis meta.json auf die neue verweist
+            replaced = self.topics.path
+            self.n_topics = n_topics
+            self.topics = self._topic_column(n_topics)
+            self.topics.path.unlink(missing_ok=True)
+            self.topics.append(np.full((len(self.rows), self.topics.width), np.nan, np.float32))
+            self.sources["topics"] = None
+
+        appended = []
+        if new:
+            X = dtm.rows(new).tocsr()
+            vocabulary = dtm.vocabulary
+            new_terms = []
+            for doc_id, row in zip(new, X):
+                try:
+                    sitting_date = parser.parse_date(doc_id)
+                except (ValueError, FileNotFoundError) as e:
+                    logging.warning(f"Sitzung {doc_id} ohne Datum übersprungen: {e}")
+                    continue
+                ids = np.empty(row.nnz, np.int32)
+                for k, term_id in enumerate(row.indices):
+                    term = vocabulary[term_id]
+                    local = self.term_ids.get(term)
+                    if local is None:
+                        local = self.term_ids[term] = len(self.vocabulary)
+                        self.vocabulary.append(term)
+                        new_terms.append(term)
+                    ids[k] = local
+                order = np.argsort(ids)
+                self.term_ids_column.append(ids[order])
+                self.term_counts.append(np.asarray(row.data, np.int32)[order])
+                self.term_nnz.append([row.nnz])
+                self.tokens.append([int(row.data.sum())])
+                self.date.append([(np.datetime64(sitting_date.date(), "D") - _EPOCH).astype(np.int64)])
+                self.sentiment.append(sentiment.get(doc_id, [np.nan]))
+                self.topics.append(topics.get(doc_id, np.full(self.topics.width, np.nan, np.float32))[None])
+                self.rows.append({"session": doc_id, "date": sitting_date.date().isoformat(),
+                                  "hash": dtm.documents[doc_id]["hash"]})
+                appended.append(doc_id)
+            with open(self.root / "vocabulary.txt", "a", encoding="utf-8") as f:
+                f.write("".join(f"{term}\n" for term in new_terms))
+
+        # Themen und Sentiment werden für bestehende Zeilen nachgetragen, wenn sich die CSVs ändern
+        index = {row["session"]: i for i, row in enumerate(self.rows)}
+        topic_hash, sentiment_hash = _file_hash(topic_file), _file_hash(sentiment_file)
+        if topics and topic_hash != self.sources.get("topics"):
+            sessions = [s for s in topics if s in index]
+            if sessions:
+                self.topics.write_rows(np.array([index[s] for s in sessions]), np.stack([topics[s] for s in sessions]))
+            self.sources["topics"] = topic_hash
+        if sentiment and sentiment_hash != self.sources.get("sentiment"):
+            sessions = [s for s in sentiment if s in index]
+            if sessions:
+                self.sentiment.write_rows(np.array([index[s] for s in sessions]),
+                                          np.array([sentiment[s][0] for s in sessions], np.float32))
+            self.sources["sentiment"] = sentiment_hash
+
+        self._save_meta()
+        if replaced is not None:
+            replaced.unlink(missing_ok=True)
+        self.precompute()
+        return len(appended)
+
+    def _save_meta(self):
+        meta = {"rows": self.rows, "n_topics": self.n_topics, "n_terms": len(self.vocabulary),
+                "sources": self.sources}
+        tmp_path = self.root / "meta.json.tmp"
+        tmp_path.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, self.root / "meta.json")
+
+    # --- Lesen -----------------------------------------------------------------
+
+    def term_matrix(self, rows: Optional[np.ndarray] = None) -> sparse.csr_matrix:
+        """Zeile × Term (Häufigkeiten) für die angegebenen Zeilen"""
+        nnz = self.term_nnz.read()[:len(self.rows)]
+        indptr = np.concatenate([[0], np.cumsum(nnz, dtype=np.int64)])
+        X = sparse.csr_matrix(
+            (self.term_counts.read()[:indptr[-1]], self.term_ids_column.read()[:indptr[-1]], indptr),
+            shape=(len(self.rows), len(self.vocabulary)),
+        )
+        return X if rows is None else X[rows]
+
+    def _weeks(self, rows: np.ndarray) -> np.ndarray:
+        """Montag der Sitzungswoche je Zeile (Tage seit 1970; 1970-01-01 war ein Donnerstag)"""
+        days = self.date.read()[rows]
+        return days - (days + 3) % 7
+
+    def precompute(self):
+        """Wochenaggregate, gleitende Fenster und aufsteigende Begriffe je Sitzungswoche"""
+        weekly_dir = self.root / "weekly"
+        weekly_dir.mkdir(exist_ok=True)
+        rows = self.active_rows()
+        if len(rows) == 0:
+            return
+        weeks = self._weeks(rows)
+        week_starts, week_of_row = np.unique(weeks, return_inverse=True)
+        n_weeks = len(week_starts)
+
+        # Summen pro Woche über eine dünne Zuordnungsmatrix Woche × Zeile
+        assign = sparse.csr_matrix((np.ones(len(rows)), (week_of_row, np.arange(len(rows)))),
+                                   shape=(n_weeks, len(rows)))
+        terms = (assign @ self.term_matrix(rows)).tocsr()
+        tokens = assign @ self.tokens.read()[rows].astype(np.float64)
+        sittings = np.asarray(assign.sum(axis=1)).ravel()
+        topics = self._weekly_mean(assign, self.topics.read()[rows].astype(np.float64))
+        sentiment = self._weekly_mean(assign, self.sentiment.read()[rows].astype(np.float64)[:, None])[:, 0]
+
+        _save(weekly_dir / "sittings.npy", sittings)
+        _save(weekly_dir / "tokens.npy", tokens)
+        _save(weekly_dir / "topics.npy", topics)
+        _save(weekly_dir / "sentiment.npy", sentiment)
+        _save(weekly_dir / "topics_rolling.npy", self._rolling(topics))
+        _save(weekly_dir / "sentiment_rolling.npy", self._rolling(sentiment[:, None])[:, 0])
+
+        rising = {}
+        vocabulary = np.asarray(self.vocabulary, dtype=object)
+        for w in range(n_weeks):
+            start = max(0, w - BASELINE_WEEKS)
+            if start == w:
+                continue
+            baseline = np.asarray(terms[start:w].sum(axis=0)).ravel()
+            rising[str(week_starts[w])] = self._rising(terms[w], tokens[w], baseline, tokens[start:w].sum(),
+                                                        vocabulary)
+        tmp_path = weekly_dir / "rising.json.tmp"
+        tmp_path.write_text(json.dumps(rising, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, weekly_dir / "rising.json")
+        # Zuletzt: erst mit week_start.npy gelten die Wochendateien als vorhanden
+        _save(weekly_dir / "week_start.npy", week_starts)
+
+    @staticmethod
+    def _weekly_mean(assign: sparse.csr_matrix, values: np.ndarray) -> np.ndarray:
+        """Mittelwert pro Woche über die Sitzungen mit Wert (NaN bleibt NaN)"""
+        present = ~np.isnan(values)
+        sums = assign @ np.where(present, values, 0.0)
+        counts = assign @ present.astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return sums / counts
+
+    @staticmethod
+    def _rolling(values: np.ndarray, window: int = ROLLING_WEEKS) -> np.ndarray:
+        """Gleitendes Mittel über die letzten `window` Sitzungswochen (NaN-Wochen werden ausgelassen)"""
+        present = ~np.isnan(values)
+        sums = np.cumsum(np.where(present, values, 0.0), axis=0)
+        counts = np.cumsum(present, axis=0)
+        sums[window:] = sums[window:] - sums[:-window]
+        counts[window:] = counts[window:] - counts[:-window]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return sums / counts
+
+    @staticmethod
+    def _rising(week: sparse.csr_matrix, week_tokens: float, baseline: np.ndarray, baseline_tokens: float,
+                vocabulary: np.ndarray) -> List[List]:
+        """Begriffe mit dem stärksten Anstieg ihrer relativen Häufigkeit gegenüber dem Vergleichsfenster
+
+        Geglättetes log-Verhältnis der Raten; Begriffe unter MIN_COUNT fallen weg.
+        """
+        keep = week.data >= MIN_COUNT
+        ids, counts = week.indices[keep], week.data[keep]
+        if len(ids) == 0:
+            return []
+        n_terms = len(vocabulary)
+        week_rate = (counts + SMOOTHING) / (week_tokens + SMOOTHING * n_terms)
+        base_rate = (baseline[ids] + SMOOTHING) / (baseline_tokens + SMOOTHING * n_terms)
+        scores = np.log(week_rate / base_rate)
+        top = np.argsort(-scores)[:RISING_TOP]
+        return [[vocabulary[ids[i]], round(float(scores[i]), 4), int(counts[i]), int(baseline[ids[i]])]
+                for i in top if scores[i] > 0]
+
+    def trending(self, week: Optional[date] = None, top: int = 20) -> Dict:
+        """Aufsteigende Begriffe, Themen und Sentiment einer Sitzungswoche (Standard: die letzte)"""
+        weekly_dir = self.root / "weekly"
+        if not (weekly_dir / "week_start.npy").exists():
+            # Noch keine Sitzung angehängt (precompute hat nichts geschrieben)
+            return {}
+        week_starts = np.load(weekly_dir / "week_start.npy")
+        if len(week_starts) == 0:
+            return {}
+        if week is None:
+            w = len(week_starts) - 1
+        else:
+            day = (np.datetime64(week, "D") - _EPOCH).astype(np.int64)
+            w = int(np.searchsorted(week_starts, day - (day + 3) % 7, side="right")) - 1
+            if w < 0:
+                return {}
+        with open(weekly_dir / "rising.json", "r", encoding="utf-8") as f:
+            rising = json.load(f).get(str(week_starts[w]), [])
+
+        topics = np.load(weekly_dir / "topics.npy", mmap_mode="r")
+        rolling = np.load(weekly_dir / "topics_rolling.npy", mmap_mode="r")
+        sentiment = np.load(weekly_dir / "sentiment.npy", mmap_mode="r")
+        sentiment_rolling = np.load(weekly_dir / "sentiment_rolling.npy", mmap_mode="r")
+        previous = rolling[w - 1] if w > 0 else np.full(topics.shape[1], np.nan)
+        return {
+            "week": str(_EPOCH + int(week_starts[w])),
+            "sittings": int(np.load(weekly_dir / "sittings.npy", mmap_mode="r")[w]),
+            "rising_terms": [{"term": t, "score": s, "count": c, "baseline": b} for t, s, c, b in rising[:top]],
+            "topics": [
+                {"topic": f"Thema {i + 1}", "share": float(topics[w, i]), "change": float(topics[w, i] - previous[i])}
+                for i in range(topics.shape[1]) if self.n_topics
+            ],
+            "sentiment": float(sentiment[w]),
+            "sentiment_rolling": float(sentiment_rolling[w - 1]) if w > 0 else math.nan,
+        }
+
+    def term_series(self, terms: Sequence[str], weekly: bool = False) -> pd.DataFrame:
+        """Häufigkeit pro 10.000 Token je Sitzung bzw. Sitzungswoche"""
+        ids = [self.term_ids[term] for term in terms if term in self.term_ids]
+        found = [term for term in terms if term in self.term_ids]
+        rows = self.active_rows()
+        counts = self.term_matrix(rows)[:, ids].toarray().astype(np.float64)
+        tokens = self.tokens.read()[rows].astype(np.float64)
+        dates = _EPOCH + self.date.read()[rows]
+        df = pd.DataFrame(counts, columns=found)
+        df.insert(0, "Datum", dates)
+        df["Token"] = tokens
+        if weekly:
+            df["Datum"] = _EPOCH + self._weeks(rows)
+            df = df.groupby("Datum", as_index=False).sum()
+        df[found] = df[found].div(df["Token"], axis=0) * 10_000
+        return df.drop(columns="Token")
@@ -0,0 +1,257 @@
+import argparse
+import gc
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from _protocol_store import BASE_DIR, JSON_DIR
+
+PDF_DIR = BASE_DIR / "data" / "pdfs"
+RESULTS_DIR = BASE_DIR / "data" / "benchmarks"
+
+# Kennzahlen, bei denen höher besser ist; alle anderen (Sekunden, Speicher) sollen sinken
+THROUGHPUT_METRICS = ("pages_per_sec", "speeches_per_sec", "documents_per_sec", "tokens_per_sec")
+COST_METRICS = ("seconds", "peak_rss_mb", "alloc_peak_mb", "gc_collections")
+
+
+def sample_pdfs(scale):
+    """Die mitgelieferten Beispiel-PDFs, für größere Korpora scale-mal wiederholt"""
+    return sorted(PDF_DIR.glob("*.pdf")) * scale
+
+
+def sample_texts(scale):
+    from _protocol_store import list_sessions, read_text
+    return [read_text(session, JSON_DIR) for session in list_sessions(JSON_DIR)] * scale
+
+
+# --- Stufen: bereiten Eingaben vor und liefern eine Funktion, die die gemessene Arbeit erledigt ---
+
+def stage_extract(scale, tmp_dir):
+    from extract_text import extract_pdf
+    pdfs = sample_pdfs(scale)
+
+    def work():
+        return {"pages": sum(extract_pdf(str(pdf), tmp_dir) for pdf in pdfs), "documents": len(pdfs)}
+    return work
+
+
+def stage_parse_pdf(scale, tmp_dir):
+    from _protocol_parser import ProtocolParser
+    pdfs = sample_pdfs(scale)
+    parser = ProtocolParser()
+
+    def work():
+        speeches = interjections = 0
+        for pdf in pdfs:
+            protocol = parser.parse_pdf(str(pdf))
+            speeches += len(protocol.speeches)
+            interjections += len(protocol.interjections)
+        return {"speeches": speeches, "interjections": interjections, "documents": len(pdfs)}
+    return work
+
+
+def stage_parse_text(scale, tmp_dir):
+    """Parser ohne PDF-Extraktion (auf den bereits extrahierten Seiten)"""
+    from _protocol_parser import ProtocolParser
+    from _protocol_store import list_sessions
+    sessions = list_sessions(JSON_DIR) * scale
+    parser = ProtocolParser()
+
+    def work():
+        speeches = 0
+        for session in sessions:
+            speeches += len(parser.parse_session(session, JSON_DIR).speeches)
+        return {"speeches": speeches, "documents": len(sessions)}
+    return work
+
+
+def stage_preprocess(scale, tmp_dir):
+    from _preprocessing import load_stopwords, normalize
+    texts = sample_texts(scale)
+    stopwords = load_stopwords()
+
+    def work():
+        return {"tokens": sum(len(normalize(text, stopwords)) for text in texts), "documents": len(texts)}
+    return work
+
+
+def stage_encode(scale, tmp_dir):
+    from _normalizer import Normalizer, load_lemmatizer
+    from _preprocessing import LEMMATIZER, load_stopwords
+    texts = sample_texts(scale)
+    stopwords = load_stopwords()
+
+    def work():
+        # Frischer Normalizer: misst auch das Auflösen der Oberflächenformen
+        ids, _ = Normalizer(stopwords, load_lemmatizer(LEMMATIZER)).encode_batch(texts)
+        return {"tokens": len(ids), "documents": len(texts)}
+    return work
+
+
+def stage_lda(scale, tmp_dir):
+    from _dtm_store import DocumentTermStore
+    from _preprocessing import load_stopwords, normalize
+    from _topic_modeling import fit_full
+    stopwords = load_stopwords()
+    documents = [(str(i), normalize(text, stopwords)) for i, text in enumerate(sample_texts(scale))]
+
+    def work():
+        store = DocumentTermStore(tmp_dir)
+        store.add_documents(documents)
+        X, _, _ = store.matrix(max_df=0.95, min_df=2)
+        fit_full(X, n_jobs=1)
+        return {"documents": len(documents), "tokens": sum(len(words) for _, words in documents)}
+    return work
+
+
+STAGES = {
+    "extract": stage_extract,
+    "parse_pdf": stage_parse_pdf,
+    "parse_text": stage_parse_text,
+    "preprocess": stage_preprocess,
+    "encode": stage_encode,
+    "lda": stage_lda,
+}
+
+
+def measure(stage, scale, allocations):
+    """Läuft im Kindprozess, damit Peak-RSS und Importe einer Stufe die anderen nicht beeinflussen"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work = STAGES[stage](scale, tmp_dir)
+        if allocations:
+            tracemalloc.start()
+        collections = sum(stat["collections"] for stat in gc.get_stats())
+        started = time.perf_counter()
+        counts = work()
+        seconds = time.perf_counter() - started
+        # Garbage-Collector-Läufe als Maß für die Allokationslast (Generation 0 läuft alle ~700 Objekte)
+        collections = sum(stat["collections"] for stat in gc.get_stats()) - collections
+
+    result = {"seconds": round(seconds, 4), "gc_collections": collections}
+    for unit in ("pages", "speeches", "documents", "tokens"):
+        if unit in counts:
+            result[unit] = counts[unit]
+            result[f"{unit}_per_sec"] = round(counts[unit] / max(seconds, 1e-9), 2)
+    if allocations:
+        _, peak = tracemalloc.get_traced_memory()
+        result["alloc_peak_mb"] = round(peak / 2**20, 2)
+        tracemalloc.stop()
+    # ru_maxrss ist unter Linux in KiB, unter macOS in Bytes
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result["peak_rss_mb"] = round(maxrss / (2**20 if sys.platform == "darwin" else 2**10), 1)
+    return result
+
+
+def run_stage(stage, scale, allocations):
+    with tempfile.NamedTemporaryFile(suffix=".json") as out:
+        command = [sys.executable, __file__, "_measure", stage, str(scale), out.name]
+        if allocations:
+            command.append("--allocations")
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        return json.loads(Path(out.name).read_text(encoding="utf-8"))
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scales": args.scale,
+            "repeat": args.repeat,
+        },
+        "stages": {},
+    }
+    for stage in args.stages:
+        for scale in args.scale:
+            # Bestes von N Läufen für die Zeit, Allokationen in einem eigenen Lauf (tracemalloc bremst)
+            runs = [run_stage(stage, scale, False) for _ in range(args.repeat)]
+            best = min(runs, key=lambda r: r["seconds"])
+            best["peak_rss_mb"] = max(r["peak_rss_mb"] for r in runs)
+            if args.allocations:
+                traced = run_stage(stage, scale, True)
+                best["alloc_peak_mb"] = traced["alloc_peak_mb"]
+            key = f"{stage}@{scale}"
+            results["stages"][key] = best
+            rates = ", ".join(f"{best[m]:.1f} {m}" for m in THROUGHPUT_METRICS if m in best)
+            print(f"⏱️ {key}: {best['seconds']:.2f}s, {rates}, {best['peak_rss_mb']:.0f} MB RSS")
+
+    output = Path(args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"✅ Ergebnisse gespeichert: {output}")
+
+
+def compare(args):
+    """Vergleicht zwei Ergebnisdateien; Exit-Code 1 bei Regressionen über der Toleranz"""
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))["stages"]
+    current = json.loads(Path(args.current).read_text(encoding="utf-8"))["stages"]
+    regressions = 0
+    for key in sorted(baseline.keys() & current.keys()):
+        for metric in THROUGHPUT_METRICS + COST_METRICS:
+            if metric not in baseline[key] or metric not in current[key] or not baseline[key][metric]:
+                continue
+            old, new = baseline[key][metric], current[key][metric]
+            change = (new - old) / old
+            worse = change < -args.tolerance if metric in THROUGHPUT_METRICS else change > args.tolerance
+            marker = "❌" if worse else "  "
+            regressions += worse
+            print(f"{marker} {key:<16} {metric:<18} {old:>12.2f} → {new:>12.2f} ({change:+.1%})")
+    for key in sorted(baseline.keys() - current.keys()):
+        print(f"⚠️ {key} fehlt in {args.current}")
+    print(f"{'❌' if regressions else '✅'} {regressions} Regressionen (Toleranz {args.tolerance:.0%})")
+    sys.exit(1 if regressions else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks der Verarbeitungsstufen auf den Beispielprotokollen")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Benchmarks ausführen und als JSON speichern")
+    run_parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    run_parser.add_argument("--scale", type=int, nargs="+", default=[1],
+                            help="Vervielfachung der Beispielprotokolle, z. B. --scale 1 4 16")
+    run_parser.add_argument("--repeat", type=int, default=3, help="Läufe pro Stufe (das beste zählt)")
+    run_parser.add_argument("--allocations", action="store_true", help="Allokationen mit tracemalloc zählen")
+    run_parser.add_argument("--output", help="Ergebnisdatei (Standard: data/benchmarks/<Zeitstempel>.json)")
+
+    compare_parser = subparsers.add_parser("compare", help="Zwei Ergebnisdateien vergleichen")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=0.10, help="Erlaubte Verschlechterung (Anteil)")
+
+    # Interner Einstiegspunkt für den Kindprozess einer Messung
+    measure_parser = subparsers.add_parser("_measure")
+    measure_parser.add_argument("stage", choices=list(STAGES))
+    measure_parser.add_argument("scale", type=int)
+    measure_parser.add_argument("output")
+    measure_parser.add_argument("--allocations", action="store_true")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    elif args.command == "compare":
+        compare(args)
+    else:
+        result = measure(args.stage, args.scale, args.allocations)
+        Path(args.output).write_text(json.dumps(result), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
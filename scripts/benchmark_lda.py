@@ -0,0 +1,72 @@
+import argparse
+import json
+import tempfile
+import time
+
+from _dtm_store import DocumentTermStore
+from _preprocessing import load_corpus
+from _topic_modeling import fit_full, num_topics, update_incremental
+
+
+def replicate(session_numbers, tokens, factor):
+    """Vervielfacht die Beispielsitzungen zu einem größeren Korpus"""
+    for copy in range(factor):
+        for session_number, words in zip(session_numbers, tokens):
+            yield f"{session_number}-{copy:04d}", words
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vergleicht LDA-Neutraining mit inkrementellem Update")
+    parser.add_argument("--scale", type=int, default=20, help="Vervielfachung der Beispielsitzungen")
+    parser.add_argument("--new", type=int, default=1, help="Anzahl neuer Dokumente für das Update")
+    parser.add_argument("--topics", type=int, default=num_topics)
+    parser.add_argument("--jobs", type=int, default=-1)
+    parser.add_argument("--output", help="Ergebnisse zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    session_numbers, tokens = load_corpus()
+    documents = list(replicate(session_numbers, tokens, args.scale))
+    if not 1 <= args.new < len(documents):
+        parser.error(f"--new muss zwischen 1 und {len(documents) - 1} liegen")
+    split = len(documents) - args.new  # documents[:-0] wäre leer
+    base, new = documents[:split], documents[split:]
+    print(f"📚 {len(documents)} Dokumente ({len(session_numbers)} Sitzungen × {args.scale}), {len(new)} neu")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = DocumentTermStore(tmp_dir)
+        store.add_documents(base)
+        X_base, terms, base_ids = store.matrix(max_df=0.95, min_df=2)
+
+        # Ausgangsmodell auf dem bisherigen Korpus
+        lda = fit_full(X_base, args.topics, args.jobs)
+
+        # Neue Sitzung kommt hinzu: Matrix-Update + inkrementelles LDA-Update
+        started = time.perf_counter()
+        store.add_documents(new)
+        update_incremental(lda, store.rows([doc_id for doc_id, _ in new], terms))
+        incremental_seconds = time.perf_counter() - started
+
+        # Zum Vergleich: alles neu trainieren
+        started = time.perf_counter()
+        X_all, _, _ = store.matrix(max_df=0.95, min_df=2)
+        fit_full(X_all, args.topics, args.jobs)
+        full_seconds = time.perf_counter() - started
+
+    results = {
+        "documents": len(documents),
+        "new_documents": len(new),
+        "topics": args.topics,
+        "full_refit_seconds": round(full_seconds, 3),
+        "incremental_seconds": round(incremental_seconds, 3),
+        "speedup": round(full_seconds / max(incremental_seconds, 1e-9), 1),
+    }
+    print(f"🐢 Neutraining:   {results['full_refit_seconds']:.2f}s")
+    print(f"🚀 Inkrementell: {results['incremental_seconds']:.2f}s ({results['speedup']}× schneller)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
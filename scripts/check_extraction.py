@@ -0,0 +1,90 @@
+import argparse
+import sys
+from pathlib import Path
+
+from _pdf_backends import BACKENDS, iter_page_texts
+from _protocol_parser import ProtocolParser
+from _protocol_store import BASE_DIR
+
+PDF_DIR = BASE_DIR / "data" / "pdfs"
+
+
+def available_backends():
+    """Installierte PDF-Backends (pypdfium2 bzw. pdfplumber)"""
+    names = []
+    for name, module in (("pdfium", "pypdfium2"), ("pdfplumber", "pdfplumber")):
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def check_parse(pdf: Path, backend: str, pages) -> bool:
+    """Parst die Seitentexte vollständig – Protokoll-ID, Datum und Reden müssen vorhanden sein"""
+    try:
+        protocol = ProtocolParser().parse_pages(pages)
+    except ValueError as e:
+        print(f"❌ {pdf.name} [{backend}]: {e}")
+        return False
+    expected = f"{pdf.stem[:2]}/{int(pdf.stem[2:])}"
+    if protocol.protocol_id != expected:
+        print(f"❌ {pdf.name} [{backend}]: Protokoll-ID {protocol.protocol_id}, erwartet {expected}")
+        return False
+    if not protocol.speeches:
+        print(f"❌ {pdf.name} [{backend}]: keine Reden gefunden")
+        return False
+    print(f"✅ {pdf.name} [{backend}]: {protocol.protocol_id} vom {protocol.date:%d.%m.%Y}, "
+          f"{len(protocol.speeches)} Reden, {len(protocol.interjections)} Zwischenrufe")
+    return True
+
+
+def check_backends_agree(pdf: Path, texts) -> bool:
+    """Alle Backends müssen denselben Seitentext liefern"""
+    (reference, pages), *others = texts.items()
+    ok = True
+    for backend, other in others:
+        if len(other) != len(pages):
+            print(f"❌ {pdf.name}: {reference} liefert {len(pages)} Seiten, {backend} {len(other)}")
+            ok = False
+            continue
+        differing = [i + 1 for i, (a, b) in enumerate(zip(pages, other)) if a != b]
+        if differing:
+            print(f"❌ {pdf.name}: {reference} und {backend} unterscheiden sich auf Seite(n) "
+                  f"{', '.join(map(str, differing[:10]))}")
+            ok = False
+    if ok and others:
+        print(f"✅ {pdf.name}: {', '.join(texts)} liefern identischen Text ({len(pages)} Seiten)")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prüft die Textextraktion an den mitgelieferten PDFs")
+    parser.add_argument("pdfs", nargs="*", type=Path,
+                        help="Zu prüfende PDFs (Standard: das erste PDF in data/pdfs)")
+    parser.add_argument("--all", action="store_true", help="Alle PDFs in data/pdfs prüfen")
+    args = parser.parse_args()
+
+    pdfs = args.pdfs or sorted(PDF_DIR.glob("*.pdf"))
+    if not args.pdfs and not args.all:
+        pdfs = pdfs[:1]
+    if not pdfs:
+        print(f"❌ Keine PDFs in {PDF_DIR}")
+        sys.exit(1)
+    backends = available_backends()
+    if not backends:
+        print(f"❌ Kein PDF-Backend installiert ({', '.join(BACKENDS)})")
+        sys.exit(1)
+
+    ok = True
+    for pdf in pdfs:
+        texts = {backend: list(iter_page_texts(pdf, backend)) for backend in backends}
+        for backend, pages in texts.items():
+            ok &= check_parse(pdf, backend, pages)
+        ok &= check_backends_agree(pdf, texts)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+from _protocol_parser import ProtocolParser
+from _protocol_store import list_sessions
+from _search_index import SearchIndex
+
+# Schreibweisen einer Fraktion, die im Filter dasselbe Ergebnis liefern müssen
+PARTY_SPELLINGS = [
+    ("GRÜNE", "BÜNDNIS 90/DIE GRÜNEN", "Grünen"),
+    ("LINKE", "Die Linke", "DIE LINKE"),
+    ("CDU/CSU",),
+]
+
+
+def check_party_filter(index: SearchIndex, query: str) -> bool:
+    """Der Fraktionsfilter muss Kurz- und Langform gleich behandeln und Treffer liefern"""
+    ok = True
+    for spellings in PARTY_SPELLINGS:
+        results = {spelling: index.search(query, limit=1000, parties=[spelling]) for spelling in spellings}
+        reference = spellings[0]
+        expected = [(r.protocol_id, r.position) for r in results[reference]]
+        errors = []
+        if not expected:
+            errors.append(f"keine Treffer für '{query}'")
+        if any(r.party != reference for r in results[reference]):
+            errors.append("Treffer anderer Fraktionen")
+        for spelling in spellings[1:]:
+            if [(r.protocol_id, r.position) for r in results[spelling]] != expected:
+                errors.append(f"'{spelling}' liefert andere Treffer")
+        for error in errors:
+            print(f"❌ --party {reference}: {error}")
+        if not errors:
+            print(f"✅ --party {' / '.join(spellings)}: {len(expected)} Treffer")
+        ok = ok and not errors
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prüft die Volltextsuche an den extrahierten Sitzungen")
+    parser.add_argument("--query", default="Bundesregierung", help="Suchbegriff für die Prüfung")
+    parser.add_argument("--sessions", type=int, default=2, help="Anzahl der indexierten Sitzungen")
+    args = parser.parse_args()
+
+    sessions = list_sessions()[:args.sessions]
+    if not sessions:
+        print("❌ Keine extrahierten Sitzungen in data/json")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = SearchIndex(Path(tmp_dir) / "search.sqlite")
+        protocol_parser = ProtocolParser()
+        for session in sessions:
+            index.add_protocol(protocol_parser.parse_session(session))
+        print(f"📚 {len(sessions)} Sitzungen indexiert")
+        ok = check_party_filter(index, args.query)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,220 @@
-import pdfplumber
-import os
+import argparse
+import hashlib
 import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from _catalog import STAGE_EXTRACT, STATUS_DONE, ProtocolCatalog
+from _pdf_backends import open_pdf, page_text, resolve_backend
+from _tracing import count, merge_totals, profiled, span, worker_totals
 
 # Pfade definieren
 input_dir = "data/pdfs"  # PDF-Speicherort
-output_dir = "data/json"  # JSON-Speicherort
-os.makedirs(output_dir, exist_ok=True)
+output_dir = "data/json"  # JSONL-Speicherort (eine Zeile pro Seite)
 
-# Alle PDFs verarbeiten
-for pdf_file in sorted(os.listdir(input_dir)):
-    if pdf_file.endswith(".pdf"):
-        pdf_path = os.path.join(input_dir, pdf_file)
-        session_number = pdf_file.split(".")[0]  # Annahme: "20210.pdf" -> "20210"
-        
-        # Text aus PDF extrahieren
-        with pdfplumber.open(pdf_path) as pdf:
-            text = "\n".join([page.extract_text() for page in pdf.pages if page.extract_text()])
-        
-        # Strukturierte Daten speichern
-        protokoll_data = {
+# Bei Änderungen an der Extraktion erhöhen, damit alle PDFs neu verarbeitet werden
+EXTRACTOR_VERSION = "5"
+# Große Protokolle werden in Seitenbereiche dieser Größe aufgeteilt
+PAGES_PER_TASK = 16
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Berechnet den SHA-256 einer Datei, ohne sie komplett zu laden"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_up_to_date(jsonl_path, digest, backend=None):
+    """Prüft anhand der Kopfzeile, ob das JSONL zu PDF-Hash, Extraktor-Version und Backend passt"""
+    if not os.path.exists(jsonl_path):
+        return False
+    try:
+        with open(jsonl_path, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+    except (OSError, ValueError):
+        return False
+    return (
+        header.get("sha256") == digest
+        and header.get("extractor_version") == EXTRACTOR_VERSION
+        and header.get("backend") == resolve_backend(backend)
+    )
+
+
+def count_pages(pdf_path, backend=None):
+    with open_pdf(pdf_path, backend) as pdf:
+        return len(pdf)
+
+
+def extract_page_range(pdf_path, start, end, backend=None):
+    """Extrahiert den Text der Seiten [start, end) – läuft im Worker-Prozess
+
+    Die Tracing-Summen des Workers gehen mit dem Ergebnis an den Hauptprozess.
+    """
+    texts = []
+    session_number = os.path.basename(pdf_path).split(".")[0]
+    with profiled("extract"), open_pdf(pdf_path, backend) as pdf:
+        for i in range(start, end):
+            with span("extract.page", session=session_number, page=i + 1):
+                page = pdf.page(i)
+                texts.append(page_text(page))
+                # Zeichen- und Layout-Caches der Seite sofort freigeben
+                page.close()
+    count("extract.pages", end - start)
+    return pdf_path, start, texts, worker_totals()
+
+
+class ProtocolWriter:
+    """Schreibt die Seiten eines Protokolls in Reihenfolge als JSONL"""
+
+    def __init__(self, jsonl_path, session_number, digest, n_pages, backend=None):
+        self.session_number = session_number
+        self.digest = digest
+        self.started = time.perf_counter()
+        self.jsonl_path = jsonl_path
+        self.tmp_path = jsonl_path + ".tmp"
+        self.n_pages = n_pages
+        self.next_page = 0
+        self.buffered = {}  # vorzeitig fertige Seitenbereiche
+        self.file = open(self.tmp_path, "w", encoding="utf-8")
+        header = {
             "sitzungsnummer": session_number,
-            "text": text
+            "sha256": digest,
+            "extractor_version": EXTRACTOR_VERSION,
+            "backend": resolve_backend(backend),
+            "seiten": n_pages,
         }
-        
-        json_path = os.path.join(output_dir, f"{session_number}.json")
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(protokoll_data, f, ensure_ascii=False, indent=4)
+        self.file.write(json.dumps(header, ensure_ascii=False) + "\n")
+        if self.done:
+            self._finish()
+
+    def add(self, start, texts):
+        self.buffered[start] = texts
+        while self.next_page in self.buffered:
+            for text in self.buffered.pop(self.next_page):
+                self.next_page += 1
+                record = {"seite": self.next_page, "text": text}
+                self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if self.done:
+            self._finish()
+
+    def _finish(self):
+        self.file.close()
+        os.replace(self.tmp_path, self.jsonl_path)
+
+    @property
+    def done(self):
+        return self.next_page >= self.n_pages
+
+
+def extract_pdf(pdf_path, output_dir=output_dir, backend=None):
+    """Extrahiert ein einzelnes PDF seitenweise im aktuellen Prozess (für die Pipeline)"""
+    session_number = os.path.basename(pdf_path).split(".")[0]
+    jsonl_path = os.path.join(output_dir, f"{session_number}.jsonl")
+    os.makedirs(output_dir, exist_ok=True)
+    digest = file_hash(pdf_path)
+    with span("extract.pdf", session=session_number), profiled("extract"), open_pdf(pdf_path, backend) as pdf:
+        writer = ProtocolWriter(jsonl_path, session_number, digest, len(pdf), backend)
+        for i in range(len(pdf)):
+            with span("extract.page", session=session_number, page=i + 1):
+                page = pdf.page(i)
+                text = page_text(page)
+                page.close()
+            writer.add(i, [text])
+    count("extract.pages", writer.n_pages)
+    return writer.n_pages
+
+
+def iter_tasks(page_counts):
+    for pdf_path, n_pages in page_counts.items():
+        for start in range(0, n_pages, PAGES_PER_TASK):
+            yield pdf_path, start, min(start + PAGES_PER_TASK, n_pages)
+
+
+def extract_all(input_dir=input_dir, output_dir=output_dir, workers=None, force=False, catalog=None, backend=None):
+    """Extrahiert alle geänderten PDFs parallel, verteilt auf Seitenbereiche"""
+    os.makedirs(output_dir, exist_ok=True)
+    catalog = catalog or ProtocolCatalog()
+    workers = workers or os.cpu_count() or 1
+    # Einmal auflösen, damit alle Worker dasselbe Backend verwenden
+    backend = resolve_backend(backend)
+    started = time.perf_counter()
+
+    # Geänderte PDFs bestimmen
+    jobs = {}
+    for pdf_file in sorted(os.listdir(input_dir)):
+        if not pdf_file.endswith(".pdf"):
+            continue
+        pdf_path = os.path.join(input_dir, pdf_file)
+        session_number = pdf_file.split(".")[0]  # Annahme: "20210.pdf" -> "20210"
+        jsonl_path = os.path.join(output_dir, f"{session_number}.jsonl")
+        digest = file_hash(pdf_path)
+        if not force and is_up_to_date(jsonl_path, digest, backend):
+            print(f"⏭️  Unverändert: {pdf_file}")
+            continue
+        jobs[pdf_path] = (session_number, jsonl_path, digest)
+
+    if not jobs:
+        print("✅ Alle PDFs sind aktuell.")
+        return 0
+
+    total_pages = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        page_counts = dict(zip(jobs, pool.map(count_pages, jobs, [backend] * len(jobs))))
+        writers = {}
+        for pdf_path, n_pages in page_counts.items():
+            if n_pages == 0:
+                session_number, jsonl_path, digest = jobs[pdf_path]
+                ProtocolWriter(jsonl_path, session_number, digest, 0, backend)
+
+        # Nur begrenzt viele Seitenbereiche gleichzeitig in Arbeit halten,
+        # damit der Speicherbedarf unabhängig von der Protokolllänge bleibt
+        tasks = iter_tasks(page_counts)
+        in_flight = set()
+        while True:
+            for task in tasks:
+                pdf_path = task[0]
+                if pdf_path not in writers:
+                    session_number, jsonl_path, digest = jobs[pdf_path]
+                    writers[pdf_path] = ProtocolWriter(jsonl_path, session_number, digest,
+                                                       page_counts[pdf_path], backend)
+                in_flight.add(pool.submit(extract_page_range, *task, backend))
+                if len(in_flight) >= 2 * workers:
+                    break
+            if not in_flight:
+                break
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                pdf_path, start, texts, totals = future.result()
+                merge_totals(totals)
+                writer = writers[pdf_path]
+                writer.add(start, texts)
+                total_pages += len(texts)
+                if writer.done:
+                    catalog.mark_stage(
+                        writer.session_number, STAGE_EXTRACT, STATUS_DONE,
+                        duration_seconds=time.perf_counter() - writer.started,
+                        fingerprint=f"{writer.digest}:{EXTRACTOR_VERSION}:{backend}",
+                    )
+                    print(f"✅ Verarbeitet: {os.path.basename(pdf_path)} -> {writer.jsonl_path}")
+
+    elapsed = time.perf_counter() - started
+    print(f"📄 {total_pages} Seiten in {elapsed:.1f}s [{backend}] ({total_pages / max(elapsed, 1e-9):.1f} Seiten/s)")
+    return total_pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extrahiert Text aus den Plenarprotokoll-PDFs")
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl Prozesse (Standard: alle Kerne)")
+    parser.add_argument("--force", action="store_true", help="Auch unveränderte PDFs neu extrahieren")
+    parser.add_argument("--backend", choices=["auto", "pdfium", "pdfplumber"], default=None,
+                        help="PDF-Backend (Standard: BUNDESTAG_PDF_BACKEND bzw. auto)")
+    args = parser.parse_args()
+    extract_all(workers=args.workers, force=args.force, backend=args.backend)
+
 
-        print(f"✅ Verarbeitet: {pdf_file} -> {json_path}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import argparse
+import logging
+from pathlib import Path
+
+from _catalog import STAGE_ANALYZE, STAGE_EXTRACT, STAGE_PARSE
+from _pipeline import Pipeline, Stage, file_hash
+from _protocol_store import BASE_DIR, JSON_DIR
+
+PDF_DIR = BASE_DIR / "data" / "pdfs"
+STOPWORD_FILE = BASE_DIR / "data" / "german_stopwords_full.txt"
+ROSTER_FILE = BASE_DIR / "data" / "roster.csv"
+# Optional: Stammdaten des Bundestags für die Namensliste (IDs, frühere Namen)
+STAMMDATEN_FILE = BASE_DIR / "data" / "MDB_STAMMDATEN.XML"
+BOILERPLATE_DIR = BASE_DIR / "data" / "boilerplate"
+TOPIC_FILE = BASE_DIR / "data" / "topic_distributions.csv"
+SENTIMENT_FILE = BASE_DIR / "data" / "sentiment_sessions.csv"
+
+
+def pdf_path(session):
+    return PDF_DIR / f"{session}.pdf"
+
+
+def jsonl_path(session):
+    return JSON_DIR / f"{session}.jsonl"
+
+
+# --- Aufgaben (laufen in Worker-Prozessen) ---------------------------------
+
+def run_extract(session):
+    from extract_text import extract_pdf
+    extract_pdf(str(pdf_path(session)), str(JSON_DIR))
+
+
+def extract_fingerprint(session):
+    # Gleiches Format wie extract_text.py, damit sich beide Wege nicht gegenseitig invalidieren
+    # inkl. Backend: ein anderes BUNDESTAG_PDF_BACKEND (oder "auto" nach Installation von pypdfium2) extrahiert neu
+    from _pdf_backends import resolve_backend
+    from extract_text import EXTRACTOR_VERSION
+    return f"{file_hash(pdf_path(session))}:{EXTRACTOR_VERSION}:{resolve_backend(None)}"
+
+
+def run_roster():
+    from _protocol_store import list_sessions
+    from _speaker_index import write_roster
+    from roster import WAHLPERIODE, build_roster
+    stammdaten = STAMMDATEN_FILE if STAMMDATEN_FILE.exists() else None
+    write_roster(build_roster(list_sessions(), stammdaten, WAHLPERIODE, min_count=1), ROSTER_FILE)
+
+
+def run_parse(session):
+    from _corpus_store import CorpusWriter
+    from _protocol_parser import ProtocolParser
+    CorpusWriter().write(ProtocolParser().parse_session(session))
+
+
+def run_index(session):
+    from _protocol_parser import ProtocolParser
+    from _search_index import SearchIndex
+    SearchIndex().add_protocol(ProtocolParser().parse_session(session))
+
+
+def run_tokens(session):
+    from _boilerplate import read_text
+    from _preprocessing import TokenCache
+    TokenCache().tokens(read_text(session))
+
+
+def run_boilerplate():
+    from _boilerplate import BoilerplateIndex
+    BoilerplateIndex().update()
+
+
+def mask_path(session):
+    return BOILERPLATE_DIR / f"{session}.json"
+
+
+def run_interjections():
+    from _interjections import update_all
+    update_all()
+
+
+def run_sentiment():
+    # Standardeinstellungen des Skripts; das Modell läuft nur für Fenster, die nicht im Cache sind
+    from sentiment_analysis import build_parser, run
+    run(build_parser().parse_args([]))
+
+
+def run_topics():
+    from _topic_modeling import run
+    run(incremental=True)
+
+
+def run_trends():
+    from _trend_store import TrendStore
+    TrendStore().update()
+
+
+STAGES = [
+    Stage(STAGE_EXTRACT, run_extract, sources=["extract_text.py"],
+          inputs=lambda session: [pdf_path(session)], fingerprint=extract_fingerprint),
+    # Namensliste für die Rednererkennung aus allen Rednerzeilen (plus Stammdaten, falls vorhanden);
+    # data/roster.csv gehört damit der Pipeline, alle Stufen, die Reden zerlegen, hängen davon ab
+    Stage("roster", run_roster, sources=["roster.py", "_speaker_index.py", "_protocol_store.py"],
+          inputs=lambda session: [STAMMDATEN_FILE], deps=[STAGE_EXTRACT], per_protocol=False, parallel=False),
+    Stage(STAGE_PARSE, run_parse,
+          sources=["_protocol_parser.py", "_speaker_index.py", "_corpus_store.py", "_protocol_store.py"],
+          inputs=lambda session: [jsonl_path(session), ROSTER_FILE], deps=[STAGE_EXTRACT, "roster"]),
+    # Alle Sitzungen schreiben in dieselbe data/search.sqlite: nicht parallel, sonst warten
+    # die Prozesse auf die WAL-Sperre und laufen in den Timeout
+    Stage("index", run_index,
+          sources=["_protocol_parser.py", "_speaker_index.py", "_search_index.py", "_protocol_store.py"],
+          inputs=lambda session: [jsonl_path(session), ROSTER_FILE], deps=[STAGE_EXTRACT, "roster"],
+          parallel=False),
+    # Textbausteine hängen von allen Sitzungen ab: eine globale Stufe schreibt die Masken,
+    # die Token-Stufe liest sie als Eingabe
+    Stage("boilerplate", run_boilerplate, sources=["_boilerplate.py", "_protocol_store.py"],
+          deps=[STAGE_EXTRACT], per_protocol=False, parallel=False),
+    Stage("tokens", run_tokens, sources=["_preprocessing.py", "_boilerplate.py", "_protocol_store.py"],
+          inputs=lambda session: [jsonl_path(session), STOPWORD_FILE, mask_path(session)],
+          deps=[STAGE_EXTRACT, "boilerplate"]),
+    # Globale Aggregate: Zwischenruf-Statistik, DTM und LDA-Modell werden inkrementell fortgeschrieben
+    Stage("interjections", run_interjections, sources=["_interjections.py", "_protocol_parser.py", "_speaker_index.py"],
+          inputs=lambda session: [ROSTER_FILE], deps=[STAGE_EXTRACT, "roster"], per_protocol=False,
+          parallel=False),
+    # Sentiment pro Sitzung für die Zeitreihen (liest die maskierten Seiten wie die Token-Stufe)
+    Stage("sentiment", run_sentiment,
+          sources=["sentiment_analysis.py", "_protocol_parser.py", "_speaker_index.py", "_boilerplate.py",
+                   "_protocol_store.py"],
+          inputs=lambda session: [ROSTER_FILE], deps=[STAGE_EXTRACT, "roster", "boilerplate"], per_protocol=False,
+          parallel=False),
+    Stage(STAGE_ANALYZE, run_topics, sources=["_topic_modeling.py", "_dtm_store.py"],
+          deps=["tokens"], per_protocol=False, parallel=False),
+    # Zeitreihen lesen die DTM nach der Analyse und hängen nur neue Sitzungen an; beide CSVs
+    # entstehen in Stufen des DAG, ihr Inhalts-Hash macht die Zeitreihen bei Änderungen ungültig
+    Stage("trends", run_trends, sources=["_trend_store.py", "_dtm_store.py", "_protocol_parser.py"],
+          inputs=lambda session: [TOPIC_FILE, SENTIMENT_FILE], deps=[STAGE_ANALYZE, "sentiment"],
+          per_protocol=False, parallel=False),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inkrementelle Pipeline: Download → Extraktion → Parsing → Analyse")
+    parser.add_argument("--offline", action="store_true", help="Keine neuen Protokolle herunterladen")
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl Prozesse")
+    parser.add_argument("--force", action="store_true", help="Alle Stufen neu berechnen")
+    parser.add_argument("--stage", action="append", choices=[stage.name for stage in STAGES],
+                        help="Nur diese Stufen (samt Vorstufen) ausführen")
+    parser.add_argument("sessions", nargs="*", help="Nur diese Sitzungen (Standard: alle PDFs)")
+    parser.add_argument("--latest", type=int, default=10, help="Anzahl der neuesten Protokolle für den Download")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    # Der Download ist bewusst keine Stufe im DAG: erst seine Ergebnisse bestimmen, für
+    # welche Sitzungen der DAG aufgebaut wird, und den Stand auf dem Server kann kein
+    # Fingerabdruck abbilden. Unveränderte PDFs kosten dank bedingter Anfragen nur ein 304.
+    if not args.offline:
+        from _download_protocols import ProtocolDownloader
+        downloaded = ProtocolDownloader(BASE_DIR).download_latest_protocols(args.latest)
+        logging.info(f"{len(downloaded)} Protokolle aktuell")
+
+    stages = STAGES
+    if args.stage:
+        # Gewünschte Stufen und alle ihre Vorstufen
+        by_name = {stage.name: stage for stage in STAGES}
+        wanted, todo = set(), list(args.stage)
+        while todo:
+            name = todo.pop()
+            if name not in wanted:
+                wanted.add(name)
+                todo.extend(by_name[name].deps)
+        stages = [stage for stage in STAGES if stage.name in wanted]
+
+    sessions = args.sessions or sorted(path.stem for path in Path(PDF_DIR).glob("*.pdf"))
+    counts = Pipeline(stages, workers=args.workers).run(sessions, force=args.force)
+    print(f"✅ {counts['run']} Aufgaben ausgeführt, {counts['skipped']} aktuell, {counts['failed']} fehlgeschlagen")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import xml.etree.ElementTree as ET
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from _protocol_store import iter_lines, list_sessions
+from _speaker_index import (
+    ROSTER_FILE, Person, SpeakerIndex, canonical_party, name_slug, parse_turn_line, write_roster,
+)
+
+WAHLPERIODE = 20
+
+
+def _stammdaten_party(text: Optional[str]) -> Optional[str]:
+    if text in ("CDU", "CSU"):
+        return "CDU/CSU"
+    return canonical_party(text)
+
+
+def read_stammdaten(path: Path, wahlperiode: int) -> List[Person]:
+    """Abgeordnete einer Wahlperiode aus MDB_STAMMDATEN.XML (Open Data des Bundestags)
+
+    Frühere Namen (z. B. vor einer Heirat) werden als Aliase übernommen.
+    """
+    people = []
+    for mdb in ET.parse(path).getroot().iter("MDB"):
+        periods = {wp.findtext("WP") for wp in mdb.iter("WAHLPERIODE")}
+        if str(wahlperiode) not in periods:
+            continue
+        names = []
+        for name in mdb.iter("NAME"):
+            parts = [name.findtext("VORNAME"), name.findtext("PRAEFIX"), name.findtext("NACHNAME")]
+            names.append(" ".join(part.strip() for part in parts if part and part.strip()))
+        if not names:
+            continue
+        current = names[-1]
+        aliases = tuple(dict.fromkeys(name for name in names if name != current))
+        party = _stammdaten_party(mdb.findtext("BIOGRAFISCHE_ANGABEN/PARTEI_KURZ"))
+        people.append(Person(id=mdb.findtext("ID"), name=current, party=party, roles=("mdb",), aliases=aliases))
+    return people
+
+
+def collect_speakers(sessions: List[str]) -> Dict[str, Dict]:
+    """Namen, Fraktionen und Rollen aus den Rednerzeilen der extrahierten Protokolle"""
+    found: Dict[str, Dict] = {}
+    for session in sessions:
+        for line in iter_lines(session):
+            turn = parse_turn_line(line)
+            if turn is None:
+                continue
+            name, party, role = turn
+            entry = found.setdefault(name, {"parties": Counter(), "roles": set(), "count": 0})
+            entry["count"] += 1
+            entry["roles"].add(role)
+            if party:
+                entry["parties"][party] += 1
+    return found
+
+
+def build_roster(sessions: List[str], stammdaten: Optional[Path], wahlperiode: int, min_count: int) -> List[Person]:
+    people: Dict[str, Person] = {}
+    by_name: Dict[str, str] = {}
+    if stammdaten:
+        for person in read_stammdaten(stammdaten, wahlperiode):
+            people[person.id] = person
+            for name in (person.name, *person.aliases):
+                by_name.setdefault(name, person.id)
+
+    for name, entry in collect_speakers(sessions).items():
+        if entry["count"] < min_count:
+            continue
+        party = entry["parties"].most_common(1)[0][0] if entry["parties"] else None
+        person_id = by_name.get(name)
+        if person_id is not None:
+            person = people[person_id]
+            roles = tuple(sorted(set(person.roles) | entry["roles"]))
+            people[person_id] = Person(person.id, person.name, person.party or party, roles, person.aliases)
+            continue
+        person_id = name_slug(name)
+        if person_id in people:
+            person_id = f"{person_id}-{name_slug(party or 'ohne')}"
+        people[person_id] = Person(person_id, name, party, tuple(sorted(entry["roles"])))
+        by_name[name] = person_id
+    return list(people.values())
+
+
+def check(session: str):
+    """Rednerwechsel und häufigste Erwähnungen einer Sitzung laut Namensliste"""
+    index = SpeakerIndex.load()
+    text = "\n".join(iter_lines(session))
+    hits = index.scan(text)
+    turns = [hit for hit in hits if hit.turn]
+    for hit in turns:
+        role = f", {hit.role}" if hit.role else ""
+        party = f" ({hit.party})" if hit.party else ""
+        print(f"🎤 {hit.person.name}{party}{role}  [{hit.person.id}]")
+    mentions = Counter(hit.person.name for hit in hits if not hit.turn)
+    print(f"\n📊 {len(turns)} Rednerwechsel, {sum(mentions.values())} Erwähnungen")
+    for name, n in mentions.most_common(10):
+        print(f"   {n:4d}  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Namensliste für die Rednererkennung (data/roster.csv)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Namensliste aus Protokollen und Stammdaten erzeugen")
+    build_parser.add_argument("--stammdaten", type=Path, help="MDB_STAMMDATEN.XML des Bundestags")
+    build_parser.add_argument("--wahlperiode", type=int, default=WAHLPERIODE)
+    build_parser.add_argument("--min-count", type=int, default=1,
+                              help="Namen aus Protokollen erst ab so vielen Rednerzeilen übernehmen")
+    build_parser.add_argument("--output", type=Path, default=ROSTER_FILE)
+
+    check_parser = subparsers.add_parser("check", help="Erkennung für eine Sitzung prüfen")
+    check_parser.add_argument("session")
+    args = parser.parse_args()
+
+    if args.command == "check":
+        check(args.session)
+        return
+
+    people = build_roster(list_sessions(), args.stammdaten, args.wahlperiode, args.min_count)
+    write_roster(people, args.output)
+    print(f"✅ {len(people)} Personen in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
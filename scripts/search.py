@@ -0,0 +1,59 @@
+import argparse
+import time
+from datetime import date
+
+from _protocol_parser import ProtocolParser
+from _protocol_store import list_sessions
+from _search_index import SearchIndex
+
+
+def build_index(index):
+    """Indexiert alle neuen oder geänderten Sitzungen"""
+    parser = ProtocolParser()
+    added = 0
+    for session in list_sessions():
+        try:
+            protocol = parser.parse_session(session)
+        except ValueError as e:
+            print(f"⚠️ Sitzung {session} übersprungen: {e}")
+            continue
+        if index.add_protocol(protocol):
+            added += 1
+            print(f"✅ Sitzung {session} indexiert ({len(protocol.speeches)} Reden)")
+    print(f"📚 {added} Sitzungen neu indexiert")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Volltextsuche über alle Reden (BM25)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("index", help="Neue und geänderte Sitzungen indexieren")
+
+    query_parser = subparsers.add_parser("query", help="Suchen, z. B. 'Schuldenbremse' oder '\"sozialer Wohnungsbau\"'")
+    query_parser.add_argument("query")
+    query_parser.add_argument("--party", action="append",
+                              help="Nur Reden dieser Fraktion, Kurz- oder Langform (z. B. GRÜNE oder "
+                                   "\"BÜNDNIS 90/DIE GRÜNEN\"; mehrfach möglich)")
+    query_parser.add_argument("--speaker", action="append", help="Nur Reden dieser Person (mehrfach möglich)")
+    query_parser.add_argument("--since", type=date.fromisoformat, help="Ab Datum (JJJJ-MM-TT)")
+    query_parser.add_argument("--until", type=date.fromisoformat, help="Bis Datum (JJJJ-MM-TT)")
+    query_parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    index = SearchIndex()
+    if args.command == "index":
+        build_index(index)
+        return
+
+    started = time.perf_counter()
+    results = index.search(args.query, limit=args.limit, parties=args.party, speakers=args.speaker,
+                           since=args.since, until=args.until)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    for result in results:
+        print(f"{result.score:6.2f}  {result.date}  {result.protocol_id}  {result.speaker} ({result.party})")
+        print(f"        {result.snippet}")
+    print(f"🔎 {len(results)} Treffer in {elapsed_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,186 @@
-import json
-import os
-from transformers import pipeline
+import argparse
+import hashlib
+import sqlite3
+from array import array
+
 import pandas as pd
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+import _boilerplate
+from _protocol_parser import ProtocolParser
+from _protocol_store import BASE_DIR, iter_pages, list_sessions
+from _tracing import count, profiled, span
+
+MODEL_ID = "nlptown/bert-base-multilingual-uncased-sentiment"
+CACHE_FILE = BASE_DIR / "data" / "cache" / "sentiment.sqlite"
+OUTPUT_DIR = BASE_DIR / "data"
+
+WINDOW_TOKENS = 510  # 512 minus [CLS] und [SEP]
+
+
+class SentimentCache:
+    """Ergebnisse pro Textfenster, Schlüssel = Hash der Token-IDs + Modell-ID"""
+
+    def __init__(self, path=CACHE_FILE):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS windows (key TEXT PRIMARY KEY, model TEXT, label INTEGER, score REAL)"
+        )
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for key, label, score in self.conn.execute(
+                f"SELECT key, label, score FROM windows WHERE key IN ({placeholders})", chunk
+            ):
+                found[key] = (label, score)
+        return found
+
+    def put_many(self, model_id, rows):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO windows (key, model, label, score) VALUES (?, ?, ?, ?)",
+                [(key, model_id, label, score) for key, (label, score) in rows.items()],
+            )
+
+
+def window_key(model_id, input_ids):
+    return hashlib.sha256(model_id.encode() + array("i", input_ids).tobytes()).hexdigest()
+
+
+def split_windows(tokenizer, text, stride):
+    """Teilt einen Text in Fenster von höchstens 510 Token (überlappend um `stride`)"""
+    ids = tokenizer(text, add_special_tokens=False, truncation=False)["input_ids"]
+    if not ids:
+        return []
+    step = WINDOW_TOKENS - stride
+    return [ids[start:start + WINDOW_TOKENS] for start in range(0, max(len(ids) - stride, 1), step)]
+
+
+def score_windows(model, tokenizer, windows, batch_size):
+    """Batch-Inferenz; Fenster werden nach Länge sortiert, damit kaum gepaddet wird"""
+    order = sorted(range(len(windows)), key=lambda i: len(windows[i]))
+    results = [None] * len(windows)
+    stars = torch.arange(1, model.config.num_labels + 1, dtype=torch.float32)
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        encoded = tokenizer.pad(
+            {"input_ids": [tokenizer.build_inputs_with_special_tokens(windows[i]) for i in batch]},
+            return_tensors="pt",
+        )
+        with span("sentiment.batch", windows=len(batch), tokens=encoded["input_ids"].shape[1]), torch.inference_mode():
+            probs = model(**encoded).logits.softmax(dim=-1)
+        labels = probs.argmax(dim=-1) + 1
+        scores = probs @ stars  # Erwartungswert der Sterne (1–5)
+        for i, label, score in zip(batch, labels.tolist(), scores.tolist()):
+            results[i] = (label, score)
+    return results
+
+
+def analyse_session(session, parser, model, tokenizer, cache, args):
+    """Bewertet alle Reden einer Sitzung; nur unbekannte Fenster gehen ins Modell"""
+    # Ohne Textbausteine (Kopfzeilen, Drucksachentitel), die sonst in die Reden geraten
+    pages = iter_pages(session) if args.keep_boilerplate else _boilerplate.read_pages(session, keep=parser.keeps_line)
+    rows, windows, keys = [], [], []
+    for position, speech in enumerate(parser.parse_pages(page.text for page in pages).speeches):
+        for n, window in enumerate(split_windows(tokenizer, speech.content, args.stride)):
+            # Gewicht = neue Token; die Überlappung zählt nur im vorigen Fenster
+            rows.append((position, speech.speaker, speech.party, len(window) - (args.stride if n else 0)))
+            windows.append(window)
+            keys.append(window_key(args.model, window))
+
+    known = cache.get_many(set(keys))
+    missing = [i for i, key in enumerate(keys) if key not in known]
+    count("sentiment.windows", len(keys) - len(missing), source="cache")
+    count("sentiment.windows", len(missing), source="model")
+    if missing:
+        with span("sentiment.inference", session=session, windows=len(missing)), profiled("sentiment"):
+            scored = score_windows(model, tokenizer, [windows[i] for i in missing], args.batch_size)
+        new = {keys[i]: result for i, result in zip(missing, scored)}
+        cache.put_many(args.model, new)
+        known.update(new)
+
+    df = pd.DataFrame(rows, columns=["Rede", "Redner", "Partei", "Token"])
+    df.insert(0, "Sitzungsnummer", session)
+    df["Sentiment"] = [known[key][1] for key in keys]
+    return df, len(keys), len(missing)
+
+
+def weighted_mean(df, by):
+    """Nach Tokenzahl gewichteter Mittelwert der Fenster-Scores (überlappende Token zählen einmal)"""
+    weighted = df.assign(Gewicht=df["Sentiment"] * df["Token"])
+    grouped = weighted.groupby(by, dropna=False)[["Gewicht", "Token"]].sum()
+    grouped["Sentiment"] = grouped["Gewicht"] / grouped["Token"]
+    return grouped.drop(columns="Gewicht").reset_index()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Sentiment-Analyse aller Reden")
+    parser.add_argument("--model", default=MODEL_ID)
+    parser.add_argument("--threads", type=int, default=None, help="Anzahl CPU-Threads für die Inferenz")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--stride", type=int, default=0, help="Überlappung der Fenster in Token")
+    parser.add_argument("--keep-boilerplate", action="store_true",
+                        help="Maskierte Textbausteine mitbewerten (siehe _boilerplate.py)")
+    return parser
+
+
+def run(args):
+    """Bewertet alle Sitzungen und schreibt die Sentiment-CSVs (auch als Pipeline-Stufe)"""
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    # Sentiment-Analyse-Modell laden
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModelForSequenceClassification.from_pretrained(args.model).eval()
+    cache = SentimentCache()
+    protocol_parser = ProtocolParser()
+
+    # Sentiment für jede Sitzung berechnen
+    frames = []
+    for session in list_sessions():
+        try:
+            df, n_windows, n_scored = analyse_session(session, protocol_parser, model, tokenizer, cache, args)
+        except ValueError as e:
+            print(f"⚠️ Sitzung {session} übersprungen: {e}")
+            continue
+        frames.append(df)
+        print(f"✅ Sitzung {session}: {n_windows} Fenster, {n_scored} neu bewertet")
 
-# Sentiment-Analyse-Modell laden
-sentiment_model = pipeline("sentiment-analysis", model="nlptown/bert-base-multilingual-uncased-sentiment")
+    if not frames:
+        print("❌ Keine Sitzungen gefunden.")
+        return None
+    windows = pd.concat(frames, ignore_index=True)
 
-# Pfad zu den JSON-Dateien
-json_dir = "data/json"
-results = []
+    # Ergebnisse pro Rede, Redner, Partei und Sitzung
+    weighted_mean(windows, ["Sitzungsnummer", "Rede", "Redner", "Partei"]).to_csv(
+        OUTPUT_DIR / "sentiment_speeches.csv", encoding="utf-8", index=False)
+    weighted_mean(windows, ["Redner", "Partei"]).to_csv(
+        OUTPUT_DIR / "sentiment_speakers.csv", encoding="utf-8", index=False)
+    weighted_mean(windows, ["Partei"]).to_csv(
+        OUTPUT_DIR / "sentiment_parties.csv", encoding="utf-8", index=False)
+    df_sentiment = weighted_mean(windows, ["Sitzungsnummer"])
+    df_sentiment.to_csv(OUTPUT_DIR / "sentiment_sessions.csv", encoding="utf-8", index=False)
+    return df_sentiment
 
-# Sentiment für jede Sitzung berechnen
-for json_file in sorted(os.listdir(json_dir)):
-    if json_file.endswith(".json"):
-        with open(os.path.join(json_dir, json_file), "r", encoding="utf-8") as f:
-            data = json.load(f)
-            session_number = data["sitzungsnummer"]
-            text = data["text"]
 
-            # Kürzen auf max. 512 Tokens (BERT-Limitation)
-            text_snippet = text[:512]
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    if not 0 <= args.stride < WINDOW_TOKENS:
+        parser.error(f"--stride muss zwischen 0 und {WINDOW_TOKENS - 1} liegen")
 
-            # Sentiment berechnen
-            sentiment_result = sentiment_model(text_snippet)
-            sentiment = sentiment_result[0]["label"]
+    df_sentiment = run(args)
+    if df_sentiment is not None:
+        # Ergebnisse in Tabelle anzeigen
+        print(df_sentiment.to_string(index=False))
 
-            results.append({"Sitzungsnummer": session_number, "Sentiment": sentiment})
 
-# Ergebnisse in Tabelle anzeigen
-df_sentiment = pd.DataFrame(results)
-tools.display_dataframe_to_user(name="Sentiment-Analyse der Sitzungen", dataframe=df_sentiment)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
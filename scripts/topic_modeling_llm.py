@@ -1,49 +1,79 @@
+import argparse
+import asyncio
 import os
-import json
-import openai
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv  # 🔹 Ladet .env Datei
 import pandas as pd
 
-# 🔹 .env Datei laden
-load_dotenv()
+import _boilerplate
+import _protocol_store
+from _llm_engine import LLMEngine
 
-# 🔹 OpenAI Client initialisieren
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-# 🔹 Pfad zu JSON-Dateien
+# 🔹 Pfad zu den Protokollen
 json_dir = "data/json"
 output_file = "data/llm_topics.csv"
 
-# 🔹 Ergebnisse speichern
-results = []
-
-# 🔹 Protokolle durchgehen
-for json_file in sorted(os.listdir(json_dir)):
-    if json_file.endswith(".json"):
-        with open(os.path.join(json_dir, json_file), "r", encoding="utf-8") as f:
-            data = json.load(f)
-            session_number = data["sitzungsnummer"]
-            text = data["text"][:2000]  # Begrenzung auf 2000 Zeichen wegen OpenAI-Token-Limit
-
-            # 🔹 LLM-gestützte Themenextraktion
-            try:
-                response = client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {"role": "system", "content": "Du bist ein NLP-Experte für Bundestagsdebatten."},
-                        {"role": "user", "content": f"Extrahiere die Hauptthemen dieser Bundestagsdebatte:\n{text}"}
-                    ]
-                )
-                topics = response.choices[0].message.content
-            except Exception as e:
-                topics = f"Fehler bei Sitzung {session_number}: {e}"
-
-            # 🔹 Ergebnisse speichern
-            results.append({"Sitzungsnummer": session_number, "Themen": topics})
-
-# 🔹 Speichern als CSV
-df_topics = pd.DataFrame(results)
-df_topics.to_csv(output_file, encoding="utf-8", index=False)
-
-print(f"✅ LLM-gestützte Themenextraktion gespeichert: {output_file}")
\ No newline at end of file
+
+async def process_session(engine, session_number, text, mode):
+    # 🔹 LLM-gestützte Themenextraktion
+    try:
+        if mode == "map-reduce":
+            topics = await engine.map_reduce_topics(text)
+        else:
+            topics = await engine.extract_topics(text[:2000])  # Begrenzung auf 2000 Zeichen
+    except Exception as e:
+        topics = f"Fehler bei Sitzung {session_number}: {e}"
+    print(f"✅ Sitzung {session_number} verarbeitet")
+    return {"Sitzungsnummer": session_number, "Themen": topics}
+
+
+async def run(args):
+    # 🔹 OpenAI Client initialisieren (base_url z. B. für einen lokalen Stub-Server)
+    # Wiederholungen übernimmt LLMEngine (mit Rate-Limit und Backoff); der Client soll nicht zusätzlich wiederholen
+    client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=args.base_url or os.getenv("OPENAI_BASE_URL"),
+                         max_retries=0)
+    engine = LLMEngine(
+        client,
+        model=args.model,
+        max_concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+    )
+
+    # 🔹 Protokolle nebenläufig durchgehen (ohne Textbausteine wie Inhaltsverzeichnis und Drucksachentitel)
+    iter_sessions = _protocol_store.iter_sessions if args.keep_boilerplate else _boilerplate.iter_sessions
+    tasks = [
+        process_session(engine, session_number, text, args.mode)
+        for session_number, text in iter_sessions(json_dir)
+    ]
+    results = await asyncio.gather(*tasks)
+    print(f"📡 {engine.calls} API-Aufrufe, {engine.cache_hits} Antworten aus dem Cache")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM-gestützte Themenextraktion pro Sitzung")
+    parser.add_argument("--mode", choices=["map-reduce", "single"], default="map-reduce",
+                        help="map-reduce über den ganzen Text oder ein Aufruf über die ersten 2000 Zeichen")
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--base-url", default=None, help="OpenAI-kompatibler Endpunkt")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rpm", type=float, default=500, help="Requests pro Minute")
+    parser.add_argument("--tpm", type=float, default=30000, help="Tokens pro Minute")
+    parser.add_argument("--keep-boilerplate", action="store_true",
+                        help="Maskierte Textbausteine mitschicken (siehe _boilerplate.py)")
+    args = parser.parse_args()
+
+    # 🔹 .env Datei laden
+    load_dotenv()
+    results = asyncio.run(run(args))
+
+    # 🔹 Speichern als CSV
+    df_topics = pd.DataFrame(results)
+    df_topics.to_csv(output_file, encoding="utf-8", index=False)
+
+    print(f"✅ LLM-gestützte Themenextraktion gespeichert: {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+import _boilerplate
+from _dtm_store import DocumentTermStore
+from _preprocessing import STOPWORD_FILE, load_stopwords, normalize
+from _protocol_parser import ProtocolParser
+from _protocol_store import BASE_DIR, iter_pages, list_sessions
+from _topic_modeling import create_lda, get_top_words
+from _tracing import profiled, span
+
+# Pfade definieren
+DTM_DIR = BASE_DIR / "data" / "dtm_speeches"
+OUTPUT_FILE = BASE_DIR / "data" / "speech_topics.csv"
+WORDS_FILE = BASE_DIR / "data" / "speech_topic_words.csv"
+
+MIN_TOKENS = 30  # Kurze Wortmeldungen (Sitzungsleitung, Zurufe) tragen kein Thema
+
+_stopwords = None
+
+
+def parse_session(session, keep_boilerplate=False):
+    """Zerlegt eine Sitzung in Reden und normalisiert sie – läuft im Worker-Prozess
+
+    Maskierte Textbausteine (siehe _boilerplate.py) werden vorher entfernt.
+    """
+    global _stopwords
+    if _stopwords is None:
+        _stopwords = load_stopwords(STOPWORD_FILE)
+    parser = ProtocolParser()
+    pages = iter_pages(session) if keep_boilerplate else _boilerplate.read_pages(session, keep=parser.keeps_line)
+    try:
+        protocol = parser.parse_pages(page.text for page in pages)
+    except ValueError as e:
+        logging.error(f"Sitzung {session} übersprungen: {e}")
+        return []
+    speeches = []
+    for position, speech in enumerate(protocol.speeches):
+        tokens = normalize(speech.content, _stopwords)
+        if len(tokens) >= MIN_TOKENS:
+            meta = {
+                "doc_id": f"{session}-{position:04d}",
+                "Sitzungsnummer": session,
+                "Rede": position,
+                "Redner": speech.speaker,
+                "Partei": speech.party,
+            }
+            speeches.append((meta, tokens, speech.content))
+    return speeches
+
+
+def iter_speeches(sessions, workers, keep_boilerplate=False):
+    """Parst die Sitzungen parallel und liefert die Reden in Sitzungsreihenfolge"""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for speeches in pool.map(partial(parse_session, keep_boilerplate=keep_boilerplate), sessions):
+            yield from speeches
+
+
+def fit_lda_chunked(store, doc_ids, terms, n_topics, n_jobs, batch_size, passes):
+    """Trainiert LDA blockweise per partial_fit – es liegt nie mehr als ein Block dicht im Speicher"""
+    lda = create_lda(n_topics, n_jobs)
+    lda.set_params(total_samples=len(doc_ids))
+    rng = np.random.default_rng(42)
+    with profiled("lda"):
+        for epoch in range(passes):
+            with span("lda.pass", epoch=epoch, documents=len(doc_ids)):
+                order = rng.permutation(len(doc_ids))
+                for start in range(0, len(order), batch_size):
+                    batch = [doc_ids[i] for i in order[start:start + batch_size]]
+                    lda.partial_fit(store.rows(batch, terms))
+    return lda
+
+
+def run_lda(args, store, metadata):
+    """LDA über alle Reden; None, wenn nach dem df-Filter keine Terme übrig bleiben"""
+    doc_ids = [meta["doc_id"] for meta in metadata]
+    _, terms, _ = store.matrix(max_df=args.max_df, min_df=args.min_df, doc_ids=doc_ids)
+    print(f"📚 {len(doc_ids)} Reden, {len(terms)} Terme")
+    if not terms:
+        return None
+
+    lda = fit_lda_chunked(store, doc_ids, terms, args.topics, args.jobs, args.batch_size, args.passes)
+
+    # Themenzuordnung ebenfalls blockweise
+    topics, shares = [], []
+    with span("lda.transform", documents=len(doc_ids)):
+        for start in range(0, len(doc_ids), args.batch_size):
+            distribution = lda.transform(store.rows(doc_ids[start:start + args.batch_size], terms))
+            topics.extend(distribution.argmax(axis=1) + 1)
+            shares.extend(distribution.max(axis=1))
+    return topics, shares, pd.DataFrame(get_top_words(lda, terms))
+
+
+def run_bertopic(args, stopwords, texts):
+    from bertopic import BERTopic
+    from sentence_transformers import SentenceTransformer
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    from _embedding_store import EmbeddingStore
+    from _topic_modeling_bertopic import EMBEDDING_MODEL
+
+    # Embeddings aus dem Cache, nur neue Reden werden kodiert
+    encoder = SentenceTransformer(EMBEDDING_MODEL)
+    embeddings = EmbeddingStore(EMBEDDING_MODEL).embed(
+        texts, lambda batch: encoder.encode(batch, batch_size=64)
+    )
+
+    # Stopwords nur für die Themenbeschreibung, die Embeddings sehen den Originaltext
+    vectorizer = CountVectorizer(stop_words=list(stopwords), min_df=args.min_df, max_df=args.max_df)
+    topic_model = BERTopic(embedding_model=encoder, vectorizer_model=vectorizer, low_memory=True,
+                           calculate_probabilities=False, verbose=True)
+    with span("bertopic.fit_transform", documents=len(texts)):
+        topics, probs = topic_model.fit_transform(texts, embeddings=embeddings)
+    shares = list(probs) if probs is not None else [None] * len(topics)
+    return list(topics), shares, pd.DataFrame(topic_model.get_topic_info())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Themenmodell auf Ebene einzelner Reden")
+    parser.add_argument("--model", choices=["lda", "bertopic"], default="lda")
+    parser.add_argument("--topics", type=int, default=20, help="Anzahl der LDA-Themen")
+    parser.add_argument("--min-df", type=int, default=5)
+    parser.add_argument("--max-df", type=float, default=0.5)
+    parser.add_argument("--batch-size", type=int, default=2048, help="Reden pro Trainingsblock (Speicherobergrenze)")
+    parser.add_argument("--passes", type=int, default=3, help="Durchläufe über den Korpus")
+    parser.add_argument("--jobs", type=int, default=-1, help="Anzahl Kerne")
+    parser.add_argument("--keep-boilerplate", action="store_true",
+                        help="Maskierte Textbausteine in den Reden behalten (siehe _boilerplate.py)")
+    args = parser.parse_args()
+    workers = os.cpu_count() if args.jobs < 1 else args.jobs
+
+    # 🔹 Sitzungen parallel in Reden zerlegen und in die Reden-DTM übernehmen
+    store = DocumentTermStore(DTM_DIR)
+    metadata, texts = [], []
+
+    def documents():
+        for meta, tokens, content in iter_speeches(list_sessions(), workers, args.keep_boilerplate):
+            metadata.append(meta)
+            if args.model == "bertopic":
+                texts.append(content)
+            yield meta["doc_id"], tokens
+
+    added = store.add_documents(documents())
+    print(f"✅ {len(metadata)} Reden gefunden, {added} neu in der Dokument-Term-Matrix.")
+    if not metadata:
+        print("❌ Keine Reden gefunden (keine Sitzung ließ sich parsen).")
+        return
+
+    # 🔹 Themenmodell trainieren
+    print(f"🚀 Training von {args.model}...")
+    if args.model == "lda":
+        result = run_lda(args, store, metadata)
+        if result is None:
+            print("❌ Keine Terme nach dem Filter (--min-df/--max-df), kein Modell trainiert.")
+            return
+        topics, shares, df_words = result
+    else:
+        topics, shares, df_words = run_bertopic(args, load_stopwords(STOPWORD_FILE), texts)
+
+    # 🔹 Ergebnisse speichern
+    df_speeches = pd.DataFrame(metadata).drop(columns="doc_id")
+    df_speeches["Thema"] = topics
+    df_speeches["Anteil"] = shares
+    df_speeches.to_csv(OUTPUT_FILE, encoding="utf-8", index=False)
+    df_words.to_csv(WORDS_FILE, encoding="utf-8", index=False)
+    print(f"✅ Themen pro Rede gespeichert: {OUTPUT_FILE} & {WORDS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
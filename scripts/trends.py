@@ -0,0 +1,53 @@
+import argparse
+import math
+import time
+from datetime import date
+
+from _trend_store import TrendStore
+
+
+def print_trending(result, elapsed_ms):
+    if not result:
+        print("❌ Noch keine Sitzungswochen im Trend-Speicher (erst 'trends.py update' ausführen)")
+        return
+    print(f"📅 Sitzungswoche ab {result['week']} ({result['sittings']} Sitzungen)")
+    print("📈 Aufsteigende Begriffe:")
+    for item in result["rising_terms"]:
+        print(f"   {item['term']:<30} {item['count']:5d}×  (vorher {item['baseline']}, Score {item['score']:.2f})")
+    if result["topics"]:
+        print("🧩 Themenanteile:")
+        for item in sorted(result["topics"], key=lambda t: -t["change"]):
+            print(f"   {item['topic']:<10} {item['share']:6.1%}  ({item['change']:+.1%} ggü. den Vorwochen)")
+    if not math.isnan(result["sentiment"]):
+        print(f"💬 Sentiment: {result['sentiment']:.2f} (Vorwochen: {result['sentiment_rolling']:.2f})")
+    print(f"⚡ Abfrage in {elapsed_ms:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trends über Sitzungswochen: Begriffe, Themen, Sentiment")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("update", help="Neue Sitzungen anhängen und Wochenfenster vorberechnen")
+
+    trending_parser = subparsers.add_parser("trending", help="Was ist diese Woche Thema im Bundestag?")
+    trending_parser.add_argument("--week", type=date.fromisoformat, help="Ein Tag der Sitzungswoche (JJJJ-MM-TT)")
+    trending_parser.add_argument("--top", type=int, default=20)
+
+    series_parser = subparsers.add_parser("series", help="Verlauf einzelner Begriffe (pro 10.000 Token)")
+    series_parser.add_argument("terms", nargs="+")
+    series_parser.add_argument("--weekly", action="store_true", help="Pro Sitzungswoche statt pro Sitzung")
+    args = parser.parse_args()
+
+    store = TrendStore()
+    if args.command == "update":
+        added = store.update()
+        print(f"✅ {added} Sitzungen angehängt, {len(store.active_rows())} insgesamt")
+    elif args.command == "trending":
+        started = time.perf_counter()
+        result = store.trending(args.week, args.top)
+        print_trending(result, (time.perf_counter() - started) * 1000)
+    else:
+        print(store.term_series([term.lower() for term in args.terms], weekly=args.weekly).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()